@@ -1,244 +1,662 @@
+import time
+
+# Start of the import-time measurement reported by create_app
+IMPORT_STARTED = time.perf_counter()
+
+import numpy as np
 import pandas as pd
-from dash import Dash, dcc, html, Input, Output, dash_table, State
-import plotly.express as px
-import openai
+from dash import ALL, Dash, dcc, html, Input, Output, dash_table, State
+from functools import lru_cache, wraps
+from flask import g, jsonify, request
 from dotenv import load_dotenv
+import contextvars
+import logging
 import os
+import threading
+import uuid
 
-# Load environment variables from .env file
+# Load environment variables from .env file. The openai package reads
+# OPENAI_API_KEY and OPENAI_API_BASE (e.g. the local fake_openai_server.py)
+# when it is first imported.
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
 
-# Load data from CSV files
-brand_data = pd.read_csv('Data/brand.csv')
-competitors_data = pd.read_csv('Data/competitors.csv')
-supply_chain_data = pd.read_csv('Data/Competitors_Supply_chain.csv')
+# Imported after load_dotenv so settings from .env apply. Modules that pull in
+# openai or plotly (llm_client, chat, tariff_lookup, figures) are imported on
+# first use inside the callbacks, so importing this module stays cheap.
+from table_query import query_table
+from monte_carlo import BrandTariffModel, CompetitorTariffModel, run_monte_carlo
+from relocation import CRITERIA, DEFAULT_WEIGHTS
+from scenarios import (
+    break_even_tariff_increase, competitor_tariff_scenario, sweep_by_group, tariff_grid, tariff_scenario, tariff_sweep
+)
+
+# Degraded callbacks (OpenAI unavailable, no worker slot free) are logged here
+logger = logging.getLogger(__name__)
+
+# Scenario results kept per (version of the data they read, business unit or tariffs,
+# tariff increase); a reload only drops the entries of the units or sources it changed
+FIGURE_CACHE_SIZE = int(os.getenv('FIGURE_CACHE_SIZE', 256))
+
+# Relocation scores are kept per (relocation index version, criterion weights); each entry
+# covers every brand x country pair
+RELOCATION_CACHE_SIZE = int(os.getenv('RELOCATION_CACHE_SIZE', 32))
+# Countries drawn on the relocation radar chart
+RELOCATION_TOP_COUNTRIES = 3
+
+# Tariff schedule projections are kept per (data version, schedule hash)
+PROJECTION_CACHE_SIZE = int(os.getenv('PROJECTION_CACHE_SIZE', 32))
+# Schedule shown on first load: tariffs on brands and on imports from China
+# phasing in over four quarters
+DEFAULT_TARIFF_SCHEDULE = [
+    {'period': f'Q{quarter}', 'tariff': tariff, 'China': tariff}
+    for quarter, tariff in enumerate([10, 20, 30, 40], start=1)
+]
+
+# Columns shown in the brand details table; only these are sent for each page
+BRAND_DETAILS_COLUMNS = ['brand_name', 'brand_revenue_USD', 'description']
+# Brands drawn on the brand revenue chart, largest revenue first; the rest are in the details table
+BRAND_CHART_TOP = 20
+
+# Callbacks are collected here and attached to every app built by create_app
+CALLBACKS = []
+CLIENTSIDE_CALLBACKS = []
+# Scenario functions memoized per app; see memoized
+MEMOIZED = []
+
+# State of the app serving the current request, set before each request and
+# carried into background jobs with the rest of the callback context. Code
+# running outside a request (scripts, benchmarks) gets the last app created.
+_current_state = contextvars.ContextVar('app_state')
+_last_state = None
+
+
+class AppState:
+    """Settings and state of one app built by create_app.
+
+    Holds the data repository (CSV files swapped in automatically when they
+    change), the memoized scenario results and the session store, so apps
+    with different settings can share a process. Nothing is loaded until the
+    first page load or callback.
+    """
+
+    def __init__(self, settings):
+        from data_repository import DataRepository
+
+        self.settings = settings
+        self.data_repository = DataRepository(
+            settings['DATA_DIR'], settings['DATA_CACHE_DIR'], settings['DATA_CHECK_INTERVAL']
+        )
+        self.caches = {
+            func.__name__: lru_cache(maxsize=settings[size_setting])(func) for func, size_setting in MEMOIZED
+        }
+        self._session_store = None
+
+    # Connected on first use
+    @property
+    def session_store(self):
+        if self._session_store is None:
+            from session_store import SessionStore, backend_from_url
+
+            self._session_store = SessionStore(
+                backend_from_url(self.settings['SESSION_STORE_URL']),
+                ttl=self.settings['SESSION_TTL_SECONDS'],
+                result_ttl=self.settings['SCENARIO_RESULT_TTL_SECONDS'],
+                share_min_seconds=self.settings['SCENARIO_SHARE_MIN_SECONDS']
+            )
+        return self._session_store
+
+
+def current_state():
+    return _current_state.get(_last_state)
+
+
+# Data snapshot of the current app. Callbacks take one and use it throughout.
+def current_data():
+    return current_state().data_repository.current()
+
+
+# Settings create_app takes from its `config` by name; the rest are read from
+# the environment only, as they configure stores shared by the whole process
+# (OpenAI response cache, circuit breaker, background jobs, metrics)
+def app_settings(config):
+    from data_repository import DATA_CACHE_DIR, DATA_CHECK_INTERVAL, DATA_DIR
+    from monte_carlo import MC_BATCH_CELLS, MC_MAX_WORKERS, MC_PARALLEL_CELLS
+    from session_store import (
+        SCENARIO_RESULT_TTL_SECONDS, SCENARIO_SHARE_MIN_SECONDS, SESSION_STORE_URL, SESSION_TTL_SECONDS
+    )
+
+    settings = {
+        'DATA_DIR': DATA_DIR,
+        'DATA_CACHE_DIR': DATA_CACHE_DIR,
+        'DATA_CHECK_INTERVAL': DATA_CHECK_INTERVAL,
+        'FIGURE_CACHE_SIZE': FIGURE_CACHE_SIZE,
+        'RELOCATION_CACHE_SIZE': RELOCATION_CACHE_SIZE,
+        'PROJECTION_CACHE_SIZE': PROJECTION_CACHE_SIZE,
+        'MC_MAX_WORKERS': MC_MAX_WORKERS,
+        'MC_BATCH_CELLS': MC_BATCH_CELLS,
+        'MC_PARALLEL_CELLS': MC_PARALLEL_CELLS,
+        'SESSION_STORE_URL': SESSION_STORE_URL,
+        'SESSION_TTL_SECONDS': SESSION_TTL_SECONDS,
+        'SCENARIO_RESULT_TTL_SECONDS': SCENARIO_RESULT_TTL_SECONDS,
+        'SCENARIO_SHARE_MIN_SECONDS': SCENARIO_SHARE_MIN_SECONDS,
+    }
+    unknown = sorted(set(config) - set(settings))
+    if unknown:
+        raise ValueError(f"create_app does not take {', '.join(unknown)}; set them in the environment")
+    return {**settings, **config}
+
+
+# Same arguments as app.callback; registers the decorated function with create_app
+def callback(*args, **kwargs):
+    def register(func):
+        CALLBACKS.append((func, args, kwargs))
+        return func
+    return register
+
+
+# Same arguments as app.clientside_callback
+def clientside_callback(*args, **kwargs):
+    CLIENTSIDE_CALLBACKS.append((args, kwargs))
 
-# Initialize the Dash app
-app = Dash(__name__, suppress_callback_exceptions=True)
 
-# Layout of the dashboard
-app.layout = html.Div([
-    html.H1("DASHBOARD", style={'text-align': 'center'}),
+# Memoize a scenario function's JSON-ready result in the session store as well,
+# so a scenario computed by one worker is reused by the others. Goes under
+# memoized, which keeps serving repeat calls from the worker's memory.
+def shared_result(func):
+    @wraps(func)
+    def wrapper(*args):
+        return current_state().session_store.result(func.__name__, args, func)
+    return wrapper
 
-    # Tabs for navigation
-    dcc.Tabs([
-        dcc.Tab(label='MAIN', children=[
-            html.Div([
-                # Left Panel: Filter by Business Unit and Simulation Inputs
+
+# lru_cache with one cache per app, of the size given by `size_setting`;
+# cache_clear and cache_info act on the current app's cache
+def memoized(size_setting):
+    def register(func):
+        MEMOIZED.append((func, size_setting))
+
+        @wraps(func)
+        def wrapper(*args):
+            return current_state().caches[func.__name__](*args)
+
+        wrapper.cache_clear = lambda: current_state().caches[func.__name__].cache_clear()
+        wrapper.cache_info = lambda: current_state().caches[func.__name__].cache_info()
+        return wrapper
+    return register
+
+
+# Stale OpenAI responses served by background jobs are refreshed from the web
+# server processes, which outlive the jobs. One refresher thread per process
+# (also after a fork); llm_client is imported on that thread, off the request path.
+_refresher_pid = None
+
+
+def start_llm_refresher():
+    global _refresher_pid
+    if _refresher_pid != os.getpid():
+        _refresher_pid = os.getpid()
+        threading.Thread(target=_run_llm_refresher, daemon=True).start()
+
+
+def _run_llm_refresher():
+    from llm_client import run_refresher
+
+    run_refresher()
+
+
+# Expose OpenAI response cache hit/miss counts, and how many requests were
+# issued upstream vs coalesced onto an identical request in flight
+def llm_cache_stats():
+    from llm_client import request_coalescer, response_cache
+
+    return jsonify({**response_cache.stats(), 'requests': request_coalescer.stats()})
+
+
+# Prometheus metrics: callback and OpenAI request counters and histograms from
+# every worker, plus the current LLM response cache counts
+def prometheus_metrics():
+    from llm_client import breaker, request_coalescer, response_cache
+    from metrics import metrics
+
+    gauges = {
+        f'llm_cache_{name}': (f"LLM response cache {name.replace('_', ' ')}", value)
+        for name, value in response_cache.stats().items()
+    }
+    gauges.update({
+        f'llm_requests_{name}': (f"OpenAI requests {name} (identical in-flight requests share one call)", value)
+        for name, value in request_coalescer.stats().items()
+    })
+    gauges['llm_circuit_open'] = (
+        "1 while OpenAI calls are paused after repeated failures (0.5 while probing, 0 when closed)",
+        {'closed': 0, 'half_open': 0.5, 'open': 1}[breaker.state()]
+    )
+    return metrics.render(gauges), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+
+# Layout of the dashboard, rebuilt on every page load so reloaded data shows up
+def serve_layout():
+    from figures import (
+        brand_revenue_layout, cogs_pie_template, overlap_impact_template, profit_impact_template,
+        profit_margin_template, relocation_radar_template, schedule_projection_template
+    )
+
+    data = current_data()
+    return html.Div([
+        html.H1("DASHBOARD", style={'text-align': 'center'}),
+
+        # Per-business-unit aggregates and top brand revenues; the baseline card and
+        # brand chart are rendered from these in the browser, without a server round trip
+        dcc.Store(id='business-unit-aggregates', data=data.business_unit_index.to_store(top=BRAND_CHART_TOP)),
+        dcc.Store(id='brand-bar-chart-layout', data=brand_revenue_layout(BRAND_CHART_TOP)),
+
+        # Handle of this browser session's server-side state (session_store.py).
+        # A fresh id is generated server-side with every layout; the store keeps
+        # the id already in the tab's sessionStorage on reloads.
+        dcc.Store(id='session-id', storage_type='session', data=uuid.uuid4().hex),
+
+        # Tabs for navigation
+        dcc.Tabs([
+            dcc.Tab(label='MAIN', children=[
                 html.Div([
-                    html.H3("Filter by Business Unit"),
-                    dcc.Dropdown(
-                        id='business-unit-dropdown',
-                        options=[{'label': bu, 'value': bu} for bu in brand_data['business_unit'].unique()],
-                        placeholder="Select a Business Unit",
-                        style={'margin-bottom': '20px'}
-                    ),
-                    html.H3("Simulation Inputs"),
-                    html.Label("Tariff Increase (%)"),
-                    dcc.Input(id='tariff-increase-input', type='number', placeholder="Enter % increase", style={'margin-bottom': '10px'}),
-                    html.Button("Apply Scenario", id='apply-scenario-button', n_clicks=0),
+                    # Left Panel: Filter by Business Unit and Simulation Inputs
                     html.Div([
-                        html.H4("Baseline Metrics"),
-                        html.Div(id='baseline-card', style={'margin-top': '20px'})
-                    ])
-                ], style={
-                    'width': '20%',
-                    'display': 'inline-block',
-                    'vertical-align': 'top',
-                    'padding': '10px',
-                    'border-right': '1px solid #ccc'
-                }),
-
-                # Central Panel: Revenue by Brand Chart
-                html.Div([
-                    html.H3("Revenue by Brand"),
-                    dcc.Graph(id='brand-bar-chart'),
-                    # Add placeholders for the charts in the layout
+                        html.H3("Filter by Business Unit"),
+                        dcc.Dropdown(
+                            id='business-unit-dropdown',
+                            options=[{'label': bu, 'value': bu} for bu in data.business_unit_index.business_units],
+                            placeholder="Select a Business Unit",
+                            style={'margin-bottom': '20px'}
+                        ),
+                        html.H3("Simulation Inputs"),
+                        html.Label("Tariff Increase (%)"),
+                        dcc.Input(id='tariff-increase-input', type='number', placeholder="Enter % increase", style={'margin-bottom': '10px'}),
+                        html.Button("Apply Scenario", id='apply-scenario-button', n_clicks=0),
+                        html.Div([
+                            html.H4("Baseline Metrics"),
+                            html.Div(id='baseline-card', style={'margin-top': '20px'})
+                        ]),
+                        html.H3("Sensitivity Sweep"),
+                        html.Label("Tariff Increase Range (%)"),
+                        html.Div([
+                            dcc.Input(id='sweep-max-input', type='number', value=200, min=1, placeholder="Max %", style={'width': '45%'}),
+                            dcc.Input(id='sweep-step-input', type='number', value=1, min=0.1, placeholder="Step %", style={'width': '45%'})
+                        ], style={'margin-bottom': '10px'}),
+                        html.Button("Run Sweep", id='run-sweep-button', n_clicks=0),
+                        html.H3("Monte Carlo Simulation"),
+                        html.Label("Draws"),
+                        dcc.Input(id='mc-draws-input', type='number', value=1_000_000, min=1000, step=1000, style={'margin-bottom': '10px'}),
+                        html.Label("Tariff Increase Uncertainty (±% of scenario)"),
+                        dcc.Input(id='mc-tariff-spread-input', type='number', value=50, min=0, style={'margin-bottom': '10px'}),
+                        html.Label("Tariff Share of COGS Range (%)"),
+                        html.Div([
+                            dcc.Input(id='mc-share-low-input', type='number', value=35, min=0, max=100, style={'width': '45%'}),
+                            dcc.Input(id='mc-share-high-input', type='number', value=55, min=0, max=100, style={'width': '45%'})
+                        ], style={'margin-bottom': '10px'}),
+                        html.Button("Run Monte Carlo", id='run-monte-carlo-button', n_clicks=0)
+                    ], style={
+                        'width': '20%',
+                        'display': 'inline-block',
+                        'vertical-align': 'top',
+                        'padding': '10px',
+                        'border-right': '1px solid #ccc'
+                    }),
+
+                    # Central Panel: Revenue by Brand Chart
+                    html.Div([
+                        html.H3("Revenue by Brand"),
+                        dcc.Graph(id='brand-bar-chart'),
+                        # Add placeholders for the charts in the layout
+                        html.Div([
+                            dcc.Graph(id='profit-impact-bar-chart-main', figure=profit_impact_template('Brand')),
+                            dcc.Graph(id='cogs-pie-chart-main', figure=cogs_pie_template()),
+                            dcc.Graph(id='profit-margin-line-chart-main', figure=profit_margin_template())
+                        ], style={'width': '100%', 'display': 'inline-block'}),
+                        html.Div([
+                            dcc.Graph(id='tariff-sensitivity-chart'),
+                            dash_table.DataTable(
+                                id='break-even-table',
+                                columns=[
+                                    {"name": "Business Unit", "id": "business_unit"},
+                                    {"name": "Revenue (USD)", "id": "revenue"},
+                                    {"name": "Break-even Tariff Increase (%)", "id": "break_even"}
+                                ],
+                                style_cell={'textAlign': 'left'}
+                            )
+                        ], style={'width': '100%', 'display': 'inline-block'}),
+                        html.Div([
+                            html.Div(id='mc-summary', style={'margin-top': '20px'}),
+                            dcc.Graph(id='mc-profit-band-chart')
+                        ], style={'width': '100%', 'display': 'inline-block'}),
+                    ], style={
+                        'width': '50%',
+                        'display': 'inline-block',
+                        'vertical-align': 'top',
+                        'padding': '10px',
+                        'text-align': 'center'
+                    }),
+
+                    # Right Panel: Brand Details Table and OpenAI Table
                     html.Div([
-                        dcc.Graph(id='profit-impact-bar-chart-main'),
-                        dcc.Graph(id='cogs-pie-chart-main'),
-                        dcc.Graph(id='profit-margin-line-chart-main')
-                    ], style={'width': '100%', 'display': 'inline-block'}),
-                ], style={
-                    'width': '50%',
-                    'display': 'inline-block',
-                    'vertical-align': 'top',
-                    'padding': '10px',
-                    'text-align': 'center'
-                }),
-
-                # Right Panel: Brand Details Table and OpenAI Table
+                        html.H3("Brand Details"),
+                        dash_table.DataTable(
+                            id='brand-details-table',
+                            columns=[
+                                {"name": "Brand Name", "id": "brand_name"},
+                                {"name": "Revenue (USD)", "id": "brand_revenue_USD"},
+                                {"name": "Description", "id": "description"}
+                            ],
+                            style_table={'overflowX': 'auto'},
+                            style_cell={'textAlign': 'left'},
+                            filter_action="custom",
+                            filter_query='',
+                            sort_action="custom",
+                            sort_mode="single",
+                            sort_by=[],
+                            page_action="custom",
+                            page_current=0,
+                            page_size=10
+                        ),
+                        html.H3("OpenAI Tariff Table"),
+                        html.Div(id='openai-tariff-status', style={'font-style': 'italic'}),
+                        dash_table.DataTable(
+                            id='openai-tariff-table',
+                            columns=[
+                                {"name": "Brand", "id": "brand"},
+                                {"name": "Category", "id": "category"},
+                                {"name": "Tariff Applied", "id": "tariff"}
+                            ],
+                            style_table={'overflowX': 'auto'},
+                            style_cell={'textAlign': 'left'},
+                            page_size=10
+                        ),
+                        html.H3("Alternative Suppliers"),
+                        dash_table.DataTable(
+                            id='alternative-suppliers-table',
+                            columns=[
+                                {"name": "Brand", "id": "brand"},
+                                {"name": "Category", "id": "category"},
+                                {"name": "Alternative Suppliers", "id": "suppliers"}
+                            ],
+                            style_table={'overflowX': 'auto'},
+                            style_cell={'textAlign': 'left'},
+                            page_size=10
+                        )
+                    ], style={
+                        'width': '30%',
+                        'display': 'inline-block',
+                        'vertical-align': 'top',
+                        'padding': '10px',
+                        'border-left': '1px solid #ccc'
+                    })
+                ], style={'display': 'flex', 'width': '100%'})
+            ]),
+
+            dcc.Tab(label='Competitors', children=[
                 html.Div([
-                    html.H3("Brand Details"),
+                    html.H3("Competitors Overview"),
+                    html.Label("China Tariff Increase (%)"),
+                    dcc.Input(id='competitor-tariff-increase-input', type='number', placeholder="Enter % increase", style={'margin-bottom': '10px'}),
+                    html.Label("Tariff Increase by Other Supplier Country (%)"),
+                    dash_table.DataTable(
+                        id='competitor-country-tariffs-table',
+                        columns=[
+                            {"name": "Supplier Country", "id": "country", "editable": False},
+                            {"name": "Tariff Increase (%)", "id": "tariff", "type": "numeric", "editable": True}
+                        ],
+                        data=[
+                            {'country': country, 'tariff': None}
+                            for country in data.exposure.countries if country != 'China'
+                        ],
+                        style_table={'overflowY': 'auto', 'maxHeight': '300px', 'width': '400px'},
+                        style_cell={'textAlign': 'left'}
+                    ),
+                    html.Button("Apply Scenario", id='apply-competitor-scenario-button', n_clicks=0),
+                    dcc.Graph(id='competitor-profit-impact-bar-chart', figure=profit_impact_template('Competitor')),
+                    dcc.Graph(id='competitor-cogs-pie-chart'),
+                    dcc.Graph(id='competitor-profit-margin-line-chart'),
+                    html.H3("Business Unit vs Overlapping Competitors"),
+                    html.P(
+                        "Our brands take the China tariff increase; the competitors listed against them in "
+                        "competitors.csv take the tariffs above, weighted by their import shares."
+                    ),
+                    dcc.Dropdown(
+                        id='overlap-business-unit-dropdown',
+                        options=[{'label': bu, 'value': bu} for bu in data.business_unit_index.business_units],
+                        placeholder="Select a Business Unit",
+                        style={'margin-bottom': '10px', 'width': '400px'}
+                    ),
+                    html.Button("Compare", id='apply-overlap-scenario-button', n_clicks=0),
+                    html.Div(id='overlap-summary', style={'margin-top': '20px'}),
+                    dcc.Graph(id='overlap-impact-chart', figure=overlap_impact_template()),
                     dash_table.DataTable(
-                        id='brand-details-table',
+                        id='overlap-competitors-table',
                         columns=[
-                            {"name": "Brand Name", "id": "brand_name"},
-                            {"name": "Revenue (USD)", "id": "brand_revenue_USD"},
-                            {"name": "Description", "id": "description"}
+                            {"name": "Competitor", "id": "competitor"},
+                            {"name": "Overlapping Brands", "id": "brands"},
+                            {"name": "Revenue (USD)", "id": "revenue"},
+                            {"name": "Baseline Profit (USD)", "id": "baseline_profit"},
+                            {"name": "New Profit (USD)", "id": "new_profit"},
+                            {"name": "Profit Change (%)", "id": "profit_change"}
                         ],
                         style_table={'overflowX': 'auto'},
                         style_cell={'textAlign': 'left'},
-                        filter_action="native",
-                        sort_action="native",
                         page_size=10
                     ),
-                    html.H3("OpenAI Tariff Table"),
+                    html.H3("Monte Carlo Simulation"),
+                    html.Label("Draws"),
+                    dcc.Input(id='competitor-mc-draws-input', type='number', value=100_000, min=1000, step=1000, style={'margin-bottom': '10px'}),
+                    html.Label("Tariff Increase Uncertainty (±% of scenario)"),
+                    dcc.Input(id='competitor-mc-tariff-spread-input', type='number', value=50, min=0, style={'margin-bottom': '10px'}),
+                    html.Label("Import Proportion Uncertainty (±%)"),
+                    dcc.Input(id='competitor-mc-import-spread-input', type='number', value=20, min=0, max=100, style={'margin-bottom': '10px'}),
+                    html.Button("Run Monte Carlo", id='run-competitor-monte-carlo-button', n_clicks=0),
+                    html.Div(id='competitor-mc-summary', style={'margin-top': '20px'}),
+                    dcc.Graph(id='competitor-mc-profit-band-chart')
+                ], style={'width': '100%', 'display': 'inline-block'})
+            ]),
+
+            dcc.Tab(label='Tariff Schedule', children=[
+                html.Div([
+                    html.H3("Tariff Schedule Projection"),
+                    html.P(
+                        "Tariff increases (%) in force in each period: on the brands' tariff trade costs and "
+                        "on competitor imports from each supplier country. Blank cells mean no increase."
+                    ),
                     dash_table.DataTable(
-                        id='openai-tariff-table',
+                        id='tariff-schedule-table',
                         columns=[
-                            {"name": "Category", "id": "category"},
-                            {"name": "Tariff Applied", "id": "tariff"}
+                            {"name": "Period", "id": "period"},
+                            {"name": "Brand Tariff Increase (%)", "id": "tariff", "type": "numeric"}
+                        ] + [
+                            {"name": f"{country} (%)", "id": country, "type": "numeric"}
+                            for country in data.exposure.countries
                         ],
+                        data=DEFAULT_TARIFF_SCHEDULE,
+                        editable=True,
+                        row_deletable=True,
                         style_table={'overflowX': 'auto'},
-                        style_cell={'textAlign': 'left'},
+                        style_cell={'textAlign': 'left', 'minWidth': '90px'}
+                    ),
+                    html.Button("Add Period", id='add-schedule-period-button', n_clicks=0),
+                    html.Div([
+                        dcc.Input(id='tariff-schedule-name-input', type='text', placeholder="Schedule name"),
+                        html.Button("Save Schedule", id='save-tariff-schedule-button', n_clicks=0),
+                        dcc.Dropdown(
+                            id='tariff-schedule-dropdown',
+                            placeholder="Load a saved schedule",
+                            style={'width': '300px', 'display': 'inline-block', 'vertical-align': 'middle'}
+                        )
+                    ], style={'margin': '10px 0'}),
+                    # Saved schedules by name, kept in this browser
+                    dcc.Store(id='saved-tariff-schedules', storage_type='local', data={}),
+                    dcc.Graph(id='schedule-projection-chart', figure=schedule_projection_template()),
+                    dash_table.DataTable(
+                        id='schedule-projection-table',
+                        columns=[
+                            {"name": "Period", "id": "period"},
+                            {"name": "Brand Revenue (USD)", "id": "revenue"},
+                            {"name": "Brand COGS (USD)", "id": "cogs"},
+                            {"name": "Brand Profit (USD)", "id": "profit"},
+                            {"name": "Brand Margin (%)", "id": "margin"},
+                            {"name": "Competitor Profit (USD)", "id": "competitor_profit"},
+                            {"name": "Competitor Margin (%)", "id": "competitor_margin"}
+                        ],
+                        style_table={'overflowX': 'auto'},
+                        style_cell={'textAlign': 'left'}
+                    )
+                ], style={'width': '100%', 'display': 'inline-block', 'margin-top': '20px'})
+            ]),
+
+            dcc.Tab(label='Relocation Simulation', children=[
+                html.Div([
+                    html.H3("Relocation Simulation"),
+                    html.Label("Select a Brand"),
+                    dcc.Dropdown(
+                        id='relocation-brand-dropdown',
+                        options=[{'label': brand, 'value': brand} for brand in data.brands['brand_name'].unique()],
+                        placeholder="Select a Brand",
+                        style={'margin-bottom': '20px'}
+                    ),
+                    # Criterion weights; scores are recomputed locally on every change
+                    html.Label("Criteria Weights"),
+                    html.Div([
+                        html.Div([
+                            html.Label(label),
+                            dcc.Slider(
+                                id={'type': 'relocation-weight', 'criterion': criterion},
+                                min=0, max=5, step=0.5, value=DEFAULT_WEIGHTS[criterion],
+                                marks={weight: str(weight) for weight in range(6)}
+                            )
+                        ])
+                        for criterion, label in CRITERIA.items()
+                    ], style={'margin-bottom': '20px'}),
+                    dcc.Graph(id='relocation-radar-chart', figure=relocation_radar_template(RELOCATION_TOP_COUNTRIES)),
+                    dash_table.DataTable(
+                        id='relocation-ranking-table',
+                        columns=[
+                            {'name': 'Country', 'id': 'country'},
+                            {'name': 'Score (0-10)', 'id': 'score'}
+                        ],
+                        style_table={'overflowX': 'auto', 'margin-bottom': '20px'},
                         page_size=10
+                    ),
+                    dcc.Checklist(
+                        id='relocation-narrative-toggle',
+                        options=[{'label': " Write a narrative analysis with OpenAI", 'value': 'llm'}],
+                        value=[]
+                    ),
+                    html.Div(id='relocation-status', style={'font-style': 'italic'}),
+                    html.Div(id='relocation-conclusion', style={'margin-top': '20px', 'whiteSpace': 'pre-line'}),
+                    html.H3("Chat with OpenAI Agent"),
+                    html.Div(
+                        id='chat-container',
+                        style={
+                            'width': '100%',
+                            'height': '400px',  # Increase the height of the chat box
+                            'overflow-y': 'scroll',  # Enable vertical scrolling
+                            'border': '1px solid #ccc',
+                            'padding': '10px',
+                            'border-radius': '5px',
+                            'background-color': '#f9f9f9',
+                            'whiteSpace': 'pre-line'
+                        }
+                    ),
+                    dcc.Input(
+                        id='chat-input',
+                        placeholder="Type your message here and press Enter...",
+                        style={'width': '100%', 'margin-top': '10px', 'padding': '10px'},
+                        type='text',
+                        n_submit=0  # Detect Enter key press
                     )
-                ], style={
-                    'width': '30%',
-                    'display': 'inline-block',
-                    'vertical-align': 'top',
-                    'padding': '10px',
-                    'border-left': '1px solid #ccc'
-                })
-            ], style={'display': 'flex', 'width': '100%'})
-        ]),
-
-        dcc.Tab(label='Competitors', children=[
-            html.Div([
-                html.H3("Competitors Overview"),
-                html.Label("Tariff Increase (%)"),
-                dcc.Input(id='competitor-tariff-increase-input', type='number', placeholder="Enter % increase", style={'margin-bottom': '10px'}),
-                html.Button("Apply Scenario", id='apply-competitor-scenario-button', n_clicks=0),
-                dcc.Graph(id='competitor-profit-impact-bar-chart'),
-                dcc.Graph(id='competitor-cogs-pie-chart'),
-                dcc.Graph(id='competitor-profit-margin-line-chart')
-            ], style={'width': '100%', 'display': 'inline-block'})
-        ]),
-
-        dcc.Tab(label='Relocation Simulation', children=[
-            html.Div([
-                html.H3("Relocation Simulation"),
-                html.Label("Select a Brand"),
-                dcc.Dropdown(
-                    id='relocation-brand-dropdown',
-                    options=[{'label': brand, 'value': brand} for brand in brand_data['brand_name'].unique()],
-                    placeholder="Select a Brand",
-                    style={'margin-bottom': '20px'}
-                ),
-                dcc.Graph(id='relocation-radar-chart'),
-                html.Div(id='relocation-conclusion', style={'margin-top': '20px'}),
-                html.H3("Chat with OpenAI Agent"),
-                html.Div(
-                    id='chat-container',
-                    style={
-                        'width': '100%',
-                        'height': '400px',  # Increase the height of the chat box
-                        'overflow-y': 'scroll',  # Enable vertical scrolling
-                        'border': '1px solid #ccc',
-                        'padding': '10px',
-                        'border-radius': '5px',
-                        'background-color': '#f9f9f9',
-                        'whiteSpace': 'pre-line'
-                    }
-                ),
-                dcc.Input(
-                    id='chat-input',
-                    placeholder="Type your message here and press Enter...",
-                    style={'width': '100%', 'margin-top': '10px', 'padding': '10px'},
-                    type='text',
-                    n_submit=0  # Detect Enter key press
-                )
-            ], style={'width': '100%', 'display': 'inline-block', 'margin-top': '20px'})
+                ], style={'width': '100%', 'display': 'inline-block', 'margin-top': '20px'})
+            ])
         ])
     ])
-])
 
-# Simulate AI-based product categorization and tariff retrieval using OpenAI
-def interpret_description_with_openai(brand_name_or_category, description):
-    prompt = f"""
-    The brand or product category "{brand_name_or_category}" specializes in the following: {description}.
-    For each product category, provide the following details in the format:
-    "Product_category", "Tariff Applied", "Country", "Comments related to the tariffs".
-    Ensure the response is structured as a table with one row per product category.
+
+# Brand bar chart, drawn in the browser from the business-unit-aggregates store.
+# Also sends the details table back to its first page.
+clientside_callback(
     """
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are an assistant that extracts product categories and retrieves tariff information."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=300,
-        temperature=0.7
-    )
-    print("Raw OpenAI Response:", response)  # Log the raw response
-
-    # Parse the response
-    results = response['choices'][0]['message']['content'].strip().split("\n")
-    structured_data = []
-    for result in results:
-        parts = result.split(",")  # Split by comma
-        if len(parts) == 4:
-            structured_data.append({
-                "product": parts[0].strip(),
-                "tariff": parts[1].strip(),
-                "country": parts[2].strip(),
-                "comments": parts[3].strip()
-            })
-    return structured_data
-
-# Callback to update the brand bar chart and brand details table
-@app.callback(
+    function(businessUnit, aggregates, layout) {
+        const unit = businessUnit && aggregates ? aggregates[businessUnit] : null;
+        if (!unit) {
+            return [{}, 0];
+        }
+        const colors = layout.template.layout.colorway;
+        const data = unit.brand_name.map((name, i) => ({
+            type: 'bar',
+            name: name,
+            x: [name],
+            y: [unit.brand_revenue_USD[i]],
+            text: [unit.brand_revenue_USD[i]],
+            texttemplate: '%{text:.2s}',
+            textposition: 'outside',
+            marker: {color: colors[i % colors.length]},
+            legendgroup: name,
+            offsetgroup: name,
+            alignmentgroup: 'True',
+            showlegend: true
+        }));
+        return [{data: data, layout: layout}, 0];
+    }
+    """,
     [Output('brand-bar-chart', 'figure'),
-     Output('brand-details-table', 'data')],
-    Input('business-unit-dropdown', 'value')
+     Output('brand-details-table', 'page_current')],
+    Input('business-unit-dropdown', 'value'),
+    [State('business-unit-aggregates', 'data'),
+     State('brand-bar-chart-layout', 'data')]
 )
-def update_brand_chart_and_table(selected_business_unit):
-    if selected_business_unit:
-        filtered_brands = brand_data[brand_data['business_unit'] == selected_business_unit]
-
-        # Create the bar chart
-        bar_chart = px.bar(
-            filtered_brands.sort_values(by='brand_revenue_USD', ascending=False),
-            x='brand_name',
-            y='brand_revenue_USD',
-            title='Revenue by Brand (in Millions USD)',
-            color='brand_name',
-            text='brand_revenue_USD'
-        )
-        bar_chart.update_traces(texttemplate='%{text:.2s}', textposition='outside')
 
-        return bar_chart, filtered_brands.to_dict('records')
-
-    return {}, []
+# Callback to fill the brand details table: filtering, sorting and paging run
+# server-side so only the visible page is sent to the browser
+@callback(
+    [Output('brand-details-table', 'data'),
+     Output('brand-details-table', 'page_count')],
+    [Input('business-unit-dropdown', 'value'),
+     Input('brand-details-table', 'page_current'),
+     Input('brand-details-table', 'page_size'),
+     Input('brand-details-table', 'sort_by'),
+     Input('brand-details-table', 'filter_query')]
+)
+def update_brand_details_table(selected_business_unit, page_current, page_size, sort_by, filter_query):
+    if not selected_business_unit:
+        return [], 1
+    filtered_brands = current_data().business_unit_index.rows(selected_business_unit)
+    return query_table(
+        filtered_brands,
+        filter_query=filter_query,
+        sort_by=sort_by,
+        page_current=page_current,
+        page_size=page_size,
+        columns=BRAND_DETAILS_COLUMNS
+    )
 
-# Callback to update baseline metrics
-@app.callback(
+# Baseline metrics card, rendered in the browser from the business-unit-aggregates store
+clientside_callback(
+    """
+    function(businessUnit, aggregates) {
+        const P = text => ({namespace: 'dash_html_components', type: 'P', props: {children: text}});
+        const unit = businessUnit && aggregates ? aggregates[businessUnit] : null;
+        if (!unit) {
+            return P("Select a Business Unit to view baseline metrics.");
+        }
+        const usd = value => '$' + value.toLocaleString('en-US', {minimumFractionDigits: 2, maximumFractionDigits: 2});
+        return [
+            P("Current Revenue: " + usd(unit.revenue)),
+            P("Baseline Profit Margin: " + (unit.revenue ? Math.round(unit.baseline_profit / unit.revenue * 100) : 0) + "%"),
+            P("Baseline COGS: " + usd(unit.baseline_cogs)),
+            P("Tariff Trade Costs: " + usd(unit.tariff_trade_costs))
+        ];
+    }
+    """,
     Output('baseline-card', 'children'),
-    Input('business-unit-dropdown', 'value')
+    Input('business-unit-dropdown', 'value'),
+    State('business-unit-aggregates', 'data')
 )
-def update_baseline_metrics(selected_business_unit):
-    if selected_business_unit:
-        filtered_brands = brand_data[brand_data['business_unit'] == selected_business_unit]
-        total_revenue = filtered_brands['brand_revenue_USD'].sum()
-        baseline_profit = total_revenue * 0.5
-        baseline_cogs = total_revenue - baseline_profit
-        tariff_trade_costs = baseline_cogs * 0.45  # 45% of COGS is tariff trade costs
-
-        return html.Div([
-            html.P(f"Current Revenue: ${total_revenue:,.2f}"),
-            html.P(f"Baseline Profit Margin: 50%"),
-            html.P(f"Baseline COGS: ${baseline_cogs:,.2f}"),
-            html.P(f"Tariff Trade Costs: ${tariff_trade_costs:,.2f}")
-        ])
-
-    return html.Div([
-        html.P("Select a Business Unit to view baseline metrics.")
-    ])
 
 # Callback to simulate tariff impact
-@app.callback(
+@callback(
     [Output('profit-impact-bar-chart-main', 'figure'),
      Output('cogs-pie-chart-main', 'figure'),
      Output('profit-margin-line-chart-main', 'figure')],
@@ -247,229 +665,806 @@ def update_baseline_metrics(selected_business_unit):
      State('business-unit-dropdown', 'value')]
 )
 def simulate_tariff_impact(n_clicks, tariff_increase, selected_business_unit):
+    from figures import cogs_pie_patch, profit_impact_patch, profit_margin_patch
+
     if n_clicks > 0 and tariff_increase and selected_business_unit:
-        # Filter data for the selected business unit
-        filtered_brands = brand_data[brand_data['business_unit'] == selected_business_unit]
-        total_revenue = filtered_brands['brand_revenue_USD'].sum()
-        baseline_profit = filtered_brands['brand_revenue_USD'] * 0.5
-        baseline_cogs = filtered_brands['brand_revenue_USD'] - baseline_profit
-        tariff_trade_costs = baseline_cogs * 0.45  # 45% of COGS is tariff trade costs
-
-        # Scenario calculations
-        new_tariff_trade_costs = tariff_trade_costs * (1 + tariff_increase / 100)
-        new_cogs = baseline_cogs + (new_tariff_trade_costs - tariff_trade_costs)
-        new_profit = filtered_brands['brand_revenue_USD'] - new_cogs
-
-        # Reshape data for the bar chart
-        profit_data = pd.DataFrame({
-            'Brand': filtered_brands['brand_name'],
-            'Baseline Profit': baseline_profit,
-            'New Profit': new_profit
-        }).melt(id_vars='Brand', var_name='Scenario', value_name='Profit')
-
-        # Bar Chart: Profit Impact by Brand
-        profit_impact_chart = px.bar(
-            profit_data,
-            x='Brand',
-            y='Profit',
-            color='Scenario',
-            title='Profit Impact by Brand',
-            barmode='group',
-            labels={'Profit': 'Profit (USD)', 'Scenario': 'Scenario'}
+        version = current_data().business_unit_index.versions.get(selected_business_unit)
+        names, baseline_profit, new_profit, cogs, margins = tariff_impact(version, selected_business_unit, float(tariff_increase))
+        return profit_impact_patch(names, baseline_profit, new_profit), cogs_pie_patch(cogs), profit_margin_patch(margins)
+
+    return profit_impact_patch([], [], []), cogs_pie_patch([]), profit_margin_patch([])
+
+
+# Chart data of one tariff scenario, memoized so repeated scenarios skip the computation.
+# `version` is the business unit's (BusinessUnitIndex.versions), so edits to its brands
+# are never served stale while entries of other units stay cached.
+@memoized('FIGURE_CACHE_SIZE')
+@shared_result
+def tariff_impact(version, business_unit, tariff_increase):
+    business_unit_index = current_data().business_unit_index
+    filtered_brands = business_unit_index.rows(business_unit)
+    total_revenue = business_unit_index.totals(business_unit)['revenue']
+
+    scenario = tariff_scenario(filtered_brands['brand_revenue_USD'].to_numpy(), tariff_increase)
+    baseline_margin = (scenario.baseline_profit.sum() / total_revenue) * 100
+    new_margin = (scenario.new_profit.sum() / total_revenue) * 100
+    return (
+        filtered_brands['brand_name'].tolist(),
+        scenario.baseline_profit.tolist(),
+        scenario.new_profit.tolist(),
+        [float(scenario.baseline_cogs.sum()), float(scenario.new_tariff_trade_costs.sum())],
+        [float(baseline_margin), float(new_margin)]
+    )
+
+# Callback to sweep a range of tariff increases across all business units
+@callback(
+    [Output('tariff-sensitivity-chart', 'figure'),
+     Output('break-even-table', 'data')],
+    [Input('run-sweep-button', 'n_clicks')],
+    [State('sweep-max-input', 'value'),
+     State('sweep-step-input', 'value')]
+)
+def run_tariff_sensitivity_sweep(n_clicks, max_increase, step):
+    import plotly.express as px
+
+    from figures import trim_floats
+
+    if n_clicks > 0 and max_increase and step and step > 0:
+        # Brand x tariff grid evaluated in one broadcast, then summed per business unit
+        data = current_data()
+        business_units = data.business_unit_index.business_units
+        assigned = data.business_unit_index.codes >= 0
+        codes = data.business_unit_index.codes[assigned]
+        revenue = data.brands['brand_revenue_USD'].to_numpy(dtype=float)[assigned]
+        increases = tariff_grid(0, max_increase, step)
+        unit_sweep = sweep_by_group(tariff_sweep(revenue, increases), codes, len(business_units))
+
+        sensitivity_data = pd.DataFrame({
+            'Business Unit': np.repeat(business_units, len(increases)),
+            'Tariff Increase (%)': trim_floats(np.tile(increases, len(business_units))),
+            'Profit Margin (%)': trim_floats(unit_sweep.margin.ravel())
+        })
+        sensitivity_chart = px.line(
+            sensitivity_data,
+            x='Tariff Increase (%)',
+            y='Profit Margin (%)',
+            color='Business Unit',
+            title='Profit Margin Sensitivity to Tariff Increase'
         )
+        sensitivity_chart.add_hline(y=0, line_dash='dash', line_color='grey')
+
+        break_even = break_even_tariff_increase(unit_sweep.revenue)
+        break_even_data = [
+            {
+                'business_unit': unit,
+                'revenue': round(float(unit_revenue), 2),
+                'break_even': round(float(level), 1) if np.isfinite(level) else "n/a"
+            }
+            for unit, unit_revenue, level in zip(business_units, unit_sweep.revenue, break_even)
+        ]
+
+        return sensitivity_chart, break_even_data
+
+    return {}, []
+
+# Render Monte Carlo profit bands: P50 bars with P5-P95 error bars, plus a
+# summary line for the total
+def monte_carlo_outputs(names, bands, entity_label):
+    import plotly.express as px
+
+    from figures import trim_floats
+
+    profit = bands.profit[:-1]
+    band_data = pd.DataFrame({
+        entity_label: names,
+        'P50 Profit': trim_floats(profit[:, 1]),
+        'Upside': trim_floats(profit[:, 2] - profit[:, 1]),
+        'Downside': trim_floats(profit[:, 1] - profit[:, 0])
+    })
+    band_chart = px.bar(
+        band_data,
+        x=entity_label,
+        y='P50 Profit',
+        error_y='Upside',
+        error_y_minus='Downside',
+        title=f'Profit by {entity_label} (P50 with P5-P95 band)',
+        labels={'P50 Profit': 'Profit (USD)'}
+    )
+
+    total_profit = bands.profit[-1]
+    total_margin = bands.margin[-1]
+    summary = html.Div([
+        html.P(f"Draws: {bands.draws:,} of {bands.total_draws:,}"),
+        html.P(f"Total Profit P5 / P50 / P95: ${total_profit[0]:,.2f} / ${total_profit[1]:,.2f} / ${total_profit[2]:,.2f}"),
+        html.P(f"Profit Margin P5 / P50 / P95: {total_margin[0]:.1f}% / {total_margin[1]:.1f}% / {total_margin[2]:.1f}%")
+    ])
+    return band_chart, summary
 
-        # Pie Chart: COGS Breakdown
-        cogs_pie_chart = px.pie(
-            values=[baseline_cogs.sum(), new_tariff_trade_costs.sum()],
-            names=['Baseline COGS', 'Increased Tariff Costs'],
-            title='COGS Breakdown'
+
+# Shown instead of a Monte Carlo run when every simulation slot stays busy
+MONTE_CARLO_BUSY_MESSAGE = "Too many simulations are running right now; please try again shortly."
+
+
+# Stream converging Monte Carlo estimates to the progress outputs, at most a
+# few times per second, and return the final bands
+def stream_monte_carlo(set_progress, names, entity_label, model, revenue, n_draws):
+    last_update = 0.0
+    bands = None
+    settings = current_state().settings
+    runs = run_monte_carlo(
+        model, revenue, n_draws, max_workers=settings['MC_MAX_WORKERS'], batch_cells=settings['MC_BATCH_CELLS'],
+        parallel_cells=settings['MC_PARALLEL_CELLS']
+    )
+    for bands in runs:
+        if bands.draws < n_draws and time.monotonic() - last_update > 0.5:
+            set_progress(monte_carlo_outputs(names, bands, entity_label))
+            last_update = time.monotonic()
+    return monte_carlo_outputs(names, bands, entity_label)
+
+
+# Callback to run the Monte Carlo tariff simulation for the selected business unit
+@callback(
+    [Output('mc-profit-band-chart', 'figure'),
+     Output('mc-summary', 'children')],
+    [Input('run-monte-carlo-button', 'n_clicks')],
+    [State('business-unit-dropdown', 'value'),
+     State('tariff-increase-input', 'value'),
+     State('mc-draws-input', 'value'),
+     State('mc-tariff-spread-input', 'value'),
+     State('mc-share-low-input', 'value'),
+     State('mc-share-high-input', 'value')],
+    background=True,
+    progress=[Output('mc-profit-band-chart', 'figure'), Output('mc-summary', 'children')],
+    running=[(Output('run-monte-carlo-button', 'disabled'), True, False)],
+    cancel=[Input('business-unit-dropdown', 'value')]
+)
+def simulate_tariff_monte_carlo(set_progress, n_clicks, selected_business_unit, tariff_increase, n_draws,
+                                tariff_spread, share_low, share_high):
+    from background_jobs import WorkerBusyError, worker_slot
+
+    if n_clicks > 0 and tariff_increase and selected_business_unit and n_draws:
+        filtered_brands = current_data().business_unit_index.rows(selected_business_unit)
+        spread = (tariff_spread or 0) / 100
+        model = BrandTariffModel(
+            len(filtered_brands),
+            tariff_increase=(tariff_increase * (1 - spread), tariff_increase, tariff_increase * (1 + spread)),
+            tariff_share=((share_low or 0) / 100, (share_high or 0) / 100)
         )
+        try:
+            with worker_slot('monte_carlo'):
+                return stream_monte_carlo(
+                    set_progress, filtered_brands['brand_name'].tolist(), 'Brand', model,
+                    filtered_brands['brand_revenue_USD'].to_numpy(), int(n_draws)
+                )
+        except WorkerBusyError:
+            return {}, MONTE_CARLO_BUSY_MESSAGE
+
+    return {}, ""
 
-        # Line Chart: Profit Margin Change
-        baseline_margin = (baseline_profit.sum() / total_revenue) * 100
-        new_margin = (new_profit.sum() / total_revenue) * 100
-        profit_margin_chart = px.line(
-            x=['Baseline', 'New'],
-            y=[baseline_margin, new_margin],
-            title='Profit Margin Change',
-            labels={'x': 'Scenario', 'y': 'Profit Margin (%)'}
+
+# Callback to run the Monte Carlo tariff simulation for competitors
+@callback(
+    [Output('competitor-mc-profit-band-chart', 'figure'),
+     Output('competitor-mc-summary', 'children')],
+    [Input('run-competitor-monte-carlo-button', 'n_clicks')],
+    [State('competitor-tariff-increase-input', 'value'),
+     State('competitor-country-tariffs-table', 'data'),
+     State('competitor-mc-draws-input', 'value'),
+     State('competitor-mc-tariff-spread-input', 'value'),
+     State('competitor-mc-import-spread-input', 'value')],
+    background=True,
+    progress=[Output('competitor-mc-profit-band-chart', 'figure'), Output('competitor-mc-summary', 'children')],
+    running=[(Output('run-competitor-monte-carlo-button', 'disabled'), True, False)]
+)
+def simulate_competitor_tariff_monte_carlo(set_progress, n_clicks, tariff_increase, country_tariffs, n_draws,
+                                           tariff_spread, import_spread):
+    from background_jobs import WorkerBusyError, worker_slot
+
+    tariffs_by_country = {row['country']: row['tariff'] for row in country_tariffs or [] if row.get('tariff')}
+    if tariff_increase:
+        tariffs_by_country['China'] = tariff_increase
+
+    if n_clicks > 0 and tariffs_by_country and n_draws:
+        data = current_data()
+        model = CompetitorTariffModel(
+            data.exposure.matrix,
+            data.exposure.tariff_vector(tariffs_by_country),
+            tariff_spread=(tariff_spread or 0) / 100,
+            import_spread=(import_spread or 0) / 100
         )
+        try:
+            with worker_slot('monte_carlo'):
+                return stream_monte_carlo(
+                    set_progress, data.competitors['competitor_name'].tolist(), 'Competitor', model,
+                    data.competitors['revenue_usd'].to_numpy(), int(n_draws)
+                )
+        except WorkerBusyError:
+            return {}, MONTE_CARLO_BUSY_MESSAGE
 
-        return profit_impact_chart, cogs_pie_chart, profit_margin_chart
+    return {}, ""
 
-    return {}, {}, {}
 
 # Callback to update OpenAI Tariff Table
-@app.callback(
+# Re-selecting a business unit while a lookup is running terminates the old job
+@callback(
     Output('openai-tariff-table', 'data'),
-    Input('business-unit-dropdown', 'value')
+    Input('business-unit-dropdown', 'value'),
+    background=True,
+    running=[(Output('openai-tariff-status', 'children'), "Fetching tariff data from OpenAI...", "")]
 )
 def update_openai_tariff_table(selected_business_unit):
+    from background_jobs import WorkerBusyError, worker_slot
+    from llm_client import LLM_TIMEOUT, last_good_result, save_good_result
+    from tariff_lookup import brand_items, lookup_tariffs
+
     if selected_business_unit:
-        # Get the products for the selected business unit
-        filtered_brands = brand_data[brand_data['business_unit'] == selected_business_unit]
-        products = filtered_brands['description'].tolist()
-
-        # Combine product descriptions into a single prompt
-        prompt = f"""
-        You are an expert on trade tariffs between China and the USA. Look for each of these products:
-        {', '.join(products)}.
-        Provide the tariff trade applied (cumulative) for each product in the format:
-        "Category, Tariff Applied".
-        If you don't find anything, reply "9999".
-        """
-
-        # Query OpenAI
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an assistant that provides trade tariff information."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=300,
-            temperature=0.7
-        )
-        print("Raw OpenAI Response:", response)  # Log the raw response
+        data = current_data()
+        filtered_brands = data.business_unit_index.rows(selected_business_unit)
+        brand_names = dict(zip(filtered_brands['brand_id'].astype(str), filtered_brands['brand_name']))
 
-        # Parse the OpenAI response
-        results = response['choices'][0]['message']['content'].strip().split("\n")
-        tariff_data = []
+        # Batched, concurrent lookups with JSON-structured replies, abandoned after LLM_TIMEOUT
+        # (counted from the wait for a worker slot). Brands whose description is close to
+        # one resolved before reuse its answer
+        try:
+            with worker_slot(timeout=LLM_TIMEOUT) as remaining:
+                results = lookup_tariffs(
+                    brand_items(filtered_brands), index=data.description_index, deadline=remaining
+                )
+        except WorkerBusyError as exc:
+            logger.warning("Tariff lookup skipped: %s", exc)
+            results = []
+        rows_by_brand = {}
         for result in results:
-            parts = result.split(",")  # Split by comma
-            if len(parts) == 2:
-                tariff_data.append({
-                    "category": parts[0].strip(),
-                    "tariff": parts[1].strip()
-                })
+            rows_by_brand.setdefault(brand_names[result['id']], []).append(
+                {"brand": brand_names[result['id']], "category": result['category'], "tariff": result['tariff']}
+            )
 
-        # Log the parsed data for debugging
-        print("Parsed Tariff Data:", tariff_data)
+        key = f'openai-tariff-table:{selected_business_unit}'
+        if len(rows_by_brand) == len(set(brand_names.values())):
+            tariff_data = [row for rows in rows_by_brand.values() for row in rows]
+            save_good_result(key, tariff_data)
+            return tariff_data
 
-        return tariff_data
+        # Brands left without an answer (OpenAI slow, failing or paused by the circuit
+        # breaker, or no worker slot free) keep their rows from the last complete table, or get a placeholder
+        previous = {}
+        for row in last_good_result(key) or []:
+            previous.setdefault(row['brand'], []).append(row)
+        return [
+            row
+            for brand in dict.fromkeys(brand_names.values())
+            for row in (
+                rows_by_brand.get(brand) or previous.get(brand)
+                or [{"brand": brand, "category": "", "tariff": "Unavailable, retry later"}]
+            )
+        ]
 
     return []
 
 # Callback to simulate competitor tariff impact
-@app.callback(
+@callback(
     [Output('competitor-profit-impact-bar-chart', 'figure')],
     [Input('apply-competitor-scenario-button', 'n_clicks')],
-    [State('competitor-tariff-increase-input', 'value')]
+    [State('competitor-tariff-increase-input', 'value'),
+     State('competitor-country-tariffs-table', 'data')]
 )
-def simulate_competitor_tariff_impact(n_clicks, tariff_increase):
-    if n_clicks > 0 and tariff_increase:
-        # Filter supply chain data for China
-        china_supply_chain = supply_chain_data[supply_chain_data['competitor_supplier_country'] == 'China']
-
-        # Merge competitors data with filtered supply chain data
-        competitors = competitors_data.merge(
-            china_supply_chain[['competitor_name', 'Proportion_imports']],
-            on='competitor_name',
-            how='left'
-        )
+def simulate_competitor_tariff_impact(n_clicks, tariff_increase, country_tariffs):
+    from figures import profit_impact_patch
+
+    tariffs_by_country = {row['country']: row['tariff'] for row in country_tariffs or [] if row.get('tariff')}
+    if tariff_increase:
+        tariffs_by_country['China'] = tariff_increase
+
+    if n_clicks > 0 and tariffs_by_country:
+        version = current_data().version_of('competitors', 'supply_chain')
+        tariffs = tuple(sorted((country, float(tariff)) for country, tariff in tariffs_by_country.items()))
+        return [profit_impact_patch(*competitor_tariff_impact(version, tariffs))]
+
+    return [profit_impact_patch([], [], [])]
+
+
+# Competitor names with baseline and new profit for one set of country tariffs
+# (memoized per version of the competitor sources, so brand edits keep it cached)
+@memoized('FIGURE_CACHE_SIZE')
+@shared_result
+def competitor_tariff_impact(version, tariffs):
+    data = current_data()
+
+    # Weighted tariff increase per competitor from the precompiled
+    # competitor x supplier-country import share matrix
+    exposure = data.exposure.tariff_exposure(data.exposure.tariff_vector(dict(tariffs)))
+    scenario = competitor_tariff_scenario(data.competitors['revenue_usd'].to_numpy(), exposure)
+    return (
+        data.competitors['competitor_name'].tolist(),
+        scenario.baseline_profit.tolist(),
+        scenario.new_profit.tolist()
+    )
+
+# Tariff schedule table: add a period (copying the last one) or load a saved schedule
+clientside_callback(
+    """
+    function(addClicks, scheduleName, rows, saved) {
+        const triggered = dash_clientside.callback_context.triggered.map(t => t.prop_id);
+        if (triggered.includes('tariff-schedule-dropdown.value')) {
+            return scheduleName && saved && saved[scheduleName] ? saved[scheduleName] : dash_clientside.no_update;
+        }
+        if (triggered.includes('add-schedule-period-button.n_clicks') && addClicks) {
+            rows = rows || [];
+            const last = rows.length ? rows[rows.length - 1] : {};
+            return rows.concat([Object.assign({}, last, {period: 'Period ' + (rows.length + 1)})]);
+        }
+        return dash_clientside.no_update;
+    }
+    """,
+    Output('tariff-schedule-table', 'data'),
+    [Input('add-schedule-period-button', 'n_clicks'),
+     Input('tariff-schedule-dropdown', 'value')],
+    [State('tariff-schedule-table', 'data'),
+     State('saved-tariff-schedules', 'data')],
+    prevent_initial_call=True
+)
+
+# Save the schedule table under a name, in the browser's local storage
+clientside_callback(
+    """
+    function(nClicks, name, rows, saved) {
+        if (!nClicks || !name || !name.trim()) {
+            return dash_clientside.no_update;
+        }
+        return Object.assign({}, saved, {[name.trim()]: rows});
+    }
+    """,
+    Output('saved-tariff-schedules', 'data'),
+    Input('save-tariff-schedule-button', 'n_clicks'),
+    [State('tariff-schedule-name-input', 'value'),
+     State('tariff-schedule-table', 'data'),
+     State('saved-tariff-schedules', 'data')]
+)
+
+clientside_callback(
+    """
+    function(saved) {
+        return Object.keys(saved || {}).sort().map(name => ({label: name, value: name}));
+    }
+    """,
+    Output('tariff-schedule-dropdown', 'options'),
+    Input('saved-tariff-schedules', 'data')
+)
+
+# Callback to project the tariff schedule over its periods for every brand and competitor
+@callback(
+    [Output('schedule-projection-chart', 'figure'),
+     Output('schedule-projection-table', 'data')],
+    Input('tariff-schedule-table', 'data')
+)
+def update_schedule_projection(rows):
+    from figures import schedule_projection_patch
+    from projection import TariffSchedule
+
+    schedule = TariffSchedule.from_rows(rows)
+    if not schedule.periods:
+        return schedule_projection_patch([], []), []
+
+    version = current_data().version_of('brands', 'competitors', 'supply_chain')
+    series, summary = schedule_projection(version, schedule)
+    return schedule_projection_patch(schedule.periods, series), summary
+
+
+# Margin lines per business unit (plus competitors) and per-period totals of
+# one schedule. Schedules hash by content, so switching back to a schedule
+# projected before is a cache hit.
+@memoized('PROJECTION_CACHE_SIZE')
+@shared_result
+def schedule_projection(version, schedule):
+    from projection import project_schedule
+    from scenarios import sweep_total
+
+    data = current_data()
+    projection = project_schedule(data, schedule)
+    series = [
+        (unit, margins.tolist())
+        for unit, margins in zip(data.business_unit_index.business_units, projection.business_units.margin)
+    ]
+    revenue, cogs, profit, margin = sweep_total(projection.brands)
+    _, _, competitor_profit, competitor_margin = sweep_total(projection.competitors)
+    series.append(('Competitors', competitor_margin.tolist()))
+    summary = [
+        {
+            'period': period,
+            'revenue': round(float(revenue), 2),
+            'cogs': round(float(cogs[position]), 2),
+            'profit': round(float(profit[position]), 2),
+            'margin': round(float(margin[position]), 1),
+            'competitor_profit': round(float(competitor_profit[position]), 2),
+            'competitor_margin': round(float(competitor_margin[position]), 1)
+        }
+        for position, period in enumerate(projection.periods)
+    ]
+    return series, summary
+
+# Callback to compare a business unit's profit impact with that of the competitors
+# overlapping its brands, under one set of supplier-country tariffs
+@callback(
+    [Output('overlap-impact-chart', 'figure'),
+     Output('overlap-competitors-table', 'data'),
+     Output('overlap-summary', 'children')],
+    [Input('apply-overlap-scenario-button', 'n_clicks')],
+    [State('overlap-business-unit-dropdown', 'value'),
+     State('competitor-tariff-increase-input', 'value'),
+     State('competitor-country-tariffs-table', 'data')]
+)
+def simulate_overlap_impact(n_clicks, selected_business_unit, tariff_increase, country_tariffs):
+    from figures import overlap_impact_patch
+
+    tariffs_by_country = {row['country']: row['tariff'] for row in country_tariffs or [] if row.get('tariff')}
+    if tariff_increase:
+        tariffs_by_country['China'] = tariff_increase
 
-        # Convert Proportion_imports to numeric and handle non-numeric values
-        competitors['Proportion_imports'] = pd.to_numeric(competitors['Proportion_imports'], errors='coerce').fillna(0)
-
-        # Calculate baseline profit and COGS
-        competitors['baseline_profit'] = competitors['revenue_usd'] * 0.5
-        competitors['baseline_cogs'] = competitors['revenue_usd'] - competitors['baseline_profit']
-
-        # Calculate tariff costs for China (existing + scenario tariff)
-        competitors['china_tariff_cost'] = competitors['baseline_cogs'] * (competitors['Proportion_imports'] / 100) * (tariff_increase / 100)
-
-        # Calculate new COGS and profit
-        competitors['new_cogs'] = competitors['baseline_cogs'] + competitors['china_tariff_cost']
-        competitors['new_profit'] = competitors['revenue_usd'] - competitors['new_cogs']
-
-        # Reshape data for the bar chart
-        profit_data = pd.DataFrame({
-            'Competitor': competitors['competitor_name'],
-            'Baseline Profit': competitors['baseline_profit'],
-            'New Profit': competitors['new_profit']
-        }).melt(id_vars='Competitor', var_name='Scenario', value_name='Profit')
-
-        # Bar Chart: Profit Impact by Competitor
-        profit_impact_chart = px.bar(
-            profit_data,
-            x='Competitor',
-            y='Profit',
-            color='Scenario',
-            title='Profit Impact by Competitor',
-            barmode='group',
-            labels={'Profit': 'Profit (USD)', 'Scenario': 'Scenario'}
+    if n_clicks > 0 and selected_business_unit:
+        data = current_data()
+        version = (
+            data.business_unit_index.versions.get(selected_business_unit),
+            data.version_of('competitors', 'supply_chain')
         )
+        tariffs = tuple(sorted((country, float(tariff)) for country, tariff in tariffs_by_country.items()))
+        brand_names, brand_changes, competitor_rows, summary = overlap_impact(
+            version, selected_business_unit, tariffs
+        )
+        chart = overlap_impact_patch(
+            brand_names, brand_changes,
+            [row['competitor'] for row in competitor_rows], [row['profit_change'] for row in competitor_rows]
+        )
+        return chart, competitor_rows, summary
+
+    return overlap_impact_patch([], [], [], []), [], ""
+
+
+# Profit change (%) per entry, NaN where there is no baseline profit
+def _profit_change(baseline_profit, new_profit):
+    return np.divide(
+        (new_profit - baseline_profit) * 100, baseline_profit,
+        out=np.full(np.shape(baseline_profit), np.nan), where=baseline_profit != 0
+    )
+
+
+# Brand and overlapping competitor results of one business unit and set of
+# country tariffs (memoized per version of the unit and of the competitor
+# sources). Overlapping competitors come from the brand -> competitor index and
+# only their rows of the exposure matrix are used.
+@memoized('FIGURE_CACHE_SIZE')
+def overlap_impact(version, business_unit, tariffs):
+    data = current_data()
+    brand_positions = data.business_unit_index.positions.get(business_unit, np.empty(0, dtype=int))
+    brands = data.brands.iloc[brand_positions]
+    brand_scenario = tariff_scenario(brands['brand_revenue_USD'].to_numpy(), dict(tariffs).get('China', 0))
 
-        return [profit_impact_chart]
+    competitor_positions = data.competition.competitors_of(brand_positions)
+    exposure = data.exposure.matrix[competitor_positions] @ data.exposure.tariff_vector(dict(tariffs))
+    revenue = data.competitors['revenue_usd'].to_numpy(dtype=float)[competitor_positions]
+    competitor_scenario = competitor_tariff_scenario(revenue, exposure)
+    competitor_changes = _profit_change(competitor_scenario.baseline_profit, competitor_scenario.new_profit)
 
-    return [{}]
+    brand_names = data.brands['brand_name'].to_numpy()
+    competitor_names = data.competitors['competitor_name'].to_numpy()[competitor_positions]
+    overlaps = data.competition.overlapping_brands(competitor_positions, brand_positions)
+    competitor_rows = [
+        {
+            'competitor': name,
+            'brands': ', '.join(brand_names[overlap]),
+            'revenue': round(float(revenue[position]), 2),
+            'baseline_profit': round(float(competitor_scenario.baseline_profit[position]), 2),
+            'new_profit': round(float(competitor_scenario.new_profit[position]), 2),
+            'profit_change': round(float(competitor_changes[position]), 1)
+        }
+        for position, (name, overlap) in enumerate(zip(competitor_names, overlaps))
+    ]
 
-# Callback to find alternative suppliers
-@app.callback(
-    Output('radar-chart', 'figure'),
-    Input('apply-scenario-button', 'n_clicks')
+    lines = []
+    for label, scenario in (
+        (f"{business_unit} ({len(brands)} brands)", brand_scenario),
+        (f"Overlapping competitors ({len(competitor_positions)})", competitor_scenario)
+    ):
+        baseline_profit, new_profit = scenario.baseline_profit.sum(), scenario.new_profit.sum()
+        change = _profit_change(baseline_profit, new_profit)
+        lines.append(html.P(
+            f"{label}: profit ${baseline_profit:,.2f} -> ${new_profit:,.2f} ({change:+.1f}%)"
+        ))
+    return (
+        brands['brand_name'].tolist(),
+        np.round(_profit_change(brand_scenario.baseline_profit, brand_scenario.new_profit), 1).tolist(),
+        competitor_rows,
+        html.Div(lines)
+    )
+
+# Callback to find alternative suppliers for every brand in the catalog. Only
+# product categories not resolved before (or close to one that was) reach the LLM.
+@callback(
+    Output('alternative-suppliers-table', 'data'),
+    Input('apply-scenario-button', 'n_clicks'),
+    background=True
 )
 def find_alternative_suppliers(n_clicks):
+    from background_jobs import WorkerBusyError, worker_slot
+    from llm_client import LLM_TIMEOUT
+    from tariff_lookup import brand_items, lookup_alternative_suppliers
+
     if n_clicks > 0:
-        # Combine product and brand descriptions into a single prompt
-        products_and_brands = brand_data[['brand_name', 'description']].drop_duplicates()
-        prompt = "You are an expert in global trade. Suggest alternative suppliers for the following products and brands currently sourced from China:\n"
-        for _, row in products_and_brands.iterrows():
-            prompt += f"- {row['brand_name']}: {row['description']}\n"
-
-        # Query OpenAI
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an assistant that provides alternative supplier recommendations."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=500,
-            temperature=0.7
-        )
-        print("Raw OpenAI Response:", response)  # Log the raw response
+        data = current_data()
+        brand_data = data.brands[['brand_id', 'brand_name', 'description']].drop_duplicates('brand_id')
+        brand_names = dict(zip(brand_data['brand_id'].astype(str), brand_data['brand_name']))
 
-        # Parse the OpenAI response
-        results = response['choices'][0]['message']['content'].strip().split("\n")
-        supplier_data = []
-        for result in results:
-            supplier_data.append({"Alternative Supplier": result.strip()})
-
-        # Create a radar chart (or table if preferred)
-        radar_chart = px.bar(
-            pd.DataFrame(supplier_data),
-            x="Alternative Supplier",
-            y=[1] * len(supplier_data),  # Dummy values for visualization
-            title="Alternative Suppliers for Products and Brands",
-            labels={"y": "Relevance"}
-        )
+        try:
+            with worker_slot(timeout=LLM_TIMEOUT) as remaining:
+                results = lookup_alternative_suppliers(
+                    brand_items(brand_data), index=data.description_index, deadline=remaining
+                )
+        except WorkerBusyError as exc:
+            logger.warning("Supplier lookup skipped: %s", exc)
+            results = []
+        # Brands left without an answer get a placeholder, as in the tariff table
+        answered = {result['id'] for result in results}
+        return [
+            {"brand": brand_names[result['id']], "category": result['category'], "suppliers": result['suppliers']}
+            for result in results
+        ] + [
+            {"brand": brand_name, "category": "", "suppliers": "Unavailable, retry later"}
+            for brand_id, brand_name in brand_names.items() if brand_id not in answered
+        ]
 
-        return radar_chart
+    return []
 
-    return {}
 
-# Callback for relocation recommendations
-@app.callback(
+# Relocation scores of the selected brand: radar chart of the best countries
+# and the full ranking, recomputed locally whenever a weight changes
+@callback(
+    [Output('relocation-radar-chart', 'figure'),
+     Output('relocation-ranking-table', 'data')],
+    [Input('relocation-brand-dropdown', 'value'),
+     Input({'type': 'relocation-weight', 'criterion': ALL}, 'value')]
+)
+def update_relocation_scores(selected_brand, weights):
+    from figures import relocation_radar_patch
+
+    ranking, criterion_scores = relocation_ranking(selected_brand, weights)
+    return (
+        relocation_radar_patch(
+            list(CRITERIA.values()), ranking[:RELOCATION_TOP_COUNTRIES],
+            criterion_scores[:RELOCATION_TOP_COUNTRIES], RELOCATION_TOP_COUNTRIES
+        ),
+        [{'country': country, 'score': round(score, 2)} for country, score in ranking]
+    )
+
+
+# Countries ranked for one brand ([(country, score), ...] best first) and the
+# 0-10 criterion scores of each ranked country. `weights` are the slider values
+# in CRITERIA order.
+def relocation_ranking(selected_brand, weights):
+    data = current_data()
+    position = data.relocation.brand_position(selected_brand)
+    if position is None:
+        return [], []
+    weights = tuple(float(weight or 0) for weight in weights or DEFAULT_WEIGHTS.values())
+    ranking = data.relocation.ranking(relocation_scores(data.index_versions['relocation'], weights)[position])
+    countries = data.relocation_countries.set_index('country')[list(CRITERIA)]
+    return ranking, countries.loc[[country for country, _ in ranking]].to_numpy().tolist()
+
+
+# Brand x country score matrix for one set of weights, memoized per version of
+# the relocation index (rebuilt only when brand names, descriptions or countries change)
+@memoized('RELOCATION_CACHE_SIZE')
+def relocation_scores(version, weights):
+    return current_data().relocation.scores(dict(zip(CRITERIA, weights)))
+
+
+# Callback for relocation recommendations: the ranking comes from the scoring
+# engine; OpenAI only writes a narrative around it when the toggle is on
+@callback(
     Output('relocation-conclusion', 'children'),
-    Input('relocation-brand-dropdown', 'value')
+    [Input('relocation-brand-dropdown', 'value'),
+     Input('relocation-narrative-toggle', 'value')],
+    State({'type': 'relocation-weight', 'criterion': ALL}, 'value'),
+    background=True,
+    running=[(Output('relocation-status', 'children'), "Generating relocation analysis...", "")]
 )
-def relocation_recommendations(selected_brand):
+def relocation_recommendations(selected_brand, narrative, weights):
+    from background_jobs import WorkerBusyError, worker_slot
+    from circuit_breaker import CircuitOpenError
+    from llm_client import LLM_TIMEOUT, UPSTREAM_ERRORS, chat_completion
+
+    if not selected_brand:
+        return "Please select a brand to view relocation recommendations."
+
+    ranking, _ = relocation_ranking(selected_brand, weights)
+    top_countries = ', '.join(f"{country} ({score:.1f})" for country, score in ranking[:RELOCATION_TOP_COUNTRIES])
+    summary = f"Best relocation targets for {selected_brand} (weighted score out of 10): {top_countries}."
+    if 'llm' not in (narrative or []):
+        return summary
+
+    brand_data = current_data().brands
+    criteria = '\n    '.join(f"- {label}" for label in CRITERIA.values())
+
+    # Prompt for OpenAI
+    prompt = f"""
+    You are an experienced Supply chain manager, working at Revelyst Group (1.2B revenues, 49% dependency on China suppliers).
+    For the brand "{selected_brand}", analyze relocation alternatives for the following product categories:
+    {', '.join(brand_data[brand_data['brand_name'] == selected_brand]['description'].tolist())}.
+    Our scoring model ranks these countries highest (weighted score out of 10): {top_countries}.
+    Use the following criteria:
+    {criteria}
+    Provide a detailed analysis for each criterion.
+    """
+    try:
+        # The wait for a worker slot counts against the call's deadline
+        with worker_slot(timeout=LLM_TIMEOUT) as remaining:
+            response = chat_completion(
+                timeout=remaining,
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": "You are an assistant that provides supply chain relocation analysis."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=800,
+                temperature=0.7
+            )
+    except (CircuitOpenError, WorkerBusyError) + UPSTREAM_ERRORS as exc:
+        logger.warning("Relocation narrative unavailable: %s", exc)
+        return summary + "\n\nThe OpenAI narrative is unavailable right now; please try again later."
+    return summary + "\n\n" + response['choices'][0]['message']['content'].strip()
+
+
+# Chat history rendered as message bubbles for chat-container
+def render_chat(history, pending_message=None, partial_reply=None):
+    bubbles = [
+        html.Div(
+            f"{'You' if message['role'] == 'user' else 'Agent'}: {message['content']}",
+            style={'margin-bottom': '10px'}
+        )
+        for message in history
+    ]
+    if pending_message is not None:
+        bubbles.append(html.Div(f"You: {pending_message}", style={'margin-bottom': '10px'}))
+        bubbles.append(html.Div(f"Agent: {partial_reply or '...'}", style={'margin-bottom': '10px'}))
+    return bubbles
+
+
+# Show the session's conversation when the page (re)loads
+@callback(
+    Output('chat-container', 'children', allow_duplicate=True),
+    Input('session-id', 'data'),
+    prevent_initial_call='initial_duplicate'
+)
+def restore_chat(session_id):
+    return render_chat(current_state().session_store.get(session_id, 'chat_history', []))
+
+
+# Callback for the relocation chat: the reply streams into chat-container as tokens arrive.
+# The conversation is kept server-side under the session id, bounded by chat.append_exchange.
+@callback(
+    [Output('chat-container', 'children'),
+     Output('chat-input', 'value')],
+    Input('chat-input', 'n_submit'),
+    [State('chat-input', 'value'),
+     State('session-id', 'data'),
+     State('relocation-brand-dropdown', 'value')],
+    background=True,
+    interval=200,
+    progress=Output('chat-container', 'children'),
+    running=[(Output('chat-input', 'disabled'), True, False)],
+    prevent_initial_call=True
+)
+def chat_with_agent(set_progress, n_submit, message, session_id, selected_brand):
+    from background_jobs import WorkerBusyError, worker_slot
+    from chat import append_exchange, brand_context, build_messages, stream_chat
+    from circuit_breaker import CircuitOpenError
+    from llm_client import LLM_TIMEOUT, UPSTREAM_ERRORS
+
+    session_store = current_state().session_store
+    history = session_store.get(session_id, 'chat_history', [])
+    if not message or not message.strip():
+        return render_chat(history), ""
+
+    message = message.strip()
+    set_progress(render_chat(history, message))
+
+    context = None
     if selected_brand:
-        # Prompt for OpenAI
-        prompt = f"""
-        You are an experienced Supply chain manager, working at Revelyst Group (1.2B revenues, 49% dependency on China suppliers).
-        For the brand "{selected_brand}", analyze relocation alternatives for the following product categories:
-        {', '.join(brand_data[brand_data['brand_name'] == selected_brand]['description'].tolist())}.
-        Use the following criteria:
-        - Supplier Complexity Fit
-        - Key Components & Skills
-        - Country Location & Logistics
-        - Operating & Labor Costs
-        - Transport Costs & Time
-        - Tariffs & Trade Agreements with USA
-        - Time to Move & Investments
-        Provide a detailed analysis for each criterion.
-        """
-        # Add logic to process the prompt with OpenAI here
-        return "Relocation analysis generated."
-
-    return "Please select a brand to view relocation recommendations."
+        brand_data = current_data().brands
+        context = brand_context(brand_data[brand_data['brand_name'] == selected_brand])
+
+    reply = ""
+    last_update = time.monotonic()
+    try:
+        # The wait for a worker slot counts against the reply's deadline
+        with worker_slot(timeout=LLM_TIMEOUT) as remaining:
+            for token in stream_chat(build_messages(history, message, context), timeout=remaining):
+                reply += token
+                # Push partial replies a few times per second; the page polls every 200 ms
+                if time.monotonic() - last_update > 0.1:
+                    set_progress(render_chat(history, message, reply))
+                    last_update = time.monotonic()
+    except (CircuitOpenError, WorkerBusyError) + UPSTREAM_ERRORS as exc:
+        # Keep whatever arrived before the deadline or failure
+        logger.warning("Chat reply unavailable: %s", exc)
+        reply += "\n[The assistant is unavailable right now; please try again shortly.]"
+
+    history = append_exchange(history, message, reply.strip())
+    session_store.set(session_id, 'chat_history', history)
+    return render_chat(history), ""
+
+
+# Build the Dash app. `config` maps the per-app setting names of app_settings
+# (e.g. DATA_DIR, FIGURE_CACHE_SIZE, SESSION_STORE_URL) to values; they override
+# the environment for this app only. Serve `create_app().server` with WSGI.
+def create_app(config=None):
+    global _last_state
+    started = time.perf_counter()
+    state = _last_state = AppState(app_settings(config or {}))
+
+    from background_jobs import background_callback_manager
+    from metrics import instrument_callback, record_payload
+    from profiling import install_profiling
+    from serialization import install_compression, install_fast_json
+
+    # LLM-backed callbacks run as background jobs so they never block a request thread
+    app = Dash(__name__, suppress_callback_exceptions=True, background_callback_manager=background_callback_manager)
+    app.server.config.update(state.settings)
+    app.server.extensions['app_state'] = state
+
+    # First of the before_request hooks: Dash's own may already build the layout
+    def use_app_state():
+        _current_state.set(state)
+
+    app.server.before_request_funcs.setdefault(None, []).insert(0, use_app_state)
+
+    app.server.add_url_rule('/llm-cache/stats', view_func=llm_cache_stats)
+    app.server.add_url_rule('/metrics', view_func=prometheus_metrics)
+    app.layout = serve_layout
+
+    # Callbacks record their wall time and errors; response sizes are recorded
+    # per callback from the Dash update requests
+    callback_names = {}
+    for func, args, kwargs in CALLBACKS:
+        registered = set(app.callback_map)
+        app.callback(*args, **kwargs)(instrument_callback(func))
+        callback_names.update(dict.fromkeys(set(app.callback_map) - registered, func.__name__))
+    for args, kwargs in CLIENTSIDE_CALLBACKS:
+        app.clientside_callback(*args, **kwargs)
+
+    # Startup timings: module imports, app construction, and (once served)
+    # time from the start of the import to the first response
+    timings = {
+        'import_seconds': started - IMPORT_STARTED,
+        'create_app_seconds': time.perf_counter() - started
+    }
+    app.server.config['STARTUP_TIMINGS'] = timings
+    print(f"Startup: imports {timings['import_seconds']:.3f}s, create_app {timings['create_app_seconds']:.3f}s")
+
+    @app.server.after_request
+    def record_callback_payload(response):
+        if request.path.endswith('/_dash-update-component') and response.status_code == 200:
+            output = (request.get_json(silent=True) or {}).get('output')
+            if output in callback_names:
+                sent = response.content_length or 0
+                record_payload(callback_names[output], g.get('uncompressed_bytes', sent), sent)
+        return response
+
+    # Registered after the payload metrics so it runs before them (Flask runs
+    # after_request hooks in reverse order)
+    install_fast_json(app.server)
+    install_compression(app.server)
+
+    install_profiling(app.server)
+    app.server.before_request(start_llm_refresher)
+
+    @app.server.after_request
+    def record_first_response(response):
+        if 'first_response_seconds' not in timings:
+            timings['first_response_seconds'] = time.perf_counter() - IMPORT_STARTED
+            print(f"Startup: first response after {timings['first_response_seconds']:.3f}s")
+        return response
+
+    return app
+
+
+if __name__ == '__main__':
+    create_app().run(debug=True)
@@ -0,0 +1,67 @@
+import os
+import signal
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import diskcache
+from dash import DiskcacheManager
+
+BACKGROUND_CACHE_DIR = os.getenv('BACKGROUND_CACHE_DIR', '.cache/background')
+# Jobs calling OpenAI (tariff and supplier lookups, relocation narrative, chat)
+# running at once across all workers
+BACKGROUND_MAX_WORKERS = int(os.getenv('BACKGROUND_MAX_WORKERS', 4))
+# Monte Carlo jobs running at once across all workers; each may use a process pool
+MC_MAX_JOBS = int(os.getenv('MC_MAX_JOBS', 2))
+BACKGROUND_JOB_TIMEOUT = float(os.getenv('BACKGROUND_JOB_TIMEOUT', 300))
+# Longest a job waits for a free slot before giving up, unless it passes its own deadline
+BACKGROUND_SLOT_TIMEOUT = float(os.getenv('BACKGROUND_SLOT_TIMEOUT', 30))
+
+# Slots per pool; the pools are independent, so long Monte Carlo runs cannot
+# hold up the OpenAI-backed panels and the other way round
+WORKER_POOLS = {'llm': BACKGROUND_MAX_WORKERS, 'monte_carlo': MC_MAX_JOBS}
+
+# Local diskcache store shared by every gunicorn worker; background callbacks
+# run in their own processes so the Flask request threads stay free.
+background_cache = diskcache.Cache(BACKGROUND_CACHE_DIR)
+background_callback_manager = DiskcacheManager(background_cache, expire=BACKGROUND_JOB_TIMEOUT)
+
+
+class WorkerBusyError(Exception):
+    """Raised when no worker slot frees up before the job's deadline."""
+
+
+def _exit_on_terminate(signum, frame):
+    sys.exit(0)
+
+
+# Limit how many background jobs of one pool run at once across all workers.
+# Each running job holds one of the pool's slot keys; the keys expire after
+# BACKGROUND_JOB_TIMEOUT so a job that dies without releasing its slot cannot
+# block the pool forever. Waits at most `timeout` seconds, then raises
+# WorkerBusyError so the callback can degrade; yields the time left of the
+# timeout (always positive), for jobs whose deadline covers the wait and the work.
+@contextmanager
+def worker_slot(pool='llm', timeout=BACKGROUND_SLOT_TIMEOUT, poll_interval=0.1):
+    # Cancelled jobs are stopped with SIGTERM; turn it into SystemExit so the
+    # slot below is released on the way out. Handlers can only be installed
+    # from the main thread, which is where background jobs run.
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, _exit_on_terminate)
+    deadline = time.monotonic() + timeout
+    while True:
+        # Never hand out a slot with no time left: a zero timeout means "no
+        # timeout" to the OpenAI client
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise WorkerBusyError(f"All {WORKER_POOLS[pool]} {pool} worker slots stayed busy for {timeout:g}s")
+        for slot in range(WORKER_POOLS[pool]):
+            key = f'worker-slot-{pool}-{slot}'
+            if background_cache.add(key, os.getpid(), expire=BACKGROUND_JOB_TIMEOUT):
+                try:
+                    yield left
+                finally:
+                    background_cache.delete(key)
+                return
+        time.sleep(min(poll_interval, left))
@@ -0,0 +1,275 @@
+"""Run the dashboard's tariff scenarios for a whole grid without the web server.
+
+Evaluates every business unit x tariff increase (brand scenarios, as in
+simulate_tariff_impact) and every supplier country x tariff increase
+(competitor scenarios, as in simulate_competitor_tariff_impact) over a
+process pool, and streams the rows to Parquet or CSV chunk by chunk.
+
+    python batch_scenarios.py --output reports/nightly --tariffs 0 100 5 --countries China Vietnam --charts
+"""
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from scenarios import competitor_tariff_scenario, tariff_grid, tariff_scenario
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', os.cpu_count() or 1))
+# Upper bound on the rows computed by one task, and so on each written chunk
+BATCH_CHUNK_ROWS = int(os.getenv('BATCH_CHUNK_ROWS', 1_000_000))
+
+# Snapshot of the data used by the tasks of this process, set by _init_worker
+_snapshot = None
+
+
+def _init_worker(data_dir, cache_dir):
+    global _snapshot
+    from data_repository import DataRepository
+
+    _snapshot = DataRepository(data_dir, cache_dir).current()
+
+
+# Label column repeated once per tariff increase, dictionary-encoded so chunks
+# stay small in memory and Parquet writes each distinct label once
+def _repeated_labels(values, repeats):
+    codes, uniques = pd.factorize(values.astype(str))
+    return pd.Categorical.from_codes(np.tile(codes, repeats), uniques)
+
+
+# One frame of scenario rows (entities x tariff increases, increase-major)
+# plus its per-increase totals of revenue and profit for the summaries
+def _scenario_frame(labels, tariff_increases, revenue, scenarios, **extra):
+    frame = pd.DataFrame({
+        **{name: _repeated_labels(values, len(tariff_increases)) for name, values in labels.items()},
+        'tariff_increase': np.repeat(np.asarray(tariff_increases, dtype=float), len(revenue)),
+        **{name: np.concatenate(values) for name, values in extra.items()},
+        'revenue': np.tile(revenue, len(tariff_increases)),
+        'baseline_cogs': np.concatenate([scenario.baseline_cogs for scenario in scenarios]),
+        'new_cogs': np.concatenate([scenario.new_cogs for scenario in scenarios]),
+        'baseline_profit': np.concatenate([scenario.baseline_profit for scenario in scenarios]),
+        'new_profit': np.concatenate([scenario.new_profit for scenario in scenarios]),
+    })
+    totals = pd.DataFrame({
+        'tariff_increase': np.asarray(tariff_increases, dtype=float),
+        'revenue': revenue.sum(),
+        'baseline_profit': [scenario.baseline_profit.sum() for scenario in scenarios],
+        'new_profit': [scenario.new_profit.sum() for scenario in scenarios],
+    })
+    return frame, totals
+
+
+# Brand scenario rows of one business unit for a few tariff increases
+def brand_scenarios(business_unit, tariff_increases):
+    brands = _snapshot.business_unit_index.rows(business_unit)
+    revenue = brands['brand_revenue_USD'].to_numpy(dtype=float)
+    frame, totals = _scenario_frame(
+        {
+            'business_unit': pd.Series([business_unit] * len(brands)),
+            'brand_id': brands['brand_id'],
+            'brand_name': brands['brand_name']
+        },
+        tariff_increases, revenue,
+        [tariff_scenario(revenue, tariff_increase) for tariff_increase in tariff_increases]
+    )
+    totals.insert(0, 'business_unit', str(business_unit))
+    return frame, totals
+
+
+# Competitor scenario rows for tariff increases on one supplier country
+def competitor_scenarios(country, tariff_increases):
+    competitors = _snapshot.competitors
+    exposure_matrix = _snapshot.exposure
+    revenue = competitors['revenue_usd'].to_numpy(dtype=float)
+    exposures = [
+        exposure_matrix.tariff_exposure(exposure_matrix.tariff_vector({country: tariff_increase}))
+        for tariff_increase in tariff_increases
+    ]
+    frame, totals = _scenario_frame(
+        {
+            'country': pd.Series([country] * len(competitors)),
+            'competitor_id': competitors['competitor_id'],
+            'competitor_name': competitors['competitor_name']
+        },
+        tariff_increases, revenue,
+        [competitor_tariff_scenario(revenue, exposure) for exposure in exposures],
+        tariff_exposure=exposures
+    )
+    totals.insert(0, 'country', country)
+    return frame, totals
+
+
+# Split the tariff grid so no task computes more than chunk_rows rows
+def _tariff_chunks(tariff_increases, rows_per_level, chunk_rows):
+    levels = max(1, chunk_rows // max(rows_per_level, 1))
+    return [tariff_increases[start:start + levels] for start in range(0, len(tariff_increases), levels)]
+
+
+class ChunkWriter:
+    """Appends data frame chunks to one Parquet file (or CSV without pyarrow)."""
+
+    def __init__(self, path, file_format):
+        self.file_format = file_format if pyarrow is not None else 'csv'
+        self.path = f'{path}.{self.file_format}'
+        self.rows = 0
+        self._writer = None
+
+    def write(self, frame):
+        if self.file_format == 'parquet':
+            table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pyarrow.parquet.ParquetWriter(self.path, self._schema(table.schema))
+            self._writer.write_table(table.cast(self._writer.schema))
+        else:
+            frame.to_csv(self.path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0, index=False)
+        self.rows += len(frame)
+
+    # The first chunk's schema with every label column given int32 dictionary
+    # indices: pandas picks int8 or int16 codes depending on how many labels a
+    # chunk has, and every chunk must match the file's schema
+    @staticmethod
+    def _schema(schema):
+        label_type = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+        return pyarrow.schema(
+            [field.with_type(label_type) if pyarrow.types.is_dictionary(field.type) else field for field in schema],
+            metadata=schema.metadata
+        )
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+# Run tasks [(function, *args), ...] on the pool and yield their results in
+# task order, with at most `in_flight` results held in memory at once
+def _ordered_results(executor, tasks, in_flight):
+    pending = deque(tasks)
+    running = deque()
+    while pending or running:
+        while pending and len(running) < in_flight:
+            function, *args = pending.popleft()
+            running.append(executor.submit(function, *args))
+        yield running.popleft().result()
+
+
+# Stream the scenario rows of `tasks` into `writer` and return the summary
+# table built from their per-task totals
+def _export(executor, tasks, writer, in_flight):
+    totals = []
+    for frame, frame_totals in _ordered_results(executor, tasks, in_flight):
+        writer.write(frame)
+        totals.append(frame_totals)
+    writer.close()
+    if not totals:
+        return pd.DataFrame()
+    summary = pd.concat(totals, ignore_index=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        summary['baseline_margin'] = summary['baseline_profit'] / summary['revenue'] * 100
+        summary['new_margin'] = summary['new_profit'] / summary['revenue'] * 100
+    return summary
+
+
+def write_charts(output_dir, unit_summary, country_summary):
+    import plotly.express as px
+
+    from figures import FIGURE_TEMPLATE
+
+    unit_chart = px.line(
+        unit_summary, x='tariff_increase', y='new_margin', color='business_unit', template=FIGURE_TEMPLATE,
+        labels={'tariff_increase': 'Tariff Increase (%)', 'new_margin': 'Profit Margin (%)',
+                'business_unit': 'Business Unit'},
+        title='Profit Margin Sensitivity to Tariff Increase'
+    )
+    unit_chart.add_hline(y=0, line_dash='dash', line_color='grey')
+    unit_chart.write_html(os.path.join(output_dir, 'business_unit_margins.html'), include_plotlyjs='cdn')
+
+    country_chart = px.line(
+        country_summary, x='tariff_increase', y='new_profit', color='country', template=FIGURE_TEMPLATE,
+        labels={'tariff_increase': 'Tariff Increase (%)', 'new_profit': 'Competitor Profit (USD)',
+                'country': 'Tariffed Country'},
+        title='Total Competitor Profit by Tariffed Supplier Country'
+    )
+    country_chart.write_html(os.path.join(output_dir, 'competitor_profit.html'), include_plotlyjs='cdn')
+
+
+# Evaluate the scenario grid and write brand_scenarios, competitor_scenarios and
+# their per business unit / per country summaries to output_dir. Returns the
+# paths written.
+def run_batch(output_dir, tariff_increases, countries=('China',), business_units=None, data_dir=None,
+              cache_dir=None, file_format='parquet', max_workers=BATCH_MAX_WORKERS, chunk_rows=BATCH_CHUNK_ROWS,
+              charts=False):
+    from data_repository import DATA_CACHE_DIR, DATA_DIR
+
+    data_dir = data_dir or DATA_DIR
+    cache_dir = cache_dir or DATA_CACHE_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    # Loads (and caches as Parquet) once here, so workers start from the cache
+    _init_worker(data_dir, cache_dir)
+    index = _snapshot.business_unit_index
+    business_units = [unit for unit in (business_units or index.business_units) if unit in index.positions]
+    n_competitors = len(_snapshot.competitors)
+
+    brand_tasks = [
+        (brand_scenarios, unit, chunk)
+        for unit in business_units
+        for chunk in _tariff_chunks(tariff_increases, len(index.positions[unit]), chunk_rows)
+    ]
+    competitor_tasks = [
+        (competitor_scenarios, country, chunk)
+        for country in countries
+        for chunk in _tariff_chunks(tariff_increases, n_competitors, chunk_rows)
+    ]
+
+    brand_writer = ChunkWriter(os.path.join(output_dir, 'brand_scenarios'), file_format)
+    competitor_writer = ChunkWriter(os.path.join(output_dir, 'competitor_scenarios'), file_format)
+    in_flight = 2 * max_workers
+    with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(data_dir, cache_dir)) as executor:
+        unit_summary = _export(executor, brand_tasks, brand_writer, in_flight)
+        country_summary = _export(executor, competitor_tasks, competitor_writer, in_flight)
+
+    paths = [brand_writer.path, competitor_writer.path]
+    for name, summary in (('business_unit_summary', unit_summary), ('country_summary', country_summary)):
+        path = os.path.join(output_dir, f'{name}.csv')
+        summary.to_csv(path, index=False)
+        paths.append(path)
+    if charts:
+        write_charts(output_dir, unit_summary, country_summary)
+        paths += [os.path.join(output_dir, name) for name in ('business_unit_margins.html', 'competitor_profit.html')]
+    return paths
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', required=True, help="directory for the result files")
+    parser.add_argument('--tariffs', type=float, nargs=3, default=[0, 100, 5], metavar=('START', 'STOP', 'STEP'),
+                        help="grid of tariff increases in %%")
+    parser.add_argument('--countries', nargs='+', default=['China'],
+                        help="supplier countries tariffed one at a time in the competitor scenarios")
+    parser.add_argument('--business-units', nargs='+', help="defaults to every business unit")
+    parser.add_argument('--data-dir', help="defaults to DATA_DIR")
+    parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet')
+    parser.add_argument('--workers', type=int, default=BATCH_MAX_WORKERS)
+    parser.add_argument('--chunk-rows', type=int, default=BATCH_CHUNK_ROWS)
+    parser.add_argument('--charts', action='store_true', help="also write static HTML charts")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    paths = run_batch(
+        args.output, tariff_grid(*args.tariffs), args.countries, args.business_units, args.data_dir,
+        file_format=args.format, max_workers=args.workers, chunk_rows=args.chunk_rows, charts=args.charts
+    )
+    print(f"Wrote {len(paths)} files in {time.perf_counter() - started:.1f}s:")
+    for path in paths:
+        print(" ", path)
@@ -0,0 +1,269 @@
+"""Benchmark the dashboard callbacks on synthetic data.
+
+Generates data sets of the requested sizes, builds the app on each with
+create_app and calls the callback functions directly. OpenAI calls go to the
+deterministic local fake_openai_server.py. Reports latency percentiles, peak
+Python memory (tracemalloc) and JSON payload size (raw and gzipped) per
+callback, and compares them with the stored baseline for that size.
+
+    python -m benchmarks.run --rows 1000 10000 100000
+    python -m benchmarks.run --rows 1000 --save-baseline
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.synthetic_data import generate
+from fake_openai_server import start_fake_server
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'peak_mb', 'payload_kb', 'gzip_kb')
+
+
+def _noop(*args):
+    pass
+
+
+# (name, call, reset) per benchmarked callback. `reset` clears the memoized
+# scenario results, the LLM response cache and reusable answers so every run
+# takes the cold path; "[cached]" and "[reused]" cases leave them warm.
+def _cases(app, args):
+    from llm_client import response_cache
+
+    session_store = app.current_state().session_store
+    data = app.current_data()
+    index = data.business_unit_index
+    business_unit = max(index.business_units, key=lambda unit: len(index.positions[unit]))
+    brand = index.rows(business_unit)['brand_name'].iat[0]
+    country_tariffs = [{'country': 'Vietnam', 'tariff': 10}, {'country': 'Mexico', 'tariff': 5}]
+    weights = [2, 1, 1, 3, 1, 2, 0.5]
+    # Three years of quarters phasing in tariffs on brands, China and Vietnam
+    schedule = [
+        {'period': f'Q{quarter % 4 + 1} Y{quarter // 4 + 1}', 'tariff': 5 * quarter, 'China': 5 * quarter,
+         'Vietnam': 2 * quarter}
+        for quarter in range(12)
+    ]
+
+    # Cold LLM lookups: no cached responses and no answers to reuse
+    def clear_llm():
+        response_cache.clear()
+        data.description_index.clear_answers()
+
+    # Every chat run starts a new conversation
+    def clear_chat():
+        session_store.delete('benchmark', 'chat_history')
+
+    # Bump one brand's revenue in brand.csv, as a daily refresh would
+    brand_path = os.path.join(app.current_state().data_repository.data_dir, 'brand.csv')
+
+    def edit_brand():
+        with open(brand_path, 'rb') as f:
+            lines = f.read().rstrip(b'\n').split(b'\n')
+        head, _, revenue = lines[-1].rpartition(b',')
+        lines[-1] = head + b',' + str(float(revenue) + 1).encode()
+        with open(brand_path, 'wb') as f:
+            f.write(b'\n'.join(lines) + b'\n')
+
+    def clear_scenarios():
+        session_store.clear_results()
+        app.tariff_impact.cache_clear()
+        app.competitor_tariff_impact.cache_clear()
+        app.relocation_scores.cache_clear()
+        app.schedule_projection.cache_clear()
+        app.overlap_impact.cache_clear()
+
+    cases = [
+        ('serve_layout', app.serve_layout, None),
+        ('update_brand_details_table', lambda: app.update_brand_details_table(
+            business_unit, 3, 10, [{'column_id': 'brand_revenue_USD', 'direction': 'desc'}],
+            '{description} icontains bike'
+        ), None),
+        ('simulate_tariff_impact', lambda: app.simulate_tariff_impact(1, 25, business_unit), clear_scenarios),
+        ('simulate_tariff_impact[cached]', lambda: app.simulate_tariff_impact(1, 25, business_unit), None),
+        ('simulate_competitor_tariff_impact', lambda: app.simulate_competitor_tariff_impact(
+            1, 25, country_tariffs
+        ), clear_scenarios),
+        ('simulate_overlap_impact', lambda: app.simulate_overlap_impact(
+            1, business_unit, 25, country_tariffs
+        ), clear_scenarios),
+        ('simulate_overlap_impact[cached]', lambda: app.simulate_overlap_impact(
+            1, business_unit, 25, country_tariffs
+        ), None),
+        ('run_tariff_sensitivity_sweep', lambda: app.run_tariff_sensitivity_sweep(1, 50, 1), None),
+        ('update_schedule_projection', lambda: app.update_schedule_projection(schedule), clear_scenarios),
+        ('update_schedule_projection[cached]', lambda: app.update_schedule_projection(schedule), None),
+        ('simulate_tariff_monte_carlo', lambda: app.simulate_tariff_monte_carlo(
+            _noop, 1, business_unit, 25, args.mc_draws, 20, 30, 60
+        ), None),
+        ('simulate_competitor_tariff_monte_carlo', lambda: app.simulate_competitor_tariff_monte_carlo(
+            _noop, 1, 25, country_tariffs, args.mc_draws, 20, 20
+        ), None),
+        ('update_openai_tariff_table', lambda: app.update_openai_tariff_table(business_unit), clear_llm),
+        ('update_openai_tariff_table[reused]', lambda: app.update_openai_tariff_table(business_unit), None),
+        ('find_alternative_suppliers', lambda: app.find_alternative_suppliers(1), clear_llm),
+        ('find_alternative_suppliers[reused]', lambda: app.find_alternative_suppliers(1), None),
+        ('update_relocation_scores', lambda: app.update_relocation_scores(brand, weights), clear_scenarios),
+        ('update_relocation_scores[cached]', lambda: app.update_relocation_scores(brand, weights), None),
+        ('relocation_recommendations', lambda: app.relocation_recommendations(brand, ['llm'], weights),
+         response_cache.clear),
+        ('chat_with_agent', lambda: app.chat_with_agent(
+            _noop, 1, "Where could this brand relocate production?", 'benchmark', brand
+        ), clear_chat),
+        ('reload_data', lambda: app.current_state().data_repository.reload().version, edit_brand),
+    ]
+    if args.callbacks:
+        cases = [case for case in cases if case[0].split('[')[0] in args.callbacks]
+    return cases
+
+
+# Size of the output's JSON, and of that JSON as compressed for the browser
+def _payload_kb(output):
+    from plotly.io.json import to_json_plotly
+
+    from serialization import compress
+
+    payload = to_json_plotly(output).encode('utf-8')
+    return len(payload) / 1024, len(compress(payload, 'gzip')) / 1024
+
+
+def measure(call, reset, repeat):
+    if reset:
+        reset()
+    output = call()  # warm-up; also the output whose payload is measured
+
+    durations = []
+    for _ in range(repeat):
+        if reset:
+            reset()
+        started = time.perf_counter()
+        call()
+        durations.append(time.perf_counter() - started)
+
+    if reset:
+        reset()
+    tracemalloc.start()
+    call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(np.array(durations) * 1000, [50, 95, 99])
+    payload_kb, gzip_kb = _payload_kb(output)
+    return {
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'peak_mb': round(peak / 2 ** 20, 3),
+        'payload_kb': round(payload_kb, 3),
+        'gzip_kb': round(gzip_kb, 3)
+    }
+
+
+def _baseline_path(rows):
+    return os.path.join(BASELINE_DIR, f'{rows}.json')
+
+
+def load_baseline(rows):
+    try:
+        with open(_baseline_path(rows)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(rows, results):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(_baseline_path(rows), 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+# Metrics more than `tolerance` times their baseline; tiny absolute values are
+# ignored so timer noise on sub-millisecond callbacks doesn't count
+def regressions(result, baseline, tolerance):
+    floors = {'p50_ms': 1.0, 'p95_ms': 1.0, 'p99_ms': 1.0, 'peak_mb': 1.0, 'payload_kb': 1.0, 'gzip_kb': 1.0}
+    return [
+        metric for metric in METRICS
+        if metric in baseline and result[metric] > max(baseline[metric] * tolerance, floors[metric])
+    ]
+
+
+def report(rows, results, baseline, tolerance):
+    print(f"\n{rows:,} rows")
+    print(f"{'callback':<42}" + ''.join(f"{metric:>12}" for metric in METRICS) + "  vs baseline p50")
+    failed = []
+    for name, result in results.items():
+        line = f"{name:<42}" + ''.join(f"{result[metric]:>12,.2f}" for metric in METRICS)
+        if name in baseline:
+            ratio = result['p50_ms'] / baseline[name]['p50_ms'] if baseline[name]['p50_ms'] else float('nan')
+            slow = regressions(result, baseline[name], tolerance)
+            line += f"  {ratio:>5.2f}x" + (f"  REGRESSION: {', '.join(slow)}" if slow else "")
+            failed.extend(f"{rows}:{name}:{metric}" for metric in slow)
+        print(line)
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000],
+                        help="brands (and competitors) per synthetic data set")
+    parser.add_argument('--business-units', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=20, help="timed runs per callback")
+    parser.add_argument('--mc-draws', type=int, default=2000)
+    parser.add_argument('--callbacks', nargs='*', help="only benchmark these callbacks")
+    parser.add_argument('--work-dir', default='.cache/benchmarks', help="synthetic data and caches")
+    parser.add_argument('--save-baseline', action='store_true', help="store the results as the new baselines")
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help="fail when a metric exceeds its baseline by this factor")
+    args = parser.parse_args()
+
+    # Deterministic OpenAI stand-in; must be configured before openai is imported
+    server = start_fake_server()
+    os.environ['OPENAI_API_BASE'] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ['OPENAI_API_KEY'] = 'benchmark'
+    # Stores shared by the whole process are configured through the environment
+    work_dir = os.path.abspath(args.work_dir)
+    os.environ.update({
+        'LLM_CACHE_PATH': os.path.join(work_dir, 'llm_cache.sqlite3'),
+        'ANSWER_INDEX_PATH': os.path.join(work_dir, 'answers.sqlite3'),
+        'BACKGROUND_CACHE_DIR': os.path.join(work_dir, 'background'),
+        'LLM_BREAKER_DIR': os.path.join(work_dir, 'breaker'),
+        'LLM_SINGLEFLIGHT_DIR': os.path.join(work_dir, 'singleflight'),
+        'METRICS_PATH': os.path.join(work_dir, 'metrics.sqlite3'),
+        # Measure the callbacks, not the API rate limit
+        'TARIFF_LOOKUP_RATE': '10000',
+        'TARIFF_LOOKUP_BURST': '10000'
+    })
+
+    import app
+
+    failed = []
+    for rows in args.rows:
+        data_dir = os.path.join(work_dir, f'data-{rows}')
+        generate(data_dir, rows, n_business_units=args.business_units)
+        app.create_app({
+            'DATA_DIR': data_dir,
+            'DATA_CACHE_DIR': os.path.join(work_dir, 'parquet'),
+            'SESSION_STORE_URL': 'sqlite:///' + os.path.join(work_dir, 'sessions.sqlite3')
+        })
+
+        results = {name: measure(call, reset, args.repeat) for name, call, reset in _cases(app, args)}
+        baseline = load_baseline(rows)
+        failed += report(rows, results, baseline, args.tolerance)
+        if not baseline and not args.save_baseline:
+            print(f"No baseline for {rows:,} rows on this machine; save one with --save-baseline")
+        if args.save_baseline:
+            save_baseline(rows, {**load_baseline(rows), **results})
+
+    server.shutdown()
+    if failed and not args.save_baseline:
+        print("\nRegressions:", ', '.join(failed))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Synthetic brand, competitor and supply-chain CSVs at arbitrary sizes.
+
+Writes brand.csv, competitors.csv, Competitors_Supply_chain.csv and
+relocation_countries.csv in the layout of the files in Data/,
+deterministically for a given seed.
+
+    python -m benchmarks.synthetic_data --brands 100000 --output /tmp/data-100k
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from relocation import CRITERIA
+
+COUNTRIES = [
+    'China', 'Vietnam', 'Taiwan', 'Mexico', 'India', 'Germany', 'Denmark', 'Japan', 'South Korea', 'Thailand',
+    'Indonesia', 'Malaysia', 'Cambodia', 'Bangladesh', 'Italy', 'Portugal', 'Turkey', 'Poland', 'USA', 'Canada',
+    'Brazil', 'Philippines', 'Sri Lanka', 'Czech Republic', 'Romania'
+]
+PRODUCTS = [
+    'Helmets for cycling and powersports', 'Hydration packs and water bottles', 'Electric bikes for outdoor use',
+    'Apparel and gear for motocross', 'Golf launch monitors and simulators', 'Binoculars and rangefinders',
+    'Ammunition and reloading components', 'Camping stoves and cookware', 'Cycling lights, pumps and racks',
+    'Snow sports goggles and apparel', 'Archery equipment and accessories', 'Trail cameras and optics'
+]
+
+
+def _write(frame, data_dir, filename):
+    frame.to_csv(os.path.join(data_dir, filename), index=False, encoding='utf-8-sig')
+
+
+# Write the source CSVs to data_dir. Competitors default to the brand count;
+# each competitor imports from 1-4 countries whose shares add up to 100%.
+def generate(data_dir, n_brands, n_competitors=None, n_business_units=20, n_countries=len(COUNTRIES), seed=0):
+    rng = np.random.default_rng(seed)
+    n_competitors = n_brands if n_competitors is None else n_competitors
+    os.makedirs(data_dir, exist_ok=True)
+
+    brand_ids = np.char.add('BRD_', np.arange(1, n_brands + 1).astype(str))
+    units = np.char.add('Business Unit ', np.char.zfill(np.arange(1, n_business_units + 1).astype(str), 3))
+    _write(pd.DataFrame({
+        'business_unit': units[rng.integers(0, n_business_units, n_brands)],
+        'brand_id': brand_ids,
+        'brand_name': np.char.add('Brand ', np.arange(1, n_brands + 1).astype(str)),
+        'description': np.array(PRODUCTS)[rng.integers(0, len(PRODUCTS), n_brands)],
+        'brand_revenue_USD': np.round(rng.lognormal(3.5, 1.0, n_brands), 1)
+    }), data_dir, 'brand.csv')
+
+    competitor_ids = np.char.add('comp_', np.arange(1, n_competitors + 1).astype(str))
+    competitor_names = np.char.add('Competitor ', np.arange(1, n_competitors + 1).astype(str))
+    competing = rng.integers(0, n_brands, (n_competitors, 2))
+    _write(pd.DataFrame({
+        'competitor_id': competitor_ids,
+        'competitor_name': competitor_names,
+        'brand_id': np.char.add(np.char.add(brand_ids[competing[:, 0]], ','), brand_ids[competing[:, 1]]),
+        'revenue_usd': np.round(rng.lognormal(4.0, 1.2, n_competitors), 1)
+    }), data_dir, 'competitors.csv')
+
+    # 1-4 supplier countries per competitor with random shares normalised to 100%
+    per_competitor = rng.integers(1, 5, n_competitors)
+    owner = np.repeat(np.arange(n_competitors), per_competitor)
+    weights = rng.random(len(owner))
+    shares = weights / np.bincount(owner, weights=weights)[owner] * 100
+    countries = np.array(COUNTRIES[:n_countries])
+    _write(pd.DataFrame({
+        'competitor_id': competitor_ids[owner],
+        'competitor_name': competitor_names[owner],
+        'competitor_supplier_country': countries[rng.integers(0, n_countries, len(owner))],
+        'Proportion_imports': np.char.add(np.round(shares).astype(int).astype(str), '%'),
+        'notes_competitor_supply_chain': 'Synthetic supplier'
+    }), data_dir, 'Competitors_Supply_chain.csv')
+
+    # Every supplier country except China is a relocation candidate, scored 3-10 in half points
+    candidates = [country for country in countries if country != 'China']
+    _write(pd.DataFrame({
+        'country': candidates,
+        **{criterion: rng.integers(6, 21, len(candidates)) / 2 for criterion in CRITERIA}
+    }), data_dir, 'relocation_countries.csv')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--brands', type=int, default=1000)
+    parser.add_argument('--competitors', type=int, help="defaults to the number of brands")
+    parser.add_argument('--business-units', type=int, default=20)
+    parser.add_argument('--countries', type=int, default=len(COUNTRIES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', required=True, help="directory for the CSV files")
+    args = parser.parse_args()
+    generate(args.output, args.brands, args.competitors, args.business_units, args.countries, args.seed)
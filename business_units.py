@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+from deltas import differs
+from scenarios import baseline_costs
+
+
+class BusinessUnitIndex:
+    """Row positions and baseline aggregates per business unit, built once per brand table.
+
+    Callbacks look rows up by position instead of scanning
+    ``brand_data['business_unit'] == ...`` on every interaction.
+
+    Given the index of the previous brand table and the positions of the rows
+    edited since (`changed`, None when rows were added, removed or
+    reordered), codes and positions are reused if no brand changed unit and
+    revenue totals are updated by the edited rows' deltas. `versions` maps
+    every unit to the data version at which its rows last changed, so results
+    cached per unit survive edits to other units.
+    """
+
+    def __init__(self, brand_data, version=None, previous=None, changed=None):
+        self.brand_data = brand_data
+        # Edited rows before and after, when the previous table lines up with this one
+        edits = None
+        if previous is not None and changed is not None:
+            edits = previous.brand_data.iloc[changed], brand_data.iloc[changed]
+
+        moved = edits is None or differs(edits[0]['business_unit'], edits[1]['business_unit']).any()
+        if moved:
+            # Integer code per row (in order of first appearance, -1 for a missing unit)
+            self.codes, business_units = pd.factorize(brand_data['business_unit'], sort=False)
+            self.business_units = list(business_units)
+            self.positions = brand_data.groupby('business_unit', sort=False, observed=True).indices
+            brand_count = np.bincount(self.codes[self.codes >= 0], minlength=len(self.business_units))
+        else:
+            # No brand changed unit: codes, positions and brand counts carry over
+            self.codes, self.business_units, self.positions = previous.codes, previous.business_units, previous.positions
+            brand_count = previous.aggregates['brand_count'].to_numpy()
+
+        # Revenue totals move by the edited rows' deltas, unless a brand changed
+        # unit or a revenue is missing before or after the edit
+        delta = None
+        if not moved:
+            delta = (edits[1]['brand_revenue_USD'].to_numpy(dtype=float)
+                     - edits[0]['brand_revenue_USD'].to_numpy(dtype=float))
+        if delta is not None and np.isfinite(delta).all():
+            codes = self.codes[changed]
+            revenue = previous.aggregates['revenue'].to_numpy() + np.bincount(
+                codes[codes >= 0], weights=delta[codes >= 0], minlength=len(self.business_units)
+            )
+        else:
+            assigned = self.codes >= 0
+            revenue = np.bincount(
+                self.codes[assigned],
+                weights=brand_data['brand_revenue_USD'].to_numpy(dtype=float)[assigned],
+                minlength=len(self.business_units)
+            )
+
+        baseline_profit, baseline_cogs, tariff_trade_costs = baseline_costs(revenue)
+        self.aggregates = pd.DataFrame({
+            'revenue': revenue,
+            'baseline_profit': baseline_profit,
+            'baseline_cogs': baseline_cogs,
+            'tariff_trade_costs': tariff_trade_costs,
+            'brand_count': brand_count
+        }, index=pd.Index(self.business_units, name='business_unit'))
+
+        # Units without an edited row keep their version
+        self.versions = dict.fromkeys(self.business_units, version)
+        if edits is not None:
+            edited_units = set(edits[0]['business_unit'].dropna()) | set(edits[1]['business_unit'].dropna())
+            self.versions.update(
+                (unit, previous.versions[unit]) for unit in self.business_units
+                if unit in previous.versions and unit not in edited_units
+            )
+
+    # Brand rows of one business unit (empty frame for an unknown unit)
+    def rows(self, business_unit):
+        return self.brand_data.iloc[self.positions.get(business_unit, np.empty(0, dtype=int))]
+
+    # Baseline aggregates of one business unit as plain Python numbers, or None
+    def totals(self, business_unit):
+        if business_unit not in self.positions:
+            return None
+        row = self.aggregates.index.get_loc(business_unit)
+        return {name: column.iat[row].item() for name, column in self.aggregates.items()}
+
+    # Names and revenues of the `top` brands of one business unit (all of them
+    # when None), largest revenue first
+    def brand_revenue(self, business_unit, top=None):
+        rows = self.rows(business_unit)
+        order = np.argsort(-rows['brand_revenue_USD'].to_numpy(dtype=float), kind='stable')[:top]
+        return {
+            'brand_name': rows['brand_name'].to_numpy()[order].tolist(),
+            'brand_revenue_USD': rows['brand_revenue_USD'].to_numpy(dtype=float)[order].tolist()
+        }
+
+    # JSON-ready payload for a dcc.Store: {business_unit: totals and the names and
+    # revenues of its `top` brands}, enough for clientside callbacks to render the
+    # baseline card and brand chart. Bounded by `top` x business units.
+    def to_store(self, top=None):
+        return {unit: {**self.totals(unit), **self.brand_revenue(unit, top)} for unit in self.business_units}
@@ -0,0 +1,111 @@
+import os
+import time
+
+import openai
+
+from llm_client import LLM_TIMEOUT, breaker, record_outcome
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+CHAT_MODEL = os.getenv('CHAT_MODEL', 'gpt-3.5-turbo')
+# Tokens of earlier conversation sent with each prompt; older turns are dropped first
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv('CHAT_HISTORY_TOKEN_BUDGET', 2000))
+# Messages kept per session, regardless of size
+CHAT_MAX_HISTORY_MESSAGES = int(os.getenv('CHAT_MAX_HISTORY_MESSAGES', 40))
+CHAT_MAX_TOKENS = int(os.getenv('CHAT_MAX_TOKENS', 500))
+
+SYSTEM_PROMPT = (
+    "You are an experienced supply chain assistant helping Revelyst Group evaluate tariff exposure "
+    "and relocation options for its brands."
+)
+
+_encoding = None
+
+
+# Token count of a piece of text; a 4-characters-per-token estimate without tiktoken
+def count_tokens(text):
+    global _encoding
+    if tiktoken is None:
+        return len(text) // 4 + 1
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding('cl100k_base')
+    return len(_encoding.encode(text))
+
+
+# Most recent messages that fit in the token budget, oldest first
+def trim_history(messages, token_budget=CHAT_HISTORY_TOKEN_BUDGET):
+    trimmed = []
+    used = 0
+    for message in reversed(messages[-CHAT_MAX_HISTORY_MESSAGES:]):
+        # ~4 tokens of per-message overhead in the chat format
+        used += count_tokens(message['content']) + 4
+        if used > token_budget:
+            break
+        trimmed.append(message)
+    return trimmed[::-1]
+
+
+# System message describing the brand the user is looking at
+def brand_context(brand_rows):
+    if brand_rows is None or brand_rows.empty:
+        return None
+    lines = [
+        f"- {row['brand_name']} ({row['business_unit']}): {row['description']} "
+        f"Revenue: ${row['brand_revenue_USD']:,.0f}M"
+        for _, row in brand_rows.iterrows()
+    ]
+    return "The user is analysing the following brand:\n" + "\n".join(lines)
+
+
+# Full prompt: system prompt, optional brand context, trimmed history and the new message
+def build_messages(history, user_message, context=None):
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    if context:
+        messages.append({"role": "system", "content": context})
+    budget = CHAT_HISTORY_TOKEN_BUDGET - count_tokens(user_message)
+    messages.extend(trim_history(history, budget))
+    messages.append({"role": "user", "content": user_message})
+    return messages
+
+
+# Yield the assistant reply piece by piece as tokens arrive. Streamed responses
+# carry no usage, so tokens are counted locally (one per content chunk). The
+# whole reply is bounded by `timeout` seconds: a stream still running then is
+# cut off with openai.error.Timeout.
+def stream_chat(messages, model=CHAT_MODEL, max_tokens=CHAT_MAX_TOKENS, temperature=0.7, timeout=LLM_TIMEOUT):
+    breaker.check()
+    started = time.perf_counter()
+    chunks = 0
+    try:
+        response = openai.ChatCompletion.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            request_timeout=timeout
+        )
+        for chunk in response:
+            content = chunk['choices'][0].get('delta', {}).get('content')
+            if content:
+                chunks += 1
+                yield content
+            if time.perf_counter() - started > timeout:
+                raise openai.error.Timeout(f"Reply not finished after {timeout:g}s")
+    except Exception as exc:
+        record_outcome(model, started, error=exc)
+        raise
+    usage = {'prompt_tokens': sum(count_tokens(m['content']) + 4 for m in messages), 'completion_tokens': chunks}
+    record_outcome(model, started, usage)
+
+
+# Append a finished exchange and keep the stored history bounded
+def append_exchange(history, user_message, reply):
+    history = list(history or []) + [
+        {"role": "user", "content": user_message},
+        {"role": "assistant", "content": reply}
+    ]
+    return history[-CHAT_MAX_HISTORY_MESSAGES:]
@@ -0,0 +1,63 @@
+import os
+import time
+
+import diskcache
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Stop calling a failing upstream service, shared by every worker process.
+
+    Closed: calls go through; `failure_threshold` consecutive failures open the
+    breaker. Open: calls are refused for `reset_timeout` seconds. Half-open:
+    one caller at a time (in any process) gets through as a probe; its success
+    closes the breaker, its failure opens it again. A probe that never reports
+    back is replaced after `probe_timeout` seconds.
+    """
+
+    def __init__(self, directory, failure_threshold=5, reset_timeout=30, probe_timeout=60):
+        self.cache = diskcache.Cache(directory)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+
+    def state(self):
+        opened_at = self.cache.get('opened_at')
+        if opened_at is None:
+            return 'closed'
+        return 'open' if time.time() - opened_at < self.reset_timeout else 'half_open'
+
+    # Whether a call may go upstream now; in the half-open state only the
+    # caller that takes the probe slot may
+    def allow(self):
+        state = self.state()
+        if state == 'closed':
+            return True
+        if state == 'open':
+            return False
+        return self.cache.add('probe', os.getpid(), expire=self.probe_timeout)
+
+    def check(self):
+        if not self.allow():
+            raise CircuitOpenError("OpenAI calls are paused after repeated failures")
+
+    def record_success(self):
+        if self.cache.get('failures', 0) or self.cache.get('opened_at') is not None:
+            with self.cache.transact():
+                self.cache.delete('failures')
+                self.cache.delete('opened_at')
+                self.cache.delete('probe')
+
+    def record_failure(self):
+        with self.cache.transact():
+            failures = self.cache.incr('failures', default=0)
+            if failures >= self.failure_threshold or self.cache.get('opened_at') is not None:
+                # (Re)open; a failed probe restarts the wait
+                self.cache.set('opened_at', time.time())
+                self.cache.delete('probe')
+
+    def clear(self):
+        self.cache.clear()
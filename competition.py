@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+
+# Compressed sparse rows: (offsets, values) grouping `values` by `rows`, so the
+# values of row r are values[offsets[r]:offsets[r + 1]]
+def _sparse_rows(rows, values, n_rows):
+    order = np.argsort(rows, kind='stable')
+    offsets = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=offsets[1:])
+    return offsets, values[order]
+
+
+# Values of several sparse rows: (values, position in `rows` of the row each came from)
+def _gather(offsets, values, rows):
+    rows = np.asarray(rows, dtype=np.int64)
+    starts = offsets[rows]
+    lengths = offsets[rows + 1] - starts
+    owners = np.repeat(np.arange(len(rows)), lengths)
+    # Index of every value: its row's start plus its rank within the row
+    ranks = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return values[starts[owners] + ranks], owners
+
+
+class CompetitionIndex:
+    """Brand <-> competitor links parsed once from competitors.brand_id.
+
+    competitors.csv lists the brands each competitor fights as a comma-joined
+    string ("BRD_13,BRD_14"). The pairs are split once per data load and kept
+    as two sparse row structures over row positions (brand -> competitors and
+    competitor -> brands), so overlap lookups are array slices rather than
+    string splits and merges. Brand ids that are not in the brand table are
+    counted in `unmatched` and otherwise ignored.
+    """
+
+    def __init__(self, brands, competitors):
+        split = competitors['brand_id'].fillna('').astype(str).str.split(',')
+        competitor_positions = np.repeat(np.arange(len(competitors)), split.str.len().to_numpy())
+        brand_ids = split.explode().str.strip().to_numpy(dtype=object)
+        # Position of each brand id's first row, as in ExposureMatrix
+        by_id = pd.Series(np.arange(len(brands)), index=brands['brand_id'].astype(str)).groupby(level=0).first()
+        brand_positions = by_id.reindex(brand_ids).fillna(-1).to_numpy(dtype=np.int64)
+        matched = brand_positions >= 0
+        self.unmatched = int((~matched & (brand_ids != '')).sum())
+
+        brand_positions = brand_positions[matched]
+        competitor_positions = competitor_positions[matched]
+        # A brand listed twice for the same competitor counts once
+        self.n_brands = len(brands)
+        self.n_competitors = len(competitors)
+        pairs = np.unique(brand_positions * self.n_competitors + competitor_positions)
+        brand_positions, competitor_positions = np.divmod(pairs, max(self.n_competitors, 1))
+        self._brand_offsets, self._brand_competitors = _sparse_rows(
+            brand_positions, competitor_positions, self.n_brands
+        )
+        self._competitor_offsets, self._competitor_brands = _sparse_rows(
+            competitor_positions, brand_positions, self.n_competitors
+        )
+
+    # Sorted positions of the competitors linked to any of the given brand positions
+    def competitors_of(self, brand_positions):
+        return np.unique(_gather(self._brand_offsets, self._brand_competitors, brand_positions)[0])
+
+    # Sorted positions of the brands linked to any of the given competitor positions
+    def brands_of(self, competitor_positions):
+        return np.unique(_gather(self._competitor_offsets, self._competitor_brands, competitor_positions)[0])
+
+    # For each of the given competitors, the positions of its brands among `brand_positions`
+    def overlapping_brands(self, competitor_positions, brand_positions):
+        linked, owners = _gather(self._competitor_offsets, self._competitor_brands, competitor_positions)
+        keep = np.isin(linked, brand_positions)
+        counts = np.bincount(owners[keep], minlength=len(competitor_positions))
+        return np.split(linked[keep], np.cumsum(counts)[:-1])
@@ -0,0 +1,233 @@
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+from business_units import BusinessUnitIndex
+from competition import CompetitionIndex
+from deltas import changed_rows, same_columns
+from exposure import ExposureMatrix
+from relocation import CRITERIA, RelocationScorer
+from similarity import DescriptionIndex
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow  # noqa: F401 - only needed for the Parquet cache
+except ImportError:
+    pyarrow = None
+
+DATA_DIR = os.getenv('DATA_DIR', 'Data')
+DATA_CACHE_DIR = os.getenv('DATA_CACHE_DIR', '.cache/data')
+DATA_CHECK_INTERVAL = float(os.getenv('DATA_CHECK_INTERVAL', 2))
+
+# Source files and the dtypes they are parsed with. Low-cardinality labels are
+# categoricals; free text stays as object columns.
+DATA_SOURCES = {
+    'brands': ('brand.csv', {
+        'business_unit': 'category',
+        'brand_id': 'object',
+        'brand_name': 'object',
+        'description': 'object',
+        'brand_revenue_USD': 'float64',
+    }),
+    'competitors': ('competitors.csv', {
+        'competitor_id': 'object',
+        'competitor_name': 'object',
+        'brand_id': 'object',
+        'revenue_usd': 'float64',
+    }),
+    'supply_chain': ('Competitors_Supply_chain.csv', {
+        'competitor_id': 'object',
+        'competitor_name': 'object',
+        'competitor_supplier_country': 'category',
+        'Proportion_imports': 'object',
+        'notes_competitor_supply_chain': 'object',
+    }),
+    'relocation_countries': ('relocation_countries.csv', {
+        'country': 'object',
+        **{criterion: 'float64' for criterion in CRITERIA},
+    }),
+}
+
+# Columns each derived index reads, by source. An index whose columns did not
+# change between two loads is carried over from the previous snapshot.
+INDEX_INPUTS = {
+    'exposure': {
+        'competitors': ['competitor_id', 'competitor_name'],
+        'supply_chain': ['competitor_id', 'competitor_name', 'competitor_supplier_country', 'Proportion_imports'],
+    },
+    'competition': {'brands': ['brand_id'], 'competitors': ['brand_id']},
+    'relocation': {'brands': ['brand_name', 'description'], 'relocation_countries': ['country', *CRITERIA]},
+    'description_index': {'brands': ['description']},
+}
+
+
+# "45%" -> 45.0; "N/A" and other unparseable values -> NaN
+def parse_percentage(values):
+    return pd.to_numeric(values.astype('string').str.strip().str.rstrip('%'), errors='coerce').astype('float64')
+
+
+def _read_source(path, dtypes):
+    frame = pd.read_csv(path, dtype=dtypes, encoding='utf-8-sig')
+    if 'competitor_name' in frame:
+        # Names carry stray tabs/spaces in the source files, which break joins
+        frame['competitor_name'] = frame['competitor_name'].str.strip()
+    if 'Proportion_imports' in frame:
+        frame['Proportion_imports'] = parse_percentage(frame['Proportion_imports'])
+    return frame
+
+
+# Load one CSV through a Parquet copy keyed on the source's mtime and size, so
+# unchanged sources are read back memory-mapped instead of re-parsed.
+def load_source(path, dtypes, cache_dir=DATA_CACHE_DIR):
+    if pyarrow is None:
+        return _read_source(path, dtypes)
+
+    stat = os.stat(path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    cache_path = os.path.join(cache_dir, f'{name}-{stat.st_mtime_ns}-{stat.st_size}.parquet')
+    if os.path.exists(cache_path):
+        return pd.read_parquet(cache_path, memory_map=True)
+
+    frame = _read_source(path, dtypes)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write under a temporary name so other workers never read a partial file
+    temporary_path = f'{cache_path}.{os.getpid()}.tmp'
+    frame.to_parquet(temporary_path, index=False)
+    os.replace(temporary_path, cache_path)
+    for stale in os.listdir(cache_dir):
+        if stale.startswith(f'{name}-') and stale.endswith('.parquet') and stale != os.path.basename(cache_path):
+            os.remove(os.path.join(cache_dir, stale))
+    return frame
+
+
+class DataSnapshot:
+    """Immutable set of data frames plus the indexes derived from them.
+
+    Callbacks take one snapshot and use it throughout, so a reload never
+    changes the data underneath a running computation. A snapshot built from
+    the previous one only redoes work for what changed: indexes whose input
+    columns are unchanged are carried over, business unit aggregates and the
+    exposure matrix are updated for the edited rows, and `index_versions`
+    (like BusinessUnitIndex.versions per unit) keeps the version at which
+    each index last changed, so results keyed on it stay cached.
+    """
+
+    def __init__(self, brands, competitors, supply_chain, relocation_countries, version, previous=None):
+        self.brands = brands
+        self.competitors = competitors
+        self.supply_chain = supply_chain
+        self.relocation_countries = relocation_countries
+        self.version = version
+        self.source_versions = dict(zip(DATA_SOURCES, version))
+        self.index_versions = {}
+
+        if previous is None:
+            self.business_unit_index = BusinessUnitIndex(brands, version)
+        else:
+            self.business_unit_index = BusinessUnitIndex(
+                brands, version, previous.business_unit_index, changed_rows(previous.brands, brands, 'brand_id')
+            )
+        self.exposure = self._derive('exposure', previous, lambda: self._exposure(previous))
+        self.competition = self._derive('competition', previous, lambda: CompetitionIndex(brands, competitors))
+        self.relocation = self._derive('relocation', previous, lambda: RelocationScorer(brands, relocation_countries))
+        self.description_index = self._derive(
+            'description_index', previous, lambda: DescriptionIndex(brands['description'])
+        )
+
+    # Version of the given sources, for results that only read those sources
+    def version_of(self, *sources):
+        return tuple(self.source_versions[source] for source in sources)
+
+    # Derived index `name`: the previous snapshot's when the columns it reads
+    # (INDEX_INPUTS) are unchanged, else build()
+    def _derive(self, name, previous, build):
+        if previous is not None and all(
+            same_columns(getattr(previous, source), getattr(self, source), columns)
+            for source, columns in INDEX_INPUTS[name].items()
+        ):
+            self.index_versions[name] = previous.index_versions[name]
+            return getattr(previous, name)
+        self.index_versions[name] = self.version
+        return build()
+
+    # Exposure matrix, updated from the previous one for the edited supply chain
+    # rows when the competitors (by id and name) and row order are unchanged
+    def _exposure(self, previous):
+        columns = INDEX_INPUTS['exposure']
+        if previous is not None and same_columns(previous.competitors, self.competitors, columns['competitors']):
+            changed = changed_rows(previous.supply_chain, self.supply_chain, 'competitor_id', columns['supply_chain'])
+            if changed is not None:
+                return ExposureMatrix(self.competitors, self.supply_chain, previous.exposure, changed)
+        return ExposureMatrix(self.competitors, self.supply_chain)
+
+
+class DataRepository:
+    """Loads the dashboard's CSV sources and hot-swaps them when they change on disk."""
+
+    def __init__(self, data_dir=DATA_DIR, cache_dir=DATA_CACHE_DIR, check_interval=DATA_CHECK_INTERVAL):
+        self.data_dir = data_dir
+        self.cache_dir = cache_dir
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._reloading = False
+
+    def _paths(self):
+        return {name: os.path.join(self.data_dir, filename) for name, (filename, _) in DATA_SOURCES.items()}
+
+    def _source_version(self):
+        return tuple(os.stat(path).st_mtime_ns for path in self._paths().values())
+
+    # Snapshot of the sources at `version`. Sources unchanged since `previous`
+    # are taken from it as they are, and the rest is derived incrementally.
+    def _load(self, version, previous=None):
+        frames = {
+            name: getattr(previous, name)
+            if previous is not None and previous.source_versions[name] == source_version
+            else load_source(path, DATA_SOURCES[name][1], self.cache_dir)
+            for (name, path), source_version in zip(self._paths().items(), version)
+        }
+        return DataSnapshot(version=version, previous=previous, **frames)
+
+    def _reload(self, version):
+        try:
+            snapshot = self._load(version, self._snapshot)
+            self._snapshot = snapshot  # single reference assignment: readers see old or new, never a mix
+        except Exception as exc:
+            logger.exception("Data reload failed, keeping previous data: %s", exc)
+        finally:
+            self._reloading = False
+
+    # Current snapshot. The first call loads synchronously; afterwards changed
+    # sources are reloaded in a background thread while callers keep getting
+    # the previous snapshot.
+    def current(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._load(self._source_version())
+                return self._snapshot
+
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return snapshot
+        self._last_check = now
+        version = self._source_version()
+        if version != snapshot.version:
+            with self._lock:
+                if not self._reloading:
+                    self._reloading = True
+                    threading.Thread(target=self._reload, args=(version,), daemon=True).start()
+        return snapshot
+
+    # Load changed sources immediately, e.g. from a CLI or test
+    def reload(self):
+        with self._lock:
+            self._snapshot = self._load(self._source_version(), self._snapshot)
+        return self._snapshot
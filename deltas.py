@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+
+# Per row, whether two versions of a column differ (NaN equals NaN)
+def differs(before, after):
+    before, after = before.to_numpy(), after.to_numpy()
+    different = np.asarray(before != after)
+    # Only unequal values can be NaN on both sides, so only they are checked
+    candidates = np.flatnonzero(different)
+    different[candidates] = ~(pd.isna(before[candidates]) & pd.isna(after[candidates]))
+    return different
+
+
+# Whether the given columns hold the same values in both frames
+def same_columns(previous, current, columns):
+    if previous is current:
+        return True
+    return len(previous) == len(current) and not any(
+        differs(previous[column], current[column]).any() for column in columns
+    )
+
+
+# Positions of the rows whose columns (all when None) differ between two
+# versions of a table, or None when the rows do not line up (the `key`
+# column differs, e.g. rows were added, removed or reordered)
+def changed_rows(previous, current, key, columns=None):
+    if previous is current:
+        return np.empty(0, dtype=np.int64)
+    if list(previous.columns) != list(current.columns) or not same_columns(previous, current, [key]):
+        return None
+    changed = np.zeros(len(current), dtype=bool)
+    for column in columns or current.columns:
+        changed |= differs(previous[column], current[column])
+    return np.flatnonzero(changed)
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+
+class ExposureMatrix:
+    """Dense competitor x supplier-country matrix of import shares (0-1).
+
+    Rows follow the order of the competitors table and columns the supplier
+    countries of the supply chain table, so a tariff vector over countries
+    turns into a per-competitor tariff exposure with one matrix product.
+    Given the matrix of the previous load and the positions of the edited
+    supply chain rows, only the affected competitors' rows are rebuilt.
+    """
+
+    def __init__(self, competitors, supply_chain, previous=None, changed=None):
+        country_codes, countries = pd.factorize(supply_chain['competitor_supplier_country'], sort=True)
+        self.countries = [str(country) for country in countries]
+        self._country_positions = {country: position for position, country in enumerate(self.countries)}
+        shares = supply_chain['Proportion_imports'].to_numpy(dtype=float) / 100
+
+        if previous is not None and changed is not None and previous.countries == self.countries:
+            # Same competitors and supply chain rows as `previous` except the
+            # `changed` ones: only the competitors those rows belong to (before
+            # or after the edit) are summed again
+            self.competitors = previous.competitors
+            self._by_name, self._by_id = previous._by_name, previous._by_id
+            self._rows = previous._rows.copy()
+            self._rows[changed] = self._match(supply_chain.iloc[changed])
+            affected = np.union1d(previous._rows[changed], self._rows[changed])
+            self.matrix = previous.matrix.copy()
+            self.matrix[affected[affected >= 0]] = 0
+            summed = np.isin(self._rows, affected)
+        else:
+            self.competitors = competitors['competitor_name'].tolist()
+            # Supply chain rows are matched to competitors by name; rows whose name
+            # differs from competitors.csv (e.g. "Garmin (Golf/Outdoor)") fall back
+            # to competitor_id.
+            self._by_name = pd.Series(np.arange(len(competitors)), index=competitors['competitor_name']).groupby(level=0).first()
+            self._by_id = pd.Series(np.arange(len(competitors)), index=competitors['competitor_id']).groupby(level=0).first()
+            self._rows = self._match(supply_chain)
+            self.matrix = np.zeros((len(self.competitors), len(self.countries)))
+            summed = np.ones(len(supply_chain), dtype=bool)
+
+        matched = summed & (self._rows >= 0) & (country_codes >= 0) & ~np.isnan(shares)
+        np.add.at(self.matrix, (self._rows[matched], country_codes[matched]), shares[matched])
+
+    # Competitor row of each supply chain row (-1 when it matches none)
+    def _match(self, supply_chain):
+        rows = supply_chain['competitor_name'].map(self._by_name)
+        rows = rows.fillna(supply_chain['competitor_id'].map(self._by_id))
+        return rows.fillna(-1).to_numpy(dtype=np.int64)
+
+    # Tariff increases keyed by country (in %) -> vector aligned with the matrix columns (fractions).
+    # Countries that do not appear in the supply chain are ignored.
+    def tariff_vector(self, tariffs_by_country):
+        vector = np.zeros(len(self.countries))
+        for country, tariff in tariffs_by_country.items():
+            position = self._country_positions.get(country)
+            if position is not None and tariff:
+                vector[position] = float(tariff) / 100
+        return vector
+
+    # Weighted tariff increase per competitor: sum over countries of import share x tariff
+    def tariff_exposure(self, tariff_vector):
+        return self.matrix @ tariff_vector
@@ -0,0 +1,162 @@
+"""Local stand-in for the OpenAI chat completions API.
+
+Answers POST /v1/chat/completions deterministically, as a JSON body or as a
+server-sent event stream when the request sets "stream": true. Point the app
+at it with OPENAI_API_BASE=http://127.0.0.1:8001/v1.
+
+    python fake_openai_server.py --port 8001 --token-delay 0.02
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _last_user_message(messages):
+    return next((m['content'] for m in reversed(messages) if m.get('role') == 'user'), '')
+
+
+# Deterministic reply derived from the last user message
+def fake_reply(messages):
+    words = _last_user_message(messages).split()
+    return f"Simulated answer about: {' '.join(words[:12])}" if words else "Simulated answer."
+
+
+# JSON-mode reply: one tariff and supplier result for every {"id": ...} item in
+# the first JSON array of the prompt (the format used by tariff_lookup.py)
+def fake_json_reply(messages):
+    prompt = _last_user_message(messages)
+    start = prompt.find('[')
+    try:
+        items = json.JSONDecoder().raw_decode(prompt[start:])[0] if start >= 0 else []
+    except json.JSONDecodeError:
+        items = []
+    results = [
+        {
+            'id': item.get('id'),
+            'category': ' '.join(str(item.get('description', '')).split()[:3]),
+            'tariff': f"{7.5 + (sum(map(ord, str(item.get('id')))) % 4) * 7.5:g}%",
+            'country': 'China',
+            'suppliers': 'Vietnam, Mexico, India',
+            'comments': 'Simulated tariff'
+        }
+        for item in items if isinstance(item, dict)
+    ]
+    return json.dumps({'results': results})
+
+
+def _token_count(text):
+    return len(text.split())
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    token_delay = 0.0
+    first_token_delay = 0.0
+    reply = staticmethod(fake_reply)
+
+    def log_message(self, format, *args):
+        pass
+
+    # Clients that gave up waiting (request timeouts) close the connection mid-reply
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_error(404)
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        messages = request.get('messages', [])
+        if (request.get('response_format') or {}).get('type') == 'json_object':
+            reply = fake_json_reply(messages)
+        else:
+            reply = self.reply(messages)
+        model = request.get('model', 'gpt-3.5-turbo')
+
+        if request.get('stream'):
+            self._stream(model, reply)
+            return
+
+        time.sleep(self.first_token_delay)
+        prompt_tokens = sum(_token_count(m.get('content', '')) for m in messages)
+        body = json.dumps({
+            'id': 'chatcmpl-fake',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': reply}, 'finish_reason': 'stop'}],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': _token_count(reply),
+                'total_tokens': prompt_tokens + _token_count(reply)
+            }
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, model, reply):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        time.sleep(self.first_token_delay)
+        tokens = [word + ' ' for word in reply.split(' ')]
+        for index, token in enumerate(tokens):
+            delta = {'content': token} if index else {'role': 'assistant', 'content': token}
+            self._event({
+                'id': 'chatcmpl-fake',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': None}]
+            })
+            time.sleep(self.token_delay)
+        self._event({
+            'id': 'chatcmpl-fake',
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]
+        })
+        self.wfile.write(b'data: [DONE]\n\n')
+        self.wfile.flush()
+
+    def _event(self, payload):
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+
+# Start the server in a daemon thread and return it; server.server_address has the bound port
+def start_fake_server(host='127.0.0.1', port=0, token_delay=0.0, first_token_delay=0.0):
+    handler = type('ConfiguredFakeOpenAIHandler', (FakeOpenAIHandler,), {
+        'token_delay': token_delay,
+        'first_token_delay': first_token_delay
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--token-delay', type=float, default=0.02, help="seconds between streamed tokens")
+    parser.add_argument('--first-token-delay', type=float, default=0.1, help="seconds before the first token or response body")
+    args = parser.parse_args()
+
+    server = start_fake_server(args.host, args.port, args.token_delay, args.first_token_delay)
+    print(f"Fake OpenAI API listening on http://{args.host}:{server.server_address[1]}/v1")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,181 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+import plotly.graph_objects as go
+from dash import Patch
+
+# Plotly template used by every figure, matching plotly.express defaults
+FIGURE_TEMPLATE = 'plotly'
+SCENARIOS = ('Baseline Profit', 'New Profit')
+COGS_LABELS = ('Baseline COGS', 'Increased Tariff Costs')
+MARGIN_SCENARIOS = ('Baseline', 'New')
+OVERLAP_GROUPS = ('Our Brands', 'Overlapping Competitors')
+# Significant digits kept in chart data: more than a chart can show, and far
+# shorter JSON than full float reprs
+CHART_SIGNIFICANT_DIGITS = int(os.getenv('CHART_SIGNIFICANT_DIGITS', 6))
+
+
+# Values rounded to `digits` significant digits, as a list. Each value is scaled
+# to an integer, rounded and scaled back by an exact power of ten, so it
+# serializes as its short decimal form (0.1235, not 0.12350000000000001).
+def trim_floats(values, digits=CHART_SIGNIFICANT_DIGITS):
+    values = np.asarray(values, dtype=float)
+    magnitude = np.zeros(values.shape)
+    np.log10(np.abs(values), out=magnitude, where=np.isfinite(values) & (values != 0))
+    decimals = np.clip(digits - 1 - np.floor(magnitude), -300, 300)
+    scale = 10.0 ** np.abs(decimals)
+    return np.where(decimals >= 0, np.round(values * scale) / scale, np.round(values / scale) * scale).tolist()
+
+
+def _figure(**layout):
+    return go.Figure(layout=dict(template=FIGURE_TEMPLATE, **layout))
+
+
+# Layout of the brand revenue chart; traces are added clientside.
+# Templates are cached: built once per process and reused by every page load.
+@lru_cache(maxsize=None)
+def brand_revenue_layout(top):
+    return _figure(
+        title=f'Revenue of the Top {top} Brands (in Millions USD)',
+        xaxis_title='brand_name',
+        yaxis_title='brand_revenue_USD',
+        legend_title_text='brand_name',
+        barmode='relative'
+    ).to_plotly_json()['layout']
+
+
+# Empty grouped bar chart of baseline vs new profit per entity (brand or competitor).
+# Scenario callbacks fill it with profit_impact_patch.
+@lru_cache(maxsize=None)
+def profit_impact_template(entity_label):
+    figure = _figure(
+        title=f'Profit Impact by {entity_label}',
+        barmode='group',
+        xaxis_title=entity_label,
+        yaxis_title='Profit (USD)',
+        legend_title_text='Scenario'
+    )
+    for scenario in SCENARIOS:
+        figure.add_bar(name=scenario, x=[], y=[], offsetgroup=scenario, alignmentgroup='True')
+    return figure.to_plotly_json()
+
+
+@lru_cache(maxsize=None)
+def cogs_pie_template():
+    figure = _figure(title='COGS Breakdown')
+    figure.add_pie(labels=list(COGS_LABELS), values=[])
+    return figure.to_plotly_json()
+
+
+@lru_cache(maxsize=None)
+def profit_margin_template():
+    figure = _figure(title='Profit Margin Change', xaxis_title='Scenario', yaxis_title='Profit Margin (%)')
+    figure.add_scatter(x=list(MARGIN_SCENARIOS), y=[], mode='lines')
+    return figure.to_plotly_json()
+
+
+# Radar of the criterion scores of the best `n_countries` relocation targets,
+# one closed trace per country; filled by relocation_radar_patch
+@lru_cache(maxsize=None)
+def relocation_radar_template(n_countries):
+    figure = _figure(
+        title='Relocation Scores by Criterion',
+        polar=dict(radialaxis=dict(range=[0, 10])),
+        legend_title_text='Country (weighted score)'
+    )
+    for _ in range(n_countries):
+        figure.add_scatterpolar(r=[], theta=[], name='', fill='toself', opacity=0.6)
+    return figure.to_plotly_json()
+
+
+# Profit change of a business unit's brands next to the competitors that
+# overlap them; filled by overlap_impact_patch
+@lru_cache(maxsize=None)
+def overlap_impact_template():
+    figure = _figure(
+        title='Profit Change: Our Brands vs Overlapping Competitors',
+        xaxis_title='Brand / Competitor',
+        yaxis_title='Profit Change (%)',
+        legend_title_text=''
+    )
+    for name in OVERLAP_GROUPS:
+        figure.add_bar(name=name, x=[], y=[])
+    return figure.to_plotly_json()
+
+
+# Profit margin per period of a tariff schedule; one line per business unit
+# plus the competitors, set by schedule_projection_patch
+@lru_cache(maxsize=None)
+def schedule_projection_template():
+    figure = _figure(
+        title='Projected Profit Margin by Period',
+        xaxis_title='Period',
+        yaxis_title='Profit Margin (%)',
+        legend_title_text='Business Unit'
+    )
+    return figure.to_plotly_json()
+
+
+# Partial updates: only the trace data of a template figure is sent to the browser
+
+def profit_impact_patch(names, baseline_profit, new_profit):
+    patch = Patch()
+    for trace, values in enumerate((baseline_profit, new_profit)):
+        patch['data'][trace]['x'] = names
+        patch['data'][trace]['y'] = trim_floats(values)
+    return patch
+
+
+# values: [baseline COGS, increased tariff costs], or [] to clear
+def cogs_pie_patch(values):
+    patch = Patch()
+    patch['data'][0]['values'] = trim_floats(values)
+    return patch
+
+
+# margins: [baseline margin, new margin], or [] to clear
+def profit_margin_patch(margins):
+    patch = Patch()
+    patch['data'][0]['y'] = trim_floats(margins)
+    return patch
+
+
+# ranking: [(country, weighted score), ...] best first; criterion_scores: one
+# list of 0-10 scores per ranked country, in the order of `labels`
+def relocation_radar_patch(labels, ranking, criterion_scores, n_countries):
+    patch = Patch()
+    theta = list(labels) + list(labels[:1])
+    for trace in range(n_countries):
+        if trace < len(ranking):
+            country, score = ranking[trace]
+            patch['data'][trace]['name'] = f'{country} ({score:.1f})'
+            scores = list(criterion_scores[trace])
+            patch['data'][trace]['r'] = trim_floats(scores + scores[:1])
+            patch['data'][trace]['theta'] = theta
+        else:
+            patch['data'][trace]['name'] = ''
+            patch['data'][trace]['r'] = []
+            patch['data'][trace]['theta'] = []
+    return patch
+
+
+# Names and profit changes (in %) of the brands and of the overlapping competitors
+def overlap_impact_patch(brand_names, brand_changes, competitor_names, competitor_changes):
+    patch = Patch()
+    for trace, (names, changes) in enumerate(((brand_names, brand_changes), (competitor_names, competitor_changes))):
+        patch['data'][trace]['x'] = names
+        patch['data'][trace]['y'] = trim_floats(changes)
+    return patch
+
+
+# series: [(name, [margin per period]), ...]; replaces every line of the chart
+def schedule_projection_patch(periods, series):
+    patch = Patch()
+    # Every line has one value per period, so all are trimmed in one call
+    margins = trim_floats([values for _, values in series]) if series else []
+    patch['data'] = [
+        {'type': 'scatter', 'mode': 'lines+markers', 'name': name, 'x': list(periods), 'y': values}
+        for (name, _), values in zip(series, margins)
+    ]
+    return patch
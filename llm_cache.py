@@ -0,0 +1,189 @@
+import hashlib
+import json
+import time
+
+from sqlite_store import SQLiteStore
+
+# Only these request parameters identify a completion; anything else (timeouts,
+# API keys, ...) must not split the cache.
+CACHE_KEY_PARAMS = ('model', 'messages', 'temperature', 'max_tokens')
+
+
+# Build a stable cache key from the parameters of a ChatCompletion request
+def make_cache_key(params):
+    key_params = {name: params.get(name) for name in CACHE_KEY_PARAMS}
+    payload = json.dumps(key_params, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache(SQLiteStore):
+    """SQLite-backed cache for OpenAI responses, shared by every worker process.
+
+    Entries are fresh for ``ttl`` seconds, then served as stale for another
+    ``stale_ttl`` seconds while a single caller refreshes them. The least
+    recently used entries are evicted once ``max_entries`` is exceeded.
+    Claimed refreshes go through a queue table, so a short-lived process (a
+    background callback job) can hand them to a long-lived one. The last good
+    results of degradable callbacks live in a table of their own that is
+    never expired, evicted or cleared.
+    """
+
+    def __init__(self, path, ttl=24 * 3600, stale_ttl=7 * 24 * 3600, max_entries=1000, refresh_timeout=120):
+        super().__init__(path)
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.refresh_timeout = refresh_timeout
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                refresh_started_at REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        # Stale entries waiting for a long-lived process to refresh them, with
+        # the request parameters to refresh them with
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS refresh_queue (
+                key TEXT PRIMARY KEY,
+                params TEXT NOT NULL,
+                queued_at REAL NOT NULL
+            )
+        """)
+        # One row per callback key (e.g. per business unit), so it stays small
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS last_good (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                saved_at REAL NOT NULL
+            )
+        """)
+
+    def _count(self, conn, name, amount=1):
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount)
+        )
+
+    # Return (value, is_stale) for a usable entry, or None on a miss
+    def get(self, key):
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._count(conn, 'misses')
+            return None
+        value, created_at = row
+        age = now - created_at
+        if age > self.ttl + self.stale_ttl:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._count(conn, 'misses')
+            return None
+        conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+        stale = age > self.ttl
+        self._count(conn, 'stale_hits' if stale else 'hits')
+        return json.loads(value), stale
+
+    # Usable value for key without counting a hit or miss or touching its
+    # recency, for callers waiting on another request to fill the entry
+    def peek(self, key):
+        row = self._connect().execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl + self.stale_ttl:
+            return None
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, created_at, last_access, refresh_started_at) "
+            "VALUES (?, ?, ?, ?, NULL)",
+            (key, json.dumps(value), now, now)
+        )
+        self._evict(conn)
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    # Atomically mark a stale entry as being refreshed so only one caller
+    # (in any worker) goes upstream; abandoned claims expire after refresh_timeout.
+    def claim_refresh(self, key):
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE entries SET refresh_started_at = ? "
+            "WHERE key = ? AND (refresh_started_at IS NULL OR refresh_started_at < ?)",
+            (now, key, now - self.refresh_timeout)
+        )
+        return cursor.rowcount == 1
+
+    def release_refresh(self, key):
+        self._connect().execute("UPDATE entries SET refresh_started_at = NULL WHERE key = ?", (key,))
+
+    # Queue a claimed refresh for whichever process drains the queue
+    def queue_refresh(self, key, params):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO refresh_queue (key, params, queued_at) VALUES (?, ?, ?)",
+            (key, json.dumps(params), time.time())
+        )
+
+    # Take the oldest queued refresh as (key, params), or None; each is taken
+    # by exactly one process
+    def next_refresh(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT key, params FROM refresh_queue ORDER BY queued_at LIMIT 1").fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM refresh_queue WHERE key = ?", (row[0],))
+        finally:
+            conn.execute("COMMIT")
+        return (row[0], json.loads(row[1])) if row is not None else None
+
+    # Last good result saved under key, or None
+    def last_good(self, key):
+        row = self._connect().execute("SELECT value FROM last_good WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    # Written only when it changed, so repeated identical results cost one statement
+    def save_last_good(self, key, value):
+        self._connect().execute(
+            "INSERT INTO last_good (key, value, saved_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, saved_at = excluded.saved_at "
+            "WHERE value != excluded.value",
+            (key, json.dumps(value, sort_keys=True), time.time())
+        )
+
+    def _evict(self, conn):
+        overflow = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+            self._count(conn, 'evictions', overflow)
+
+    def stats(self):
+        conn = self._connect()
+        counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {
+            'hits': counters.get('hits', 0),
+            'stale_hits': counters.get('stale_hits', 0),
+            'misses': counters.get('misses', 0),
+            'evictions': counters.get('evictions', 0),
+            'entries': entries,
+            'max_entries': self.max_entries,
+        }
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM entries")
+        conn.execute("DELETE FROM counters")
+        conn.execute("DELETE FROM refresh_queue")
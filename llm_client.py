@@ -0,0 +1,173 @@
+import logging
+import os
+import time
+
+import openai
+import requests
+
+from circuit_breaker import CircuitBreaker
+from llm_cache import LLMResponseCache, make_cache_key
+from metrics import record_llm_request
+from singleflight import SingleFlight, SingleFlightTimeout
+
+logger = logging.getLogger(__name__)
+
+# Seconds an OpenAI call may take before it is abandoned as failed
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 30))
+
+# Errors that mean upstream is unhealthy and count towards opening the breaker;
+# anything else (bad request, authentication) is our problem, not theirs.
+# Streamed replies surface read timeouts as raw requests exceptions. Waiting on
+# an identical request in flight that outlives the deadline counts as a timeout
+# for the callbacks, but never reaches the breaker (no call was made).
+UPSTREAM_ERRORS = (
+    SingleFlightTimeout,
+    openai.error.Timeout,
+    openai.error.APIError,
+    openai.error.APIConnectionError,
+    openai.error.ServiceUnavailableError,
+    openai.error.RateLimitError,
+    requests.exceptions.RequestException,
+)
+
+# Shared on-disk cache for every OpenAI call made by the dashboard
+response_cache = LLMResponseCache(
+    os.getenv('LLM_CACHE_PATH', '.cache/llm_cache.sqlite3'),
+    ttl=float(os.getenv('LLM_CACHE_TTL_SECONDS', 24 * 3600)),
+    stale_ttl=float(os.getenv('LLM_CACHE_STALE_SECONDS', 7 * 24 * 3600)),
+    max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', 1000))
+)
+
+# Identical requests in flight at the same time, in any thread or worker, share
+# one upstream call; the others read its result from response_cache. Waiting
+# for the leader is bounded like the call itself.
+request_coalescer = SingleFlight(
+    os.getenv('LLM_SINGLEFLIGHT_DIR', '.cache/singleflight'),
+    timeout=float(os.getenv('LLM_SINGLEFLIGHT_TIMEOUT', LLM_TIMEOUT))
+)
+
+# Seconds between checks of the refresh queue by run_refresher
+REFRESH_POLL_SECONDS = 1.0
+
+# Shared by every worker: after LLM_BREAKER_FAILURES consecutive upstream
+# failures, calls fail fast with CircuitOpenError until a probe succeeds
+breaker = CircuitBreaker(
+    os.getenv('LLM_BREAKER_DIR', '.cache/breaker'),
+    failure_threshold=int(os.getenv('LLM_BREAKER_FAILURES', 5)),
+    reset_timeout=float(os.getenv('LLM_BREAKER_RESET_SECONDS', 30)),
+    probe_timeout=LLM_TIMEOUT
+)
+
+
+# Record the outcome of one upstream call with the breaker and in the metrics
+def record_outcome(model, started, usage=None, error=None):
+    if error is None:
+        breaker.record_success()
+    elif isinstance(error, UPSTREAM_ERRORS):
+        breaker.record_failure()
+    record_llm_request(model, 'api', time.perf_counter() - started, usage, error=error is not None)
+
+
+# openai.ChatCompletion.create bounded by `timeout` seconds and guarded by the
+# circuit breaker, with latency, token and error metrics. request_timeout is a
+# read timeout for requests and a total timeout for the async (aiohttp) client.
+def create_completion(timeout=LLM_TIMEOUT, **params):
+    breaker.check()
+    started = time.perf_counter()
+    try:
+        response = openai.ChatCompletion.create(request_timeout=timeout, **params)
+    except Exception as exc:
+        record_outcome(params.get('model'), started, error=exc)
+        raise
+    record_outcome(params.get('model'), started, response.get('usage'))
+    return response
+
+
+async def acreate_completion(**params):
+    breaker.check()
+    started = time.perf_counter()
+    try:
+        response = await openai.ChatCompletion.acreate(request_timeout=LLM_TIMEOUT, **params)
+    except Exception as exc:
+        record_outcome(params.get('model'), started, error=exc)
+        raise
+    record_outcome(params.get('model'), started, response.get('usage'))
+    return response
+
+
+# Cached response for `key`, or None. Stale entries are returned immediately and
+# queued for refresh: LLM callbacks run in background job processes that Dash
+# kills once their result is read, so a refresh thread started there would die
+# with them. The web server processes drain the queue (run_refresher).
+def _cached_response(key, params):
+    started = time.perf_counter()
+    cached = response_cache.get(key)
+    if cached is None:
+        return None
+    response, stale = cached
+    if stale and response_cache.claim_refresh(key):
+        response_cache.queue_refresh(key, params)
+    record_llm_request(params.get('model'), 'cache', time.perf_counter() - started)
+    return response
+
+
+def _refresh(key, params):
+    try:
+        response_cache.set(key, create_completion(**params))
+    except Exception as exc:
+        logger.warning("Background OpenAI refresh failed: %s", exc)
+    finally:
+        response_cache.release_refresh(key)
+
+
+# Refresh queued stale entries, forever. Run from a daemon thread of each
+# long-lived (web server) process; see app.start_llm_refresher.
+def run_refresher():
+    while True:
+        queued = response_cache.next_refresh()
+        if queued is None:
+            time.sleep(REFRESH_POLL_SECONDS)
+        else:
+            _refresh(*queued)
+
+
+# Drop-in replacement for openai.ChatCompletion.create that answers from the
+# cache when possible; an upstream call is bounded by `timeout` seconds
+def chat_completion(timeout=LLM_TIMEOUT, **params):
+    key = make_cache_key(params)
+    response = _cached_response(key, params)
+    if response is not None:
+        return response
+
+    def fetch():
+        response = create_completion(timeout=timeout, **params)
+        response_cache.set(key, response)
+        return response
+
+    return request_coalescer.run(key, fetch, lambda: response_cache.peek(key), timeout=timeout)
+
+
+# Async counterpart of chat_completion for asyncio pipelines
+async def achat_completion(**params):
+    key = make_cache_key(params)
+    response = _cached_response(key, params)
+    if response is not None:
+        return response
+
+    async def fetch():
+        response = await acreate_completion(**params)
+        response_cache.set(key, response)
+        return response
+
+    return await request_coalescer.arun(key, fetch, lambda: response_cache.peek(key))
+
+
+# Last result a degradable callback produced for `key`, or None. Kept next to
+# the response cache so every worker sees it, but never expired or evicted:
+# it is what the callback falls back to when OpenAI has been down for a while.
+def last_good_result(key):
+    return response_cache.last_good(key)
+
+
+def save_good_result(key, value):
+    response_cache.save_last_good(key, value)
@@ -0,0 +1,179 @@
+import functools
+import logging
+import os
+import sqlite3
+import time
+
+from dash.exceptions import PreventUpdate
+
+from sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') != '0'
+METRICS_PATH = os.getenv('METRICS_PATH', '.cache/metrics.sqlite3')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# name: (type, help) of every metric served at /metrics
+METRICS = {
+    'dash_callback_duration_seconds': ('histogram', "Wall time of Dash callback functions"),
+    'dash_callback_errors_total': ('counter', "Dash callback calls that raised an exception"),
+    'dash_callback_payload_bytes': ('histogram', "Size of callback responses before compression"),
+    'dash_callback_response_bytes': ('histogram', "Size of callback responses as sent to the browser (compressed)"),
+    'llm_request_duration_seconds': ('histogram', "Latency of OpenAI chat completions, by source (api or cache)"),
+    'llm_requests_total': ('counter', "OpenAI chat completions, by source (api or cache)"),
+    'llm_tokens_total': ('counter', "Prompt and completion tokens of OpenAI API calls"),
+    'llm_errors_total': ('counter', "OpenAI API calls that raised an exception"),
+}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in sorted(labels.items()))
+
+
+def _series(name, labels):
+    return f"{name}{{{labels}}}" if labels else name
+
+
+# Histogram buckets: seconds for *_seconds metrics, bytes otherwise
+def _buckets(name):
+    return DURATION_BUCKETS if name.endswith('_seconds') else SIZE_BUCKETS
+
+
+class MetricsStore(SQLiteStore):
+    """Prometheus counters and histograms kept in SQLite.
+
+    Gunicorn workers and background callback processes all write to the same
+    file, so /metrics on any worker reports totals for the whole deployment.
+    Histograms store per-bucket counts and are made cumulative when rendered.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS samples (
+                name TEXT NOT NULL,
+                labels TEXT NOT NULL,
+                suffix TEXT NOT NULL,
+                value REAL NOT NULL,
+                PRIMARY KEY (name, labels, suffix)
+            )
+        """)
+
+    # Apply several updates in one transaction: [('inc' | 'observe', name, labels, value), ...]
+    def record(self, updates):
+        rows = []
+        for kind, name, labels, value in updates:
+            labels = _labels(labels)
+            if kind == 'inc':
+                rows.append((name, labels, '_total', value))
+                continue
+            bucket = next((str(le) for le in _buckets(name) if value <= le), '+Inf')
+            rows += [(name, labels, f'_bucket:{bucket}', 1), (name, labels, '_sum', value), (name, labels, '_count', 1)]
+        try:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO samples (name, labels, suffix, value) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(name, labels, suffix) DO UPDATE SET value = value + excluded.value",
+                    rows
+                )
+        except sqlite3.Error as exc:
+            # Losing a sample is better than failing the request being measured
+            logger.warning("Metrics update failed: %s", exc)
+
+    def inc(self, name, labels, amount=1):
+        self.record([('inc', name, labels, amount)])
+
+    def observe(self, name, labels, value):
+        self.record([('observe', name, labels, value)])
+
+    # Prometheus text exposition format
+    def render(self, extra_gauges=None):
+        samples = {}
+        for name, labels, suffix, value in self._connect().execute(
+                "SELECT name, labels, suffix, value FROM samples ORDER BY name, labels"):
+            samples.setdefault(name, {}).setdefault(labels, {})[suffix] = value
+
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for labels, values in samples.get(name, {}).items():
+                if kind == 'counter':
+                    lines.append(f"{_series(name, labels)} {values.get('_total', 0):g}")
+                    continue
+                cumulative = 0
+                for le in [str(le) for le in _buckets(name)] + ['+Inf']:
+                    cumulative += values.get(f'_bucket:{le}', 0)
+                    bucket_labels = f'{labels},le="{le}"' if labels else f'le="{le}"'
+                    lines.append(f"{name}_bucket{{{bucket_labels}}} {cumulative:g}")
+                lines.append(f"{_series(name + '_sum', labels)} {values.get('_sum', 0):g}")
+                lines.append(f"{_series(name + '_count', labels)} {values.get('_count', 0):g}")
+        for name, (help_text, value) in (extra_gauges or {}).items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value:g}"]
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        self._connect().execute("DELETE FROM samples")
+
+
+metrics = MetricsStore(METRICS_PATH)
+
+
+# Wrap a callback function to record its wall time and errors. PreventUpdate is
+# Dash control flow, not an error.
+def instrument_callback(func):
+    if not METRICS_ENABLED:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        labels = {'callback': func.__name__}
+        updates = []
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except PreventUpdate:
+            raise
+        except Exception:
+            updates.append(('inc', 'dash_callback_errors_total', labels, 1))
+            raise
+        finally:
+            updates.append(('observe', 'dash_callback_duration_seconds', labels, time.perf_counter() - started))
+            metrics.record(updates)
+
+    return wrapper
+
+
+# Response size of one callback call: its JSON and the bytes actually sent
+def record_payload(callback_name, size, sent_size):
+    if METRICS_ENABLED:
+        labels = {'callback': callback_name}
+        metrics.record([
+            ('observe', 'dash_callback_payload_bytes', labels, size),
+            ('observe', 'dash_callback_response_bytes', labels, sent_size)
+        ])
+
+
+# Record one chat completion: `source` is 'api' or 'cache'; usage is the
+# response's token usage (None when unknown, e.g. served from the cache)
+def record_llm_request(model, source, duration, usage=None, error=False):
+    if not METRICS_ENABLED:
+        return
+    labels = {'model': model, 'source': source}
+    updates = [
+        ('inc', 'llm_requests_total', labels, 1),
+        ('observe', 'llm_request_duration_seconds', labels, duration),
+    ]
+    if error:
+        updates.append(('inc', 'llm_errors_total', {'model': model}, 1))
+    for kind in ('prompt', 'completion'):
+        if usage and usage.get(f'{kind}_tokens'):
+            updates.append(('inc', 'llm_tokens_total', {'model': model, 'type': kind}, usage[f'{kind}_tokens']))
+    metrics.record(updates)
@@ -0,0 +1,182 @@
+import os
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from scenarios import BASELINE_PROFIT_MARGIN, TARIFF_SHARE_OF_COGS, baseline_costs
+
+MC_MAX_WORKERS = int(os.getenv('MC_MAX_WORKERS', os.cpu_count() or 1))
+# Draws x entities (x countries) simulated per batch; bounds memory per batch
+MC_BATCH_CELLS = int(os.getenv('MC_BATCH_CELLS', 2_000_000))
+# Runs smaller than this many cells stay in the calling process
+MC_PARALLEL_CELLS = int(os.getenv('MC_PARALLEL_CELLS', 20_000_000))
+MC_BINS = 256
+
+QUANTILES = (0.05, 0.5, 0.95)
+
+# Quantiles are (n_entities + 1, 3) arrays for P5/P50/P95; the last row is the
+# total over all entities.
+MonteCarloBands = namedtuple(
+    'MonteCarloBands', ['draws', 'total_draws', 'profit', 'margin', 'total_revenue']
+)
+
+
+# Triangular draws that also accept a degenerate (low == high) range
+def _triangular(rng, low, mode, high, size):
+    low, mode, high = np.broadcast_arrays(low, mode, high)
+    if np.all(low == high):
+        return np.broadcast_to(mode, size).astype(float)
+    uniform = rng.random(size)
+    width = np.where(high > low, high - low, 1)
+    split = (mode - low) / width
+    left = low + np.sqrt(uniform * width * (mode - low))
+    right = high - np.sqrt((1 - uniform) * width * (high - mode))
+    return np.where(uniform < split, left, right)
+
+
+class BrandTariffModel:
+    """Uncertain tariff cost of our brands, as a fraction of baseline COGS.
+
+    Each draw samples one tariff increase (triangular, in %) shared by all
+    brands, and an independent tariff share of COGS per brand (uniform).
+    """
+
+    def __init__(self, n_brands, tariff_increase, tariff_share):
+        self.n_entities = n_brands
+        self.tariff_increase = tuple(float(value) for value in tariff_increase)  # (low, mode, high)
+        self.tariff_share = tuple(float(value) for value in tariff_share)  # (low, high)
+        self.cells_per_draw = n_brands
+
+    def bounds(self):
+        low, _, high = self.tariff_increase
+        corners = np.outer(self.tariff_share, [low / 100, high / 100])
+        return np.full(self.n_entities, corners.min()), np.full(self.n_entities, corners.max())
+
+    def sample(self, rng, n_draws):
+        increase = _triangular(rng, *self.tariff_increase, size=n_draws) / 100
+        share = rng.uniform(*self.tariff_share, size=(n_draws, self.n_entities))
+        return share * increase[:, None]
+
+
+class CompetitorTariffModel:
+    """Uncertain tariff cost of competitors, as a fraction of baseline COGS.
+
+    Each draw samples a tariff increase per supplier country (triangular
+    around the scenario value with a relative spread) and perturbs every
+    competitor x country import share by a uniform relative noise.
+    """
+
+    def __init__(self, exposure_matrix, tariff_vector, tariff_spread, import_spread):
+        self.matrix = np.asarray(exposure_matrix, dtype=float)
+        self.tariff_vector = np.asarray(tariff_vector, dtype=float)
+        self.tariff_spread = float(tariff_spread)
+        self.import_spread = float(import_spread)
+        self.n_entities = self.matrix.shape[0]
+        self.cells_per_draw = self.matrix.size
+
+    def _tariff_range(self):
+        low = self.tariff_vector * (1 - self.tariff_spread)
+        high = self.tariff_vector * (1 + self.tariff_spread)
+        return np.minimum(low, high), np.maximum(low, high)
+
+    def bounds(self):
+        low, high = self._tariff_range()
+        corners = [
+            (self.matrix * (1 + sign * self.import_spread)) * tariff
+            for sign in (-1, 1) for tariff in (low, high)
+        ]
+        return np.minimum.reduce(corners).sum(axis=1), np.maximum.reduce(corners).sum(axis=1)
+
+    def sample(self, rng, n_draws):
+        low, high = self._tariff_range()
+        tariffs = _triangular(rng, low, self.tariff_vector, high, size=(n_draws, len(self.tariff_vector)))
+        shares = rng.uniform(1 - self.import_spread, 1 + self.import_spread, size=(n_draws,) + self.matrix.shape)
+        shares *= self.matrix
+        return np.matmul(shares, tariffs[:, :, None])[:, :, 0]
+
+
+# Histogram of sampled tariff-cost fractions per entity (plus the COGS-weighted
+# total) over fixed bins between known bounds. Histograms from different
+# batches and processes merge by simple addition.
+def _simulate_batch(model, weights, lower, upper, seed, n_draws):
+    rng = np.random.default_rng(seed)
+    fractions = model.sample(rng, n_draws)
+    fractions = np.column_stack([fractions, fractions @ weights])
+
+    width = np.where(upper > lower, upper - lower, 1)
+    bins = ((fractions - lower) / width * MC_BINS).astype(np.int64)
+    np.clip(bins, 0, MC_BINS - 1, out=bins)
+    bins += np.arange(fractions.shape[1]) * MC_BINS
+    counts = np.bincount(bins.ravel(), minlength=fractions.shape[1] * MC_BINS)
+    return counts.reshape(fractions.shape[1], MC_BINS).astype(np.int32)
+
+
+# Interpolated quantiles (rows x len(quantiles)) from per-row histograms
+def _histogram_quantiles(counts, lower, upper, quantiles=QUANTILES):
+    cumulative = np.cumsum(counts, axis=1)
+    total = cumulative[:, -1:]
+    bin_width = (upper - lower) / MC_BINS
+    result = np.empty((counts.shape[0], len(quantiles)))
+    for column, quantile in enumerate(quantiles):
+        target = quantile * total
+        index = np.minimum((cumulative < target).sum(axis=1), MC_BINS - 1)
+        below = np.take_along_axis(cumulative, index[:, None], axis=1) - np.take_along_axis(counts, index[:, None], axis=1)
+        in_bin = np.maximum(np.take_along_axis(counts, index[:, None], axis=1), 1)
+        position = np.clip((target - below) / in_bin, 0, 1)[:, 0]
+        result[:, column] = lower + (index + position) * bin_width
+    return result
+
+
+def _bands(counts, draws, total_draws, lower, upper, revenue, baseline_cogs):
+    fraction_quantiles = _histogram_quantiles(counts, lower, upper)
+    revenue = np.append(revenue, revenue.sum())
+    baseline_cogs = np.append(baseline_cogs, baseline_cogs.sum())
+    # Profit falls as the tariff cost fraction rises, so P5 profit comes from P95 cost
+    profit = revenue[:, None] - baseline_cogs[:, None] * (1 + fraction_quantiles[:, ::-1])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        margin = np.where(revenue[:, None] != 0, profit / revenue[:, None] * 100, np.nan)
+    return MonteCarloBands(draws, total_draws, profit, margin, revenue[-1])
+
+
+# Run n_draws Monte Carlo draws of `model` in batches, yielding converging
+# P5/P50/P95 profit and margin bands after every finished batch. Large runs
+# are spread over a process pool.
+def run_monte_carlo(model, revenue, n_draws, seed=None, profit_margin=BASELINE_PROFIT_MARGIN,
+                    max_workers=MC_MAX_WORKERS, batch_cells=MC_BATCH_CELLS, parallel_cells=MC_PARALLEL_CELLS):
+    revenue = np.asarray(revenue, dtype=float)
+    _, baseline_cogs, _ = baseline_costs(revenue, profit_margin, TARIFF_SHARE_OF_COGS)
+    total_cogs = baseline_cogs.sum()
+    weights = baseline_cogs / total_cogs if total_cogs else np.zeros_like(baseline_cogs)
+
+    lower, upper = model.bounds()
+    lower = np.append(lower, weights @ lower)
+    upper = np.append(upper, weights @ upper)
+
+    batch_draws = max(1, batch_cells // max(model.cells_per_draw, 1))
+    batch_sizes = [min(batch_draws, n_draws - start) for start in range(0, n_draws, batch_draws)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batch_sizes))
+
+    counts = np.zeros((model.n_entities + 1, MC_BINS), dtype=np.int64)
+    draws = 0
+    if max_workers <= 1 or n_draws * model.cells_per_draw < parallel_cells:
+        for batch_seed, size in zip(seeds, batch_sizes):
+            counts += _simulate_batch(model, weights, lower, upper, batch_seed, size)
+            draws += size
+            yield _bands(counts, draws, n_draws, lower, upper, revenue, baseline_cogs)
+        return
+
+    pending_batches = deque(zip(seeds, batch_sizes))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+        while pending_batches or running:
+            # Keep a bounded number of batches in flight so memory stays flat
+            while pending_batches and len(running) < 2 * max_workers:
+                batch_seed, size = pending_batches.popleft()
+                future = executor.submit(_simulate_batch, model, weights, lower, upper, batch_seed, size)
+                running[future] = size
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                counts += future.result()
+                draws += running.pop(future)
+            yield _bands(counts, draws, n_draws, lower, upper, revenue, baseline_cogs)
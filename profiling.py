@@ -0,0 +1,68 @@
+import cProfile
+import os
+import random
+import time
+from urllib.parse import parse_qs, urlparse
+
+from flask import g, request
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', '.cache/profiles')
+# Fraction of flagged requests that are actually profiled
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 1.0))
+
+
+# Profiler requested with ?profile=cprofile or ?profile=pyinstrument, either on
+# the request itself or on the dashboard page that sent it (callback requests
+# carry the page URL in their Referer)
+def _requested_profiler():
+    mode = request.args.get('profile')
+    if mode is None and 'profile=' in (request.referrer or ''):
+        mode = parse_qs(urlparse(request.referrer).query).get('profile', [None])[0]
+    return mode
+
+
+def _profile_path(extension):
+    name = request.path.strip('/').replace('/', '_') or 'index'
+    return os.path.join(PROFILE_DIR, f"{time.time():.3f}-{name}-{os.getpid()}.{extension}")
+
+
+# Profile flagged requests on `server` and write one file per request to
+# PROFILE_DIR (.prof for cProfile, .html for pyinstrument). Unflagged requests
+# only pay for a query-string and header lookup.
+def install_profiling(server):
+    @server.before_request
+    def start_profiler():
+        mode = _requested_profiler()
+        if mode is None or random.random() >= PROFILE_SAMPLE_RATE:
+            return
+        if mode == 'pyinstrument' and pyinstrument is not None:
+            profiler = pyinstrument.Profiler()
+            profiler.start()
+        else:
+            mode = 'cprofile'
+            profiler = cProfile.Profile()
+            profiler.enable()
+        g.profiler = (mode, profiler)
+
+    @server.after_request
+    def stop_profiler(response):
+        mode, profiler = g.pop('profiler', (None, None))
+        if profiler is None:
+            return response
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if mode == 'pyinstrument':
+            profiler.stop()
+            path = _profile_path('html')
+            with open(path, 'w') as f:
+                f.write(profiler.output_html())
+        else:
+            profiler.disable()
+            path = _profile_path('prof')
+            profiler.dump_stats(path)
+        response.headers['X-Profile'] = path
+        return response
@@ -0,0 +1,101 @@
+import hashlib
+import json
+from collections import namedtuple
+
+import numpy as np
+
+from scenarios import competitor_tariff_sweep, sweep_by_group, tariff_sweep
+
+# Results of one schedule: brands, business units and competitors are
+# TariffSweeps with one column per period
+TariffProjection = namedtuple('TariffProjection', ['periods', 'brands', 'business_units', 'competitors'])
+
+
+class TariffSchedule:
+    """Tariff increases phasing in over periods, optionally per supplier country.
+
+    Every period gives the increases (in %) in force during it: `tariffs` for
+    the brands' tariff trade costs and `country_tariffs` ({country: [% per
+    period]}) for the competitors' imports from each supplier country.
+    Schedules compare and hash by a digest of their content, so equal
+    schedules share one cache entry however they were entered.
+    """
+
+    def __init__(self, periods, tariffs, country_tariffs=None):
+        self.periods = [str(period) for period in periods]
+        self.tariffs = np.array([float(tariff or 0) for tariff in tariffs])
+        # Countries without any tariff in the schedule are dropped
+        self.country_tariffs = {
+            str(country): [float(tariff or 0) for tariff in values]
+            for country, values in sorted((country_tariffs or {}).items())
+            if any(values)
+        }
+        content = json.dumps(
+            {'periods': self.periods, 'tariffs': self.tariffs.tolist(), 'countries': self.country_tariffs},
+            sort_keys=True
+        )
+        self.key = hashlib.sha1(content.encode()).hexdigest()
+
+    # Schedule from DataTable rows: {'period', 'tariff', <country>: %, ...} per
+    # period. Rows without a period label are numbered.
+    @classmethod
+    def from_rows(cls, rows):
+        rows = [row for row in rows or [] if any(value not in (None, '') for value in row.values())]
+        countries = {name for row in rows for name in row if name not in ('period', 'tariff')}
+        return cls(
+            [row.get('period') or f'Period {position + 1}' for position, row in enumerate(rows)],
+            [_number(row.get('tariff')) for row in rows],
+            {country: [_number(row.get(country)) for row in rows] for country in countries}
+        )
+
+    # (periods x countries) tariff increases as fractions, columns in the order
+    # of `countries`; countries not in the list are ignored
+    def country_matrix(self, countries):
+        matrix = np.zeros((len(self.periods), len(countries)))
+        for position, country in enumerate(countries):
+            if country in self.country_tariffs:
+                matrix[:, position] = np.array(self.country_tariffs[country]) / 100
+        return matrix
+
+    def __eq__(self, other):
+        return isinstance(other, TariffSchedule) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    # Also the key of shared scenario results (see session_store)
+    def __repr__(self):
+        return f'TariffSchedule({self.key})'
+
+
+# Table cells are strings or numbers; blank or invalid ones count as 0
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# Revenue, COGS, profit and margin of every brand, business unit and
+# competitor in every period of the schedule. Each is one broadcast over
+# (entities x periods); competitor exposures for all periods come from one
+# product with the competitor x supplier-country import share matrix.
+def project_schedule(snapshot, schedule):
+    brands = tariff_sweep(snapshot.brands['brand_revenue_USD'].to_numpy(dtype=float), schedule.tariffs)
+
+    index = snapshot.business_unit_index
+    assigned = index.codes >= 0
+    assigned_brands, codes = brands, index.codes
+    if not assigned.all():
+        # Brands without a business unit are left out of the unit totals
+        assigned_brands = brands._replace(
+            revenue=brands.revenue[assigned], cogs=brands.cogs[assigned], profit=brands.profit[assigned],
+            margin=brands.margin[assigned]
+        )
+        codes = index.codes[assigned]
+    business_units = sweep_by_group(assigned_brands, codes, len(index.business_units))
+
+    exposure = snapshot.exposure
+    exposures = exposure.matrix @ schedule.country_matrix(exposure.countries).T
+    competitors = competitor_tariff_sweep(snapshot.competitors['revenue_usd'].to_numpy(dtype=float), exposures)
+    return TariffProjection(schedule.periods, brands, business_units, competitors)
@@ -0,0 +1,72 @@
+import numpy as np
+
+# Relocation criteria: column in relocation_countries.csv -> label. Countries
+# are scored 0-10 per criterion, higher meaning a better relocation target.
+CRITERIA = {
+    'supplier_fit': 'Supplier Complexity Fit',
+    'components_skills': 'Key Components & Skills',
+    'logistics': 'Country Location & Logistics',
+    'operating_costs': 'Operating & Labor Costs',
+    'transport': 'Transport Costs & Time',
+    'tariffs': 'Tariffs & Trade Agreements with USA',
+    'time_to_move': 'Time to Move & Investments',
+}
+DEFAULT_WEIGHTS = {criterion: 1.0 for criterion in CRITERIA}
+
+# How much each criterion matters for a product, matched on brand descriptions:
+# (regex, {criterion: multiplier}). A brand matching several profiles gets the
+# product of their multipliers; brands matching none weigh criteria evenly.
+PRODUCT_PROFILES = [
+    # Electronics and optics depend on specialised component suppliers
+    (r'electric|optic|binocular|scope|rangefinder|gps|simulat|launch monitor|lights|camera|technology',
+     {'supplier_fit': 1.4, 'components_skills': 1.6, 'time_to_move': 1.2, 'operating_costs': 0.8}),
+    # Sewn and soft goods are labour intensive
+    (r'apparel|outerwear|wader|shoes|packs|gear|goggles',
+     {'operating_costs': 1.6, 'supplier_fit': 1.1, 'components_skills': 0.8}),
+    # Bulky hard goods are sensitive to freight
+    (r'helmet|bottle|grill|stove|cook|pump|rack|blind|call|bike',
+     {'logistics': 1.3, 'transport': 1.3}),
+]
+
+
+class RelocationScorer:
+    """Weighted multi-criteria scores of every brand x candidate country pair.
+
+    Brands carry a need per criterion (from PRODUCT_PROFILES) and countries a
+    0-10 score per criterion. For user weights w the score of brand b in
+    country c is sum(need[b] * w * score[c]) / sum(need[b] * w), i.e. one
+    matrix product for all pairs, on the same 0-10 scale as the inputs.
+    """
+
+    def __init__(self, brands, countries):
+        self.brands = brands['brand_name'].tolist()
+        self.countries = countries['country'].tolist()
+        self._brand_positions = {brand: position for position, brand in enumerate(self.brands)}
+        self.country_scores = countries[list(CRITERIA)].to_numpy(dtype=float)
+
+        descriptions = brands['description'].fillna('').str.lower()
+        self.needs = np.ones((len(self.brands), len(CRITERIA)))
+        for pattern, multipliers in PRODUCT_PROFILES:
+            matched = descriptions.str.contains(pattern, regex=True).to_numpy()
+            profile = np.array([multipliers.get(criterion, 1.0) for criterion in CRITERIA])
+            self.needs[matched] *= profile
+
+    # Weights keyed by criterion (missing ones default to 1) -> vector in CRITERIA order
+    def weight_vector(self, weights):
+        return np.array([max(float(weights.get(criterion, 1.0) or 0), 0.0) for criterion in CRITERIA])
+
+    # (brands x countries) matrix of scores for the given weights
+    def scores(self, weights):
+        weighted_needs = self.needs * self.weight_vector(weights)
+        totals = weighted_needs.sum(axis=1, keepdims=True)
+        # All weights at zero: every country scores 0 rather than NaN
+        totals[totals == 0] = 1
+        return (weighted_needs @ self.country_scores.T) / totals
+
+    def brand_position(self, brand):
+        return self._brand_positions.get(brand)
+
+    # Countries ranked for one row of scores(): [(country, score), ...] best first
+    def ranking(self, brand_scores, top=None):
+        order = np.argsort(-brand_scores, kind='stable')[:top]
+        return [(self.countries[position], float(brand_scores[position])) for position in order]
@@ -0,0 +1,123 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Baseline assumptions shared by every tariff scenario
+BASELINE_PROFIT_MARGIN = 0.5  # Profit is 50% of revenue
+TARIFF_SHARE_OF_COGS = 0.45  # 45% of COGS is tariff trade costs
+
+TariffScenario = namedtuple(
+    'TariffScenario',
+    ['baseline_profit', 'baseline_cogs', 'tariff_trade_costs', 'new_tariff_trade_costs', 'new_cogs', 'new_profit']
+)
+
+CompetitorScenario = namedtuple(
+    'CompetitorScenario', ['baseline_profit', 'baseline_cogs', 'tariff_costs', 'new_cogs', 'new_profit']
+)
+
+TariffSweep = namedtuple('TariffSweep', ['tariff_increases', 'revenue', 'cogs', 'profit', 'margin'])
+
+
+# Baseline profit, COGS and tariff trade costs for an array of revenues
+def baseline_costs(revenue, profit_margin=BASELINE_PROFIT_MARGIN, tariff_share=TARIFF_SHARE_OF_COGS):
+    revenue = np.asarray(revenue, dtype=float)
+    baseline_profit = revenue * profit_margin
+    baseline_cogs = revenue - baseline_profit
+    tariff_trade_costs = baseline_cogs * tariff_share
+    return baseline_profit, baseline_cogs, tariff_trade_costs
+
+
+# Single tariff increase (in %) applied to every revenue entry
+def tariff_scenario(revenue, tariff_increase, profit_margin=BASELINE_PROFIT_MARGIN, tariff_share=TARIFF_SHARE_OF_COGS):
+    revenue = np.asarray(revenue, dtype=float)
+    baseline_profit, baseline_cogs, tariff_trade_costs = baseline_costs(revenue, profit_margin, tariff_share)
+    new_tariff_trade_costs = tariff_trade_costs * (1 + tariff_increase / 100)
+    new_cogs = baseline_cogs + (new_tariff_trade_costs - tariff_trade_costs)
+    new_profit = revenue - new_cogs
+    return TariffScenario(baseline_profit, baseline_cogs, tariff_trade_costs, new_tariff_trade_costs, new_cogs, new_profit)
+
+
+# Competitor scenario: each competitor's COGS rises by its weighted tariff
+# exposure (import share x tariff increase, summed over supplier countries)
+def competitor_tariff_scenario(revenue, tariff_exposure, profit_margin=BASELINE_PROFIT_MARGIN):
+    revenue = np.asarray(revenue, dtype=float)
+    baseline_profit, baseline_cogs, _ = baseline_costs(revenue, profit_margin)
+    tariff_costs = baseline_cogs * tariff_exposure
+    new_cogs = baseline_cogs + tariff_costs
+    new_profit = revenue - new_cogs
+    return CompetitorScenario(baseline_profit, baseline_cogs, tariff_costs, new_cogs, new_profit)
+
+
+# Grid of tariff increases in %, e.g. tariff_grid(0, 200, 1) -> 0, 1, ..., 200
+def tariff_grid(start, stop, step):
+    count = int(np.floor((stop - start) / step + 1e-9)) + 1
+    return start + step * np.arange(max(count, 1), dtype=float)
+
+
+# 100 / revenue, NaN where revenue is zero
+def _percent_of(revenue):
+    return np.divide(100.0, revenue, out=np.full(revenue.shape, np.nan), where=revenue != 0)
+
+
+# Evaluate every revenue entry against every tariff increase in one broadcast.
+# Returns (n_entries, n_tariffs) arrays of COGS, profit and margin (in %).
+def tariff_sweep(revenue, tariff_increases, profit_margin=BASELINE_PROFIT_MARGIN, tariff_share=TARIFF_SHARE_OF_COGS):
+    revenue = np.asarray(revenue, dtype=float)
+    tariff_increases = np.asarray(tariff_increases, dtype=float)
+    _, baseline_cogs, tariff_trade_costs = baseline_costs(revenue, profit_margin, tariff_share)
+
+    cogs = np.multiply.outer(tariff_trade_costs, tariff_increases / 100)
+    cogs += baseline_cogs[:, None]
+    profit = np.subtract(revenue[:, None], cogs)
+    margin = profit * _percent_of(revenue)[:, None]
+    return TariffSweep(tariff_increases, revenue, cogs, profit, margin)
+
+
+# Competitor counterpart of tariff_sweep: every revenue entry against several
+# tariff exposures at once. tariff_exposures is (n_entries, n_scenarios) and is
+# kept (in %) as the sweep's tariff_increases, since it differs per entry.
+def competitor_tariff_sweep(revenue, tariff_exposures, profit_margin=BASELINE_PROFIT_MARGIN):
+    revenue = np.asarray(revenue, dtype=float)
+    tariff_exposures = np.asarray(tariff_exposures, dtype=float)
+    _, baseline_cogs, _ = baseline_costs(revenue, profit_margin)
+
+    cogs = baseline_cogs[:, None] * (1 + tariff_exposures)
+    profit = np.subtract(revenue[:, None], cogs)
+    margin = profit * _percent_of(revenue)[:, None]
+    return TariffSweep(tariff_exposures * 100, revenue, cogs, profit, margin)
+
+
+# Revenue, COGS and profit summed over all entries of a sweep, with the
+# resulting margin: one value per tariff scenario
+def sweep_total(sweep):
+    revenue = sweep.revenue.sum()
+    profit = sweep.profit.sum(axis=0)
+    margin = profit * 100 / revenue if revenue else np.full(profit.shape, np.nan)
+    return revenue, sweep.cogs.sum(axis=0), profit, margin
+
+
+# Sum the rows of a (n_entries, ...) array per group code
+def group_sum(codes, n_groups, values):
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        return np.bincount(codes, weights=values, minlength=n_groups)
+    # A one-hot matrix product keeps the reduction in BLAS for 2-D inputs
+    membership = np.zeros((n_groups, len(codes)))
+    membership[codes, np.arange(len(codes))] = 1
+    return membership @ values
+
+
+# Aggregate a brand-level sweep into one curve per group (e.g. business unit)
+def sweep_by_group(sweep, codes, n_groups):
+    revenue = group_sum(codes, n_groups, sweep.revenue)
+    cogs = group_sum(codes, n_groups, sweep.cogs)
+    profit = group_sum(codes, n_groups, sweep.profit)
+    margin = profit * _percent_of(revenue)[:, None]
+    return TariffSweep(sweep.tariff_increases, revenue, cogs, profit, margin)
+
+
+# Tariff increase (in %) at which profit reaches zero; inf when there are no tariff costs
+def break_even_tariff_increase(revenue, profit_margin=BASELINE_PROFIT_MARGIN, tariff_share=TARIFF_SHARE_OF_COGS):
+    baseline_profit, _, tariff_trade_costs = baseline_costs(revenue, profit_margin, tariff_share)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(tariff_trade_costs > 0, baseline_profit / tariff_trade_costs * 100, np.inf)
@@ -0,0 +1,115 @@
+import gzip
+import os
+import threading
+from collections import OrderedDict
+
+from flask import g, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses smaller than this many bytes are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+# gzip level (1-9); brotli, when installed, uses the quality below
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript')
+# Compressed bodies of static responses (with an ETag, or cacheable like Dash's
+# fingerprinted script bundles), kept per worker so each is compressed once
+STATIC_CACHE_SIZE = 64
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, with NumPy arrays and scalars encoded natively.
+
+    jsonify passes `separators` (compact output, which orjson always writes) or
+    `indent` (pretty output in debug mode, mapped to OPT_INDENT_2). Falls back
+    to the standard library encoder when orjson is not installed or a caller
+    passes any other json.dumps keyword argument.
+    """
+
+    def dumps(self, obj, **kwargs):
+        options = dict(kwargs)
+        options.pop('separators', None)
+        indent = options.pop('indent', None)
+        default = options.pop('default', self.default)
+        sort_keys = options.pop('sort_keys', self.sort_keys)
+        if orjson is None or options:
+            return super().dumps(obj, **kwargs)
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=default, option=option).decode()
+
+
+def _encoding():
+    accepted = request.headers.get('Accept-Encoding', '').lower()
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=COMPRESS_LEVEL, mtime=0)
+
+
+# Use orjson for Flask's JSON responses and for Dash callback responses, which
+# Dash encodes with plotly.io.json (pinned to its orjson engine rather than
+# left to whatever the 'auto' default resolves to).
+def install_fast_json(server):
+    if orjson is not None:
+        import plotly.io.json
+
+        server.json = OrjsonProvider(server)
+        plotly.io.json.config.default_engine = 'orjson'
+
+
+# Compress responses of at least COMPRESS_MIN_BYTES with brotli (when installed
+# and accepted) or gzip. The uncompressed size of each response is left in
+# g.uncompressed_bytes for the payload metrics.
+def install_compression(server):
+    static_bodies = OrderedDict()
+    lock = threading.Lock()
+
+    @server.after_request
+    def compress_response(response):
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES)):
+            return response
+        data = response.get_data()
+        g.uncompressed_bytes = len(data)
+        encoding = _encoding()
+        if encoding is None or len(data) < COMPRESS_MIN_BYTES:
+            return response
+
+        static = response.headers.get('ETag') or (request.full_path if response.cache_control.max_age else None)
+        key = (static, encoding)
+        with lock:
+            body = static_bodies.get(key) if key[0] else None
+        if body is None:
+            body = compress(data, encoding)
+            if key[0]:
+                with lock:
+                    static_bodies[key] = body
+                    while len(static_bodies) > STATIC_CACHE_SIZE:
+                        static_bodies.popitem(last=False)
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
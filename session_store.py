@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import random
+import time
+
+from sqlite_store import SQLiteStore
+
+# sqlite:///path (default) or a redis:// / rediss:// / unix:// URL
+SESSION_STORE_URL = os.getenv('SESSION_STORE_URL', 'sqlite:///.cache/sessions.sqlite3')
+# Session state expires this long after its last update
+SESSION_TTL_SECONDS = int(os.getenv('SESSION_TTL_SECONDS', 7 * 24 * 3600))
+# Scenario results shared between workers expire this long after being computed
+SCENARIO_RESULT_TTL_SECONDS = int(os.getenv('SCENARIO_RESULT_TTL_SECONDS', 24 * 3600))
+# Only results that took at least this long to compute are shared; cheaper ones
+# are faster to recompute than to encode, store and fetch
+SCENARIO_SHARE_MIN_SECONDS = float(os.getenv('SCENARIO_SHARE_MIN_SECONDS', 0.01))
+
+
+class SQLiteBackend(SQLiteStore):
+    """Local stand-in for the subset of the Redis API used by SessionStore.
+
+    get, set (with an expiry in seconds), delete and scan_iter behave like
+    their redis.Redis counterparts, with values stored as bytes in one SQLite
+    table shared by every worker process.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires_at REAL
+            )
+        """)
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT value FROM entries WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, time.time())
+        ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def set(self, key, value, ex=None):
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        expires_at = time.time() + ex if ex else None
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)", (key, value, expires_at)
+        )
+        # Expired entries are dropped now and then, on writes
+        if random.random() < 0.01:
+            conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+        return True
+
+    def delete(self, *keys):
+        if not keys:
+            return 0
+        return self._connect().execute(
+            f"DELETE FROM entries WHERE key IN ({', '.join('?' * len(keys))})", keys
+        ).rowcount
+
+    # Keys matching a glob pattern, like Redis SCAN MATCH
+    def scan_iter(self, match='*'):
+        return (key for key, in self._connect().execute("SELECT key FROM entries WHERE key GLOB ?", (match,)))
+
+
+# Backend for a SESSION_STORE_URL: redis.Redis for Redis URLs (needs the redis
+# package), SQLiteBackend otherwise
+def backend_from_url(url):
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        import redis
+
+        return redis.Redis.from_url(url)
+    return SQLiteBackend(url.removeprefix('sqlite:///'))
+
+
+class SessionStore:
+    """Per-session state and shared scenario results, on a Redis-compatible backend.
+
+    The browser only keeps a session id (in a dcc.Store); state such as the
+    chat history lives here under session:<id>:<name>, so any worker can serve
+    any request. Scenario results are stored under result:<namespace>:<digest
+    of the arguments> so a scenario computed by one worker is reused by all.
+    Values are JSON.
+    """
+
+    def __init__(self, backend, ttl=SESSION_TTL_SECONDS, result_ttl=SCENARIO_RESULT_TTL_SECONDS,
+                 share_min_seconds=SCENARIO_SHARE_MIN_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self.result_ttl = result_ttl
+        self.share_min_seconds = share_min_seconds
+
+    def get(self, session_id, name, default=None):
+        if not session_id:
+            return default
+        value = self.backend.get(f'session:{session_id}:{name}')
+        return json.loads(value) if value is not None else default
+
+    def set(self, session_id, name, value):
+        if session_id:
+            self.backend.set(f'session:{session_id}:{name}', json.dumps(value), ex=self.ttl)
+
+    def delete(self, session_id, name):
+        self.backend.delete(f'session:{session_id}:{name}')
+
+    # Result of func(*args), reused by every worker while it is stored.
+    # Arguments are keyed by repr, so they must repr the same in every process.
+    def result(self, namespace, args, func):
+        digest = hashlib.sha256(repr(args).encode('utf-8')).hexdigest()
+        key = f'result:{namespace}:{digest}'
+        value = self.backend.get(key)
+        if value is not None:
+            return json.loads(value)
+        started = time.perf_counter()
+        result = func(*args)
+        if time.perf_counter() - started >= self.share_min_seconds:
+            self.backend.set(key, json.dumps(result), ex=self.result_ttl)
+        return result
+
+    def clear_results(self):
+        keys = list(self.backend.scan_iter(match='result:*'))
+        if keys:
+            self.backend.delete(*keys)
@@ -0,0 +1,262 @@
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+
+import pandas as pd
+
+from sqlite_store import SQLiteStore
+
+ANSWER_INDEX_PATH = os.getenv('ANSWER_INDEX_PATH', '.cache/answers.sqlite3')
+# Resolved answers are reused for this long, like the OpenAI responses they came from
+ANSWER_TTL_SECONDS = float(os.getenv('ANSWER_TTL_SECONDS', os.getenv('LLM_CACHE_TTL_SECONDS', 24 * 3600)))
+# Cosine similarity above which two descriptions count as the same product category.
+# Rewordings of a catalog description score 0.6 and up; distinct catalog products
+# that merely share a word ("helmets", "hunting") stay below 0.35.
+SIMILARITY_THRESHOLD = float(os.getenv('SIMILARITY_THRESHOLD', 0.6))
+# Seconds between checks for answers stored by other workers
+ANSWER_SYNC_INTERVAL = 1.0
+
+STOPWORDS = frozenset({
+    'a', 'an', 'and', 'as', 'at', 'by', 'designed', 'for', 'from', 'in', 'including', 'into', 'like', 'of',
+    'on', 'or', 'other', 'products', 'such', 'the', 'to', 'use', 'with'
+})
+
+
+# Lower-cased content words with a crude plural stem ("helmets" -> "helmet")
+def tokenize(text):
+    tokens = []
+    for word in re.findall(r'[a-z0-9]+', str(text).lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+class DescriptionIndex:
+    """TF-IDF index over the distinct product descriptions of the catalog.
+
+    Document frequencies come from the catalog, so words shared by many
+    products ("accessories", "outdoor") weigh little and distinctive ones
+    ("helmet", "rangefinder") a lot. Vectors are sparse {term: weight} dicts,
+    L2-normalised, so the similarity of two descriptions is their dot product.
+    """
+
+    def __init__(self, descriptions):
+        codes, uniques = pd.factorize(descriptions.fillna(''))
+        self.descriptions = [str(description) for description in uniques]
+        # Position in self.descriptions of every catalog row
+        self.codes = codes
+        term_lists = [set(tokenize(description)) for description in self.descriptions]
+        document_frequency = defaultdict(int)
+        for terms in term_lists:
+            for term in terms:
+                document_frequency[term] += 1
+        n = len(self.descriptions)
+        self.idf = {term: math.log((n + 1) / (count + 1)) + 1 for term, count in document_frequency.items()}
+        # Words the catalog has never seen are as distinctive as it gets
+        self.unknown_idf = math.log(n + 1) + 1
+        self._catalog = VectorIndex()
+        for position, description in enumerate(self.descriptions):
+            self._catalog.add(position, self.vector(description))
+        self._answers = {}
+        self._lock = threading.Lock()
+
+    def vector(self, text):
+        counts = defaultdict(int)
+        for term in tokenize(text):
+            counts[term] += 1
+        weights = {term: count * self.idf.get(term, self.unknown_idf) for term, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        return {term: weight / norm for term, weight in weights.items()}
+
+    # Catalog descriptions most similar to `text`: [(description, similarity), ...] best first
+    def similar(self, text, top=5, threshold=0.0):
+        return [
+            (self.descriptions[position], score)
+            for position, score in self._catalog.search(self.vector(text), top, threshold)
+        ]
+
+    # Answers resolved so far for one kind of lookup ('tariff', 'suppliers'),
+    # searchable with this index's weights
+    def answers(self, kind):
+        with self._lock:
+            if kind not in self._answers:
+                self._answers[kind] = SimilarAnswers(self, kind, answer_store)
+            return self._answers[kind]
+
+    # Forget resolved answers, in this index and in the shared store. Other
+    # workers keep the answers they already loaded until their data reloads.
+    def clear_answers(self):
+        with self._lock:
+            self._answers.clear()
+        answer_store.clear()
+
+
+class VectorIndex:
+    """Inverted index of sparse vectors for cosine-similarity search."""
+
+    def __init__(self):
+        self.postings = defaultdict(list)
+
+    def add(self, key, vector):
+        for term, weight in vector.items():
+            self.postings[term].append((key, weight))
+
+    # [(key, similarity), ...] of the `top` best matches at or above threshold
+    def search(self, vector, top=1, threshold=0.0):
+        scores = defaultdict(float)
+        for term, weight in vector.items():
+            for key, other in self.postings.get(term, ()):
+                scores[key] += weight * other
+        best = sorted(scores.items(), key=lambda item: -item[1])[:top]
+        return [(key, score) for key, score in best if score >= threshold]
+
+
+class AnswerStore(SQLiteStore):
+    """SQLite table of resolved lookups (description -> answer) shared by every worker.
+
+    Answers expire `ttl` seconds after they were stored; expired rows are
+    skipped when read and deleted whenever a new answer is added.
+    """
+
+    def __init__(self, path, ttl=ANSWER_TTL_SECONDS):
+        super().__init__(path)
+        self.ttl = ttl
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                text TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                UNIQUE (kind, text)
+            )
+        """)
+
+    def add(self, kind, text, answer):
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO answers (kind, text, answer, created_at) VALUES (?, ?, ?, ?)",
+            (kind, text, json.dumps(answer), now)
+        )
+        conn.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl,))
+
+    # Unexpired answers of `kind` stored after row `after`:
+    # [(row id, text, answer, created_at), ...]
+    def since(self, kind, after):
+        rows = self._connect().execute(
+            "SELECT id, text, answer, created_at FROM answers WHERE kind = ? AND id > ? AND created_at >= ? "
+            "ORDER BY id",
+            (kind, after, time.time() - self.ttl)
+        ).fetchall()
+        return [(row_id, text, json.loads(answer), created_at) for row_id, text, answer, created_at in rows]
+
+    def clear(self):
+        self._connect().execute("DELETE FROM answers")
+
+
+answer_store = AnswerStore(ANSWER_INDEX_PATH)
+
+
+class SimilarAnswers:
+    """Resolved answers searchable by description similarity.
+
+    Answers added by other workers are picked up incrementally from the store,
+    at most once per ANSWER_SYNC_INTERVAL. Once the oldest loaded answer
+    expires, they are all reloaded from the store, which leaves expired ones
+    out. Without a store, answers live only in this object (used to group
+    near-duplicates within one batch of lookups).
+    """
+
+    def __init__(self, index, kind, store=None):
+        self.index = index
+        self.kind = kind
+        self.store = store
+        self._reset()
+        self._last_sync = 0.0
+        self._lock = threading.Lock()
+
+    def _reset(self):
+        self._vectors = VectorIndex()
+        self._answers = {}
+        self._last_row = 0
+        self._oldest = math.inf
+
+    def _sync(self):
+        now = time.monotonic()
+        if self.store is None or now - self._last_sync < ANSWER_SYNC_INTERVAL:
+            return
+        self._last_sync = now
+        if self._oldest < time.time() - self.store.ttl:
+            self._reset()
+        for row_id, text, answer, created_at in self.store.since(self.kind, self._last_row):
+            self._remember(text, answer)
+            self._last_row = row_id
+            self._oldest = min(self._oldest, created_at)
+
+    def _remember(self, text, answer):
+        if text not in self._answers:
+            self._vectors.add(text, self.index.vector(text))
+        self._answers[text] = answer
+
+    # Answer of the most similar resolved description, or None
+    def match(self, text, threshold=SIMILARITY_THRESHOLD):
+        with self._lock:
+            self._sync()
+            if text in self._answers:
+                return self._answers[text]
+            best = self._vectors.search(self.index.vector(text), 1, threshold)
+            return self._answers[best[0][0]] if best else None
+
+    def add(self, text, answer):
+        with self._lock:
+            if self.store is not None:
+                self.store.add(self.kind, text, answer)
+                self._oldest = min(self._oldest, time.time())
+            self._remember(text, answer)
+
+
+# Split lookup items ({'id', 'description', ...}) into rows answered from
+# `answers` and the items still to look up: one representative per group of
+# near-duplicate descriptions. Returns (reused rows, representatives, followers)
+# where followers maps a representative's id to the ids sharing its answer.
+def plan_lookups(items, answers):
+    reused, representatives, followers = [], [], {}
+    pending = SimilarAnswers(answers.index, answers.kind)
+    for item in items:
+        rows = answers.match(item['description'])
+        if rows is not None:
+            reused += [{**row, 'id': item['id']} for row in rows]
+            continue
+        representative = pending.match(item['description'])
+        if representative is not None:
+            followers[representative].append(item['id'])
+            continue
+        pending.add(item['description'], item['id'])
+        representatives.append(item)
+        followers[item['id']] = []
+    return reused, representatives, followers
+
+
+# Store the looked-up rows of each representative in `answers` and copy them
+# to its followers
+def share_answers(rows, representatives, followers, answers):
+    by_id = defaultdict(list)
+    for row in rows:
+        by_id[row['id']].append({name: value for name, value in row.items() if name != 'id'})
+    shared = []
+    for item in representatives:
+        item_rows = by_id.get(item['id'])
+        if not item_rows:
+            continue
+        answers.add(item['description'], item_rows)
+        for target in [item['id']] + followers[item['id']]:
+            shared += [{**row, 'id': target} for row in item_rows]
+    return shared
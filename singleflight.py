@@ -0,0 +1,150 @@
+import asyncio
+import os
+import threading
+import time
+
+import diskcache
+
+
+class SingleFlightTimeout(TimeoutError):
+    """Raised to a waiter whose leader has not published a result in time."""
+
+
+class SingleFlight:
+    """Coalesce identical in-flight requests across threads and worker processes.
+
+    The first caller for a key takes a lock in a local diskcache directory and
+    issues the request; it must publish the result somewhere `load` can see it
+    (the LLM response cache). Everyone else with the same key waits for the lock
+    to go away and reads that result. A leader that fails publishes its
+    exception next to the lock instead, and its waiters raise it rather than
+    repeat the call. Waiters in the leader's process are woken directly;
+    waiters in other processes poll. Nobody waits longer than `timeout`
+    seconds, which is also when the lock of a leader that died expires.
+    """
+
+    def __init__(self, directory, timeout=120, poll_interval=0.05):
+        self.cache = diskcache.Cache(directory)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._events = {}
+        self._events_lock = threading.Lock()
+
+    def _lock_key(self, key):
+        return f'inflight:{key}'
+
+    def _error_key(self, key):
+        return f'failed:{key}'
+
+    def _acquire(self, key):
+        if not self.cache.add(self._lock_key(key), os.getpid(), expire=self.timeout):
+            return False
+        with self._events_lock:
+            self._events[key] = threading.Event()
+        return True
+
+    def _release(self, key):
+        self.cache.delete(self._lock_key(key))
+        with self._events_lock:
+            event = self._events.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def _event(self, key):
+        with self._events_lock:
+            return self._events.get(key)
+
+    def _count(self, name):
+        self.cache.incr(f'count:{name}', default=0)
+
+    # Best effort: an exception that cannot be stored leaves the waiters to
+    # retry once the lock is gone
+    def _publish_error(self, key, exc):
+        try:
+            self.cache.set(self._error_key(key), (time.time(), exc), expire=self.timeout)
+        except Exception:
+            pass
+
+    # Return fetch() if this caller leads, or the leader's result via load().
+    # load returns None until a result is available. Waits at most `timeout`
+    # seconds (capped at the instance's), then raises SingleFlightTimeout.
+    def run(self, key, fetch, load, timeout=None):
+        started = time.time()
+        deadline = time.monotonic() + min(timeout or self.timeout, self.timeout)
+        while True:
+            if self._acquire(key):
+                try:
+                    value = self._published(load)
+                    if value is None:
+                        self._count('issued')
+                        try:
+                            value = fetch()
+                        except Exception as exc:
+                            self._publish_error(key, exc)
+                            raise
+                    return value
+                finally:
+                    self._release(key)
+            event = self._event(key)
+            if event is not None:
+                event.wait(self.poll_interval)
+            else:
+                time.sleep(self.poll_interval)
+            value = self._follow(key, load, started, deadline)
+            if value is not None:
+                return value
+
+    # Async counterpart of run; fetch returns an awaitable
+    async def arun(self, key, fetch, load, timeout=None):
+        started = time.time()
+        deadline = time.monotonic() + min(timeout or self.timeout, self.timeout)
+        while True:
+            if self._acquire(key):
+                try:
+                    value = self._published(load)
+                    if value is None:
+                        self._count('issued')
+                        try:
+                            value = await fetch()
+                        except Exception as exc:
+                            self._publish_error(key, exc)
+                            raise
+                    return value
+                finally:
+                    self._release(key)
+            await asyncio.sleep(self.poll_interval)
+            value = self._follow(key, load, started, deadline)
+            if value is not None:
+                return value
+
+    # A result published by a leader that finished between our miss and now
+    def _published(self, load):
+        value = load()
+        if value is not None:
+            self._count('coalesced')
+        return value
+
+    # A waiter's view of the lock: the leader's result, or None to keep waiting
+    # (or take the lock once it is free and nothing was published). Raises the
+    # error of a leader that failed after this waiter started, and
+    # SingleFlightTimeout once the deadline has passed.
+    def _follow(self, key, load, started, deadline):
+        if self._lock_key(key) not in self.cache:
+            value = self._published(load)
+            if value is not None:
+                return value
+            failed = self.cache.get(self._error_key(key))
+            if failed is not None and failed[0] >= started:
+                raise failed[1]
+        if time.monotonic() >= deadline:
+            raise SingleFlightTimeout("No result from the identical request in flight before the deadline")
+        return None
+
+    def stats(self):
+        return {
+            'issued': self.cache.get('count:issued', 0),
+            'coalesced': self.cache.get('count:coalesced', 0),
+        }
+
+    def clear(self):
+        self.cache.clear()
@@ -0,0 +1,28 @@
+import os
+import sqlite3
+import threading
+
+
+class SQLiteStore:
+    """Base for the SQLite files shared by every worker process.
+
+    Creates the file's directory and hands out one connection per thread and
+    process (connections must not cross a fork); WAL lets readers in other
+    workers proceed during writes. Subclasses create their tables in
+    ``__init__`` after calling this one, and run statements on ``_connect()``.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
@@ -0,0 +1,124 @@
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+# Dash DataTable filter operators, in the order they must be matched
+# (longer symbols before their prefixes)
+FILTER_OPERATORS = [
+    ('ge', ('ge ', '>=')),
+    ('le', ('le ', '<=')),
+    ('lt', ('lt ', '<')),
+    ('gt', ('gt ', '>')),
+    ('ne', ('ne ', '!=')),
+    ('eq', ('eq ', '=')),
+    ('contains', ('contains ',)),
+    ('datestartswith', ('datestartswith ',)),
+]
+# Operators that match text; their operand is kept as typed ("2", not 2.0)
+TEXT_OPERATORS = ('contains', 'datestartswith')
+
+_COLUMN = re.compile(r'\{(?P<column>[^}]+)\}\s*(?P<rest>.*)', re.DOTALL)
+
+
+def _parse_value(text, numeric=True):
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in ('"', "'", '`'):
+        return text[1:-1]
+    if not numeric:
+        return text
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def _match_operator(rest):
+    for operator, symbols in FILTER_OPERATORS:
+        for symbol in symbols:
+            if rest.startswith(symbol):
+                return operator, _parse_value(rest[len(symbol):], numeric=operator not in TEXT_OPERATORS)
+    return None
+
+
+# Parse one "{column} operator value" clause into (column, operator, value, case_sensitive)
+def parse_filter_part(part):
+    match = _COLUMN.match(part.strip())
+    if match is None:
+        return None
+    column, rest = match.group('column'), match.group('rest')
+    # Dash prefixes operators with "s" (case-sensitive) or "i" (case-insensitive)
+    if rest[:1] in ('s', 'i'):
+        parsed = _match_operator(rest[1:])
+        if parsed is not None:
+            return (column, *parsed, rest[0] == 's')
+    parsed = _match_operator(rest)
+    return None if parsed is None else (column, *parsed, True)
+
+
+def parse_filter_query(filter_query):
+    if not filter_query:
+        return []
+    clauses = (parse_filter_part(part) for part in filter_query.split(' && '))
+    return [clause for clause in clauses if clause is not None]
+
+
+# Vectorized boolean mask for one parsed clause
+def _clause_mask(frame, column, operator, value, case_sensitive=True):
+    series = frame[column]
+    numeric = pd.api.types.is_numeric_dtype(series)
+    if operator in TEXT_OPERATORS:
+        text = series.astype(str)
+        if numeric:
+            # Numbers as the browser prints them: 7.0 -> "7"
+            text = text.str.removesuffix('.0')
+        if operator == 'contains':
+            return text.str.contains(str(value), case=case_sensitive, regex=False).to_numpy()
+        return text.str.startswith(str(value)).to_numpy()
+    if numeric and isinstance(value, str):
+        # A text value can never match a numeric column
+        return np.full(len(frame), operator == 'ne')
+    if not numeric:
+        series = series.astype(str)
+        # Dash sends unquoted numbers; compare them as they were typed
+        value = f"{value:g}" if isinstance(value, float) else value
+        if not case_sensitive:
+            series, value = series.str.lower(), value.lower()
+    compare = {
+        'eq': series.eq, 'ne': series.ne, 'lt': series.lt, 'le': series.le, 'gt': series.gt, 'ge': series.ge
+    }[operator]
+    return compare(value).to_numpy()
+
+
+# Filter, sort and page `frame` the way a DataTable in custom mode expects.
+# Returns (page_rows, page_count); only the requested page is materialised.
+def query_table(frame, filter_query=None, sort_by=None, page_current=0, page_size=10, columns=None):
+    mask = np.ones(len(frame), dtype=bool)
+    for column, operator, value, case_sensitive in parse_filter_query(filter_query):
+        if column in frame:
+            mask &= _clause_mask(frame, column, operator, value, case_sensitive)
+    if not mask.all():
+        frame = frame[mask]
+
+    page_count = max(1, math.ceil(len(frame) / page_size))
+    page_current = min(page_current or 0, page_count - 1)
+    start, end = page_current * page_size, (page_current + 1) * page_size
+
+    if sort_by:
+        sort = sort_by[0]
+        column, ascending = sort['column_id'], sort['direction'] == 'asc'
+        if len(sort_by) == 1 and pd.api.types.is_numeric_dtype(frame[column]):
+            # Partial selection: only the rows up to the end of the page are ordered
+            frame = frame.nsmallest(end, column) if ascending else frame.nlargest(end, column)
+        else:
+            frame = frame.sort_values(
+                [sort['column_id'] for sort in sort_by],
+                ascending=[sort['direction'] == 'asc' for sort in sort_by],
+                kind='stable'
+            )
+
+    page = frame.iloc[start:end]
+    if columns is not None:
+        page = page[columns]
+    return page.to_dict('records'), page_count
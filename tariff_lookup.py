@@ -0,0 +1,271 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import time
+
+import aiohttp
+import openai
+
+from chat import count_tokens
+from circuit_breaker import CircuitOpenError
+from llm_cache import make_cache_key
+from llm_client import achat_completion, response_cache
+from similarity import plan_lookups, share_answers
+from singleflight import SingleFlightTimeout
+
+logger = logging.getLogger(__name__)
+
+TARIFF_LOOKUP_MODEL = os.getenv('TARIFF_LOOKUP_MODEL', 'gpt-3.5-turbo')
+# Requests in flight at once
+TARIFF_LOOKUP_CONCURRENCY = int(os.getenv('TARIFF_LOOKUP_CONCURRENCY', 8))
+# Sustained requests per second and burst size of the token bucket
+TARIFF_LOOKUP_RATE = float(os.getenv('TARIFF_LOOKUP_RATE', 5))
+TARIFF_LOOKUP_BURST = int(os.getenv('TARIFF_LOOKUP_BURST', 10))
+# Upper bounds for one batch: prompt tokens spent on brand descriptions, and brands
+TARIFF_LOOKUP_BATCH_TOKENS = int(os.getenv('TARIFF_LOOKUP_BATCH_TOKENS', 1200))
+TARIFF_LOOKUP_MAX_BATCH = int(os.getenv('TARIFF_LOOKUP_MAX_BATCH', 25))
+TARIFF_LOOKUP_RETRIES = int(os.getenv('TARIFF_LOOKUP_RETRIES', 4))
+# Completion tokens reserved per brand in a batch
+TOKENS_PER_RESULT = 60
+
+RETRYABLE_ERRORS = (
+    SingleFlightTimeout,
+    openai.error.RateLimitError,
+    openai.error.APIError,
+    openai.error.APIConnectionError,
+    openai.error.ServiceUnavailableError,
+    openai.error.Timeout,
+    json.JSONDecodeError,
+)
+
+SYSTEM_PROMPT = (
+    "You are an expert on trade tariffs between China and the USA. "
+    "Always answer with a single JSON object and nothing else."
+)
+
+USER_PROMPT = """For each product below, give the cumulative tariff applied to imports from China into the USA.
+Products (JSON): {items}
+Reply with a JSON object of the form
+{{"results": [{{"id": "<product id>", "category": "<product category>", "tariff": "<tariff, e.g. 25%>", "country": "<country>", "comments": "<short comment>"}}]}}
+with at least one entry per product id. Use "9999" as the tariff if you don't find anything."""
+TARIFF_FIELDS = ('category', 'tariff', 'country', 'comments')
+
+SUPPLIER_SYSTEM_PROMPT = (
+    "You are an expert in global trade who recommends alternative suppliers. "
+    "Always answer with a single JSON object and nothing else."
+)
+
+SUPPLIER_PROMPT = """For each product below, currently sourced from China, suggest alternative supplier countries.
+Products (JSON): {items}
+Reply with a JSON object of the form
+{{"results": [{{"id": "<product id>", "category": "<product category>", "suppliers": "<up to 3 countries, comma separated>", "comments": "<short comment>"}}]}}
+with one entry per product id."""
+SUPPLIER_FIELDS = ('category', 'suppliers', 'comments')
+
+
+class TokenBucket:
+    """Async token bucket: at most `burst` requests at once, refilled at `rate` per second."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# Split items ({'id', 'description'}) into as few batches as the token and size
+# limits allow, with similar sizes so no single request dominates latency
+def make_batches(items, max_tokens=TARIFF_LOOKUP_BATCH_TOKENS, max_items=TARIFF_LOOKUP_MAX_BATCH):
+    if not items:
+        return []
+    costs = [count_tokens(json.dumps(item)) for item in items]
+    batch_count = max(math.ceil(sum(costs) / max_tokens), math.ceil(len(items) / max_items))
+    target_tokens = sum(costs) / batch_count
+    target_items = math.ceil(len(items) / batch_count)
+
+    batches, batch, used = [], [], 0
+    for item, cost in zip(items, costs):
+        full = used + cost > max_tokens or len(batch) >= max_items
+        balanced = used >= target_tokens or len(batch) >= target_items
+        if batch and (full or balanced):
+            batches.append(batch)
+            batch, used = [], 0
+        batch.append(item)
+        used += cost
+    batches.append(batch)
+    return batches
+
+
+# Parse the JSON reply of one batch into result rows, keeping only known ids
+def parse_batch_response(content, ids, fields=TARIFF_FIELDS):
+    payload = json.loads(content)
+    results = payload.get('results', []) if isinstance(payload, dict) else payload
+    rows = []
+    for result in results:
+        if not isinstance(result, dict) or str(result.get('id')) not in ids:
+            continue
+        rows.append({
+            'id': str(result['id']),
+            **{field: str(result.get(field, '')).strip() for field in fields}
+        })
+    return rows
+
+
+# Rows of one batch, retrying failed requests until TARIFF_LOOKUP_RETRIES or
+# the monotonic deadline_at (None for no deadline) runs out
+async def _lookup_batch(batch, semaphore, bucket, model, prompts, fields, deadline_at=None):
+    system_prompt, user_prompt = prompts
+    params = dict(
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt.format(items=json.dumps(batch))}
+        ],
+        max_tokens=TOKENS_PER_RESULT * len(batch) + 50,
+        temperature=0,
+        response_format={"type": "json_object"}
+    )
+    ids = {str(item['id']) for item in batch}
+    async with semaphore:
+        for attempt in range(TARIFF_LOOKUP_RETRIES + 1):
+            await bucket.acquire()
+            try:
+                response = await achat_completion(**params)
+                try:
+                    return parse_batch_response(response['choices'][0]['message']['content'], ids, fields)
+                except json.JSONDecodeError:
+                    # Don't let a malformed reply be served from the cache on retry
+                    response_cache.delete(make_cache_key(params))
+                    raise
+            except CircuitOpenError:
+                # Retrying can't help until the breaker lets calls through again
+                return []
+            except RETRYABLE_ERRORS as exc:
+                # A cancellation at the deadline can surface as a request timeout
+                # (aiohttp converts it), so the deadline is checked here as well
+                if attempt == TARIFF_LOOKUP_RETRIES or (deadline_at and time.monotonic() >= deadline_at):
+                    logger.warning("Lookup failed for %s: %s", sorted(ids), exc)
+                    return []
+                # Exponential backoff with full jitter
+                await asyncio.sleep(random.uniform(0, min(30, 0.5 * 2 ** attempt)))
+
+
+# Rows of every batch finished within `deadline` seconds (all of them when
+# deadline is None); unfinished batches are cancelled and their items left out.
+# The deadline itself is not held against upstream: it may have been used up
+# waiting for a worker slot, the semaphore or the rate limit. Only upstream
+# errors and request timeouts reach the circuit breaker (llm_client.record_outcome).
+async def _alookup(items, prompts, fields, model, concurrency, rate, burst, deadline=None):
+    semaphore = asyncio.Semaphore(concurrency)
+    bucket = TokenBucket(rate, burst)
+    deadline_at = time.monotonic() + deadline if deadline is not None else None
+    async with aiohttp.ClientSession() as session:
+        # Reuse one HTTP session (and its connection pool) for every request
+        openai.aiosession.set(session)
+        tasks = [
+            asyncio.ensure_future(_lookup_batch(batch, semaphore, bucket, model, prompts, fields, deadline_at))
+            for batch in make_batches(items)
+        ]
+        if not tasks:
+            return []
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+            logger.warning(
+                "Lookup deadline of %gs passed with %d of %d batches unfinished", deadline, len(pending), len(tasks)
+            )
+    return [row for task in tasks if task in done for row in task.result()]
+
+
+# Look up items ({'id', 'description'}) in concurrent, rate-limited batches,
+# giving up on batches still running after `deadline` seconds.
+# With a similarity.DescriptionIndex, items whose description is close to one
+# resolved before (in any worker) reuse that answer, near-duplicates within
+# `items` share one lookup, and only genuinely new descriptions reach the LLM.
+# Returns result rows in input order.
+async def _alookup_similar(items, kind, prompts, fields, index, model, concurrency, rate, burst, deadline):
+    if index is None:
+        rows = await _alookup(items, prompts, fields, model, concurrency, rate, burst, deadline)
+    else:
+        answers = index.answers(kind)
+        rows, representatives, followers = plan_lookups(items, answers)
+        looked_up = await _alookup(representatives, prompts, fields, model, concurrency, rate, burst, deadline)
+        rows += share_answers(looked_up, representatives, followers, answers)
+
+    order = {str(item['id']): position for position, item in enumerate(items)}
+    return sorted(rows, key=lambda row: order[row['id']])
+
+
+async def alookup_tariffs(items, model=TARIFF_LOOKUP_MODEL, concurrency=TARIFF_LOOKUP_CONCURRENCY,
+                          rate=TARIFF_LOOKUP_RATE, burst=TARIFF_LOOKUP_BURST, index=None, deadline=None):
+    return await _alookup_similar(
+        items, 'tariff', (SYSTEM_PROMPT, USER_PROMPT), TARIFF_FIELDS, index, model, concurrency, rate, burst,
+        deadline
+    )
+
+
+def lookup_tariffs(items, **kwargs):
+    return asyncio.run(alookup_tariffs(items, **kwargs))
+
+
+async def alookup_alternative_suppliers(items, model=TARIFF_LOOKUP_MODEL, concurrency=TARIFF_LOOKUP_CONCURRENCY,
+                                        rate=TARIFF_LOOKUP_RATE, burst=TARIFF_LOOKUP_BURST, index=None,
+                                        deadline=None):
+    return await _alookup_similar(
+        items, 'suppliers', (SUPPLIER_SYSTEM_PROMPT, SUPPLIER_PROMPT), SUPPLIER_FIELDS, index,
+        model, concurrency, rate, burst, deadline
+    )
+
+
+def lookup_alternative_suppliers(items, **kwargs):
+    return asyncio.run(alookup_alternative_suppliers(items, **kwargs))
+
+
+# Lookup items for a brand table: one per brand, identified by brand_id. Only
+# the product description is sent, so brands selling the same products can
+# share answers.
+def brand_items(brand_data):
+    return [
+        {'id': str(brand_id), 'description': str(description)}
+        for brand_id, description in zip(brand_data['brand_id'], brand_data['description'])
+    ]
+
+
+if __name__ == '__main__':
+    import pandas as pd
+    from dotenv import load_dotenv
+
+    from data_repository import DataRepository
+
+    parser = argparse.ArgumentParser(description="Enrich the brand catalog with tariff lookups")
+    parser.add_argument('--output', default='brand_tariffs.csv')
+    args = parser.parse_args()
+
+    load_dotenv()
+    openai.api_key = os.getenv("OPENAI_API_KEY")
+    openai.api_base = os.getenv("OPENAI_API_BASE", openai.api_base)
+
+    data = DataRepository().current()
+    brands = data.brands
+    started = time.perf_counter()
+    rows = lookup_tariffs(brand_items(brands), index=data.description_index)
+    pd.DataFrame(rows).to_csv(args.output, index=False)
+    print(f"{len(rows)} tariff rows for {len(brands)} brands in {time.perf_counter() - started:.1f}s -> {args.output}")
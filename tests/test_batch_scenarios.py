@@ -0,0 +1,54 @@
+import os
+
+import pandas as pd
+import pytest
+
+from batch_scenarios import ChunkWriter, run_batch
+from benchmarks.synthetic_data import generate
+
+pyarrow = pytest.importorskip('pyarrow')
+
+
+def _brand_chunk(business_unit, n_brands):
+    return pd.DataFrame({
+        'business_unit': pd.Categorical([business_unit] * n_brands),
+        'brand_name': pd.Categorical([f'{business_unit} brand {i}' for i in range(n_brands)]),
+        'new_profit': [1.0] * n_brands,
+    })
+
+
+# A unit of 300 brands gets int16 category codes, one of 6 brands int8
+def test_chunks_with_different_label_counts_share_one_schema(tmp_path):
+    writer = ChunkWriter(str(tmp_path / 'brands'), 'parquet')
+    for business_unit, n_brands in (('Small', 6), ('Large', 300), ('Tiny', 2)):
+        writer.write(_brand_chunk(business_unit, n_brands))
+    writer.close()
+
+    result = pd.read_parquet(writer.path)
+    assert len(result) == 308
+    assert result['business_unit'].value_counts().to_dict() == {'Large': 300, 'Small': 6, 'Tiny': 2}
+
+
+def test_run_batch_with_mixed_business_unit_sizes(tmp_path):
+    data_dir = tmp_path / 'data'
+    generate(str(data_dir), n_brands=60, n_business_units=3)
+    brands = pd.read_csv(data_dir / 'brand.csv', encoding='utf-8-sig')
+    # One large unit next to two units of a few brands
+    large = pd.DataFrame({
+        'business_unit': 'Large Unit',
+        'brand_id': [f'BRD_L{i}' for i in range(300)],
+        'brand_name': [f'Large Brand {i}' for i in range(300)],
+        'description': 'Helmets for cycling',
+        'brand_revenue_USD': 10.0
+    })
+    pd.concat([brands.head(12), large], ignore_index=True).to_csv(
+        data_dir / 'brand.csv', index=False, encoding='utf-8-sig'
+    )
+
+    paths = run_batch(
+        str(tmp_path / 'out'), [0.0, 10.0], data_dir=str(data_dir), cache_dir=str(tmp_path / 'cache'), max_workers=1
+    )
+
+    scenarios = pd.read_parquet(paths[0])
+    assert len(scenarios) == 2 * 312
+    assert os.path.exists(paths[2])
@@ -0,0 +1,98 @@
+import time
+
+import openai
+import pytest
+
+import chat
+import llm_client
+from chat import CHAT_HISTORY_TOKEN_BUDGET, build_messages, count_tokens, stream_chat, trim_history
+from circuit_breaker import CircuitBreaker
+from fake_openai_server import fake_reply, start_fake_server
+
+
+# Point the OpenAI client at a local fake server with the given delays, with a
+# breaker and metrics of its own
+@pytest.fixture
+def fake_openai(tmp_path, monkeypatch):
+    servers = []
+    breaker = CircuitBreaker(str(tmp_path / 'breaker'))
+    monkeypatch.setattr(chat, 'breaker', breaker)
+    monkeypatch.setattr(llm_client, 'breaker', breaker)
+    monkeypatch.setattr(llm_client, 'record_llm_request', lambda *args, **kwargs: None)
+    monkeypatch.setattr(openai, 'api_key', 'test')
+
+    def start(**delays):
+        server = start_fake_server(**delays)
+        servers.append(server)
+        monkeypatch.setattr(openai, 'api_base', f"http://127.0.0.1:{server.server_address[1]}/v1")
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def _messages(text):
+    return [{"role": "system", "content": chat.SYSTEM_PROMPT}, {"role": "user", "content": text}]
+
+
+def test_tokens_arrive_as_they_are_streamed(fake_openai):
+    fake_openai(token_delay=0.05)
+    messages = _messages("Which countries could replace China for cycling helmets?")
+    arrivals = []
+    for token in stream_chat(messages):
+        arrivals.append((time.monotonic(), token))
+
+    assert ''.join(token for _, token in arrivals).strip() == fake_reply(messages)
+    assert len(arrivals) > 5
+    # The first token is handed over well before the reply is complete
+    assert arrivals[-1][0] - arrivals[0][0] >= 0.05 * (len(arrivals) - 2)
+
+
+def test_the_timeout_cuts_a_slow_reply_off(fake_openai):
+    fake_openai(token_delay=0.2)
+    received = []
+    started = time.monotonic()
+    with pytest.raises(openai.error.Timeout):
+        for token in stream_chat(_messages("Summarise the tariff exposure of every brand we sell"), timeout=0.5):
+            received.append(token)
+
+    assert 0 < len(received) < len(fake_reply(_messages("Summarise the tariff exposure of every brand we sell")).split())
+    assert time.monotonic() - started < 1.5
+
+
+def _history(n, words=60):
+    return [
+        {"role": "user" if position % 2 == 0 else "assistant",
+         "content": f"message {position} " + "tariff " * words}
+        for position in range(n)
+    ]
+
+
+def _tokens(messages):
+    return sum(count_tokens(message['content']) + 4 for message in messages)
+
+
+def test_trim_history_keeps_the_most_recent_messages_within_budget():
+    history = _history(30)
+    trimmed = trim_history(history, token_budget=500)
+
+    assert _tokens(trimmed) <= 500
+    assert trimmed == history[-len(trimmed):]
+    # One more message would not have fit
+    assert _tokens(history[-len(trimmed) - 1:]) > 500
+
+
+def test_build_messages_stays_within_the_history_budget():
+    history = _history(200)
+    message = "What would a 25% tariff on Vietnam do to our margins? " * 5
+    messages = build_messages(history, message, context="The user is analysing Bell Helmets")
+
+    assert messages[:2] == [
+        {"role": "system", "content": chat.SYSTEM_PROMPT},
+        {"role": "system", "content": "The user is analysing Bell Helmets"}
+    ]
+    assert messages[-1] == {"role": "user", "content": message}
+    conversation = messages[2:-1]
+    assert conversation == history[-len(conversation):]
+    assert _tokens(conversation) + count_tokens(message) <= CHAT_HISTORY_TOKEN_BUDGET
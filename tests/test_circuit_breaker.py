@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+RESET_TIMEOUT = 0.2
+
+
+@pytest.fixture
+def breaker(tmp_path):
+    breaker = CircuitBreaker(str(tmp_path / 'breaker'), failure_threshold=3, reset_timeout=RESET_TIMEOUT, probe_timeout=0.5)
+    yield breaker
+    breaker.cache.close()
+
+
+def _open(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+
+def test_closed_breaker_lets_calls_through_below_the_threshold(breaker):
+    for _ in range(breaker.failure_threshold - 1):
+        breaker.record_failure()
+    assert breaker.state() == 'closed'
+    assert breaker.allow()
+    breaker.check()
+
+
+def test_a_success_resets_the_failure_count(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state() == 'closed'
+
+
+def test_consecutive_failures_open_the_breaker(breaker):
+    _open(breaker)
+    assert breaker.state() == 'open'
+    assert not breaker.allow()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_half_open_breaker_lets_one_probe_through(breaker):
+    _open(breaker)
+    time.sleep(RESET_TIMEOUT * 1.5)
+    assert breaker.state() == 'half_open'
+    assert breaker.allow()
+    # Everyone else waits for the probe's outcome
+    assert not breaker.allow()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_successful_probe_closes_the_breaker(breaker):
+    _open(breaker)
+    time.sleep(RESET_TIMEOUT * 1.5)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state() == 'closed'
+    assert breaker.allow() and breaker.allow()
+    # The failure count starts again from zero
+    breaker.record_failure()
+    assert breaker.state() == 'closed'
+
+
+def test_failed_probe_opens_the_breaker_again(breaker):
+    _open(breaker)
+    time.sleep(RESET_TIMEOUT * 1.5)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state() == 'open'
+    assert not breaker.allow()
+    time.sleep(RESET_TIMEOUT * 1.5)
+    assert breaker.state() == 'half_open'
+    assert breaker.allow()
+
+
+def test_probe_that_never_reports_back_is_replaced(breaker):
+    _open(breaker)
+    time.sleep(RESET_TIMEOUT * 1.5)
+    assert breaker.allow()
+    assert not breaker.allow()
+    time.sleep(breaker.probe_timeout)
+    assert breaker.allow()
+
+
+def test_state_is_shared_between_instances(breaker):
+    _open(breaker)
+    other = CircuitBreaker(breaker.cache.directory, reset_timeout=RESET_TIMEOUT)
+    try:
+        assert other.state() == 'open'
+        other.record_success()
+        assert breaker.state() == 'closed'
+    finally:
+        other.cache.close()
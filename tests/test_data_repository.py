@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_data import generate
+from data_repository import DataRepository
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    path = str(tmp_path / 'data')
+    generate(path, 300, n_business_units=6)
+    return path
+
+
+def _edit(data_dir, filename, change):
+    path = os.path.join(data_dir, filename)
+    frame = pd.read_csv(path, dtype=str, encoding='utf-8-sig')
+    change(frame)
+    frame.to_csv(path, index=False, encoding='utf-8-sig')
+    # Make sure the edit is seen as a new version even on coarse mtime clocks
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def _edit_revenue(data_dir):
+    def change(brands):
+        brands.loc[5, 'brand_revenue_USD'] = '1234.5'
+    _edit(data_dir, 'brand.csv', change)
+    brands = pd.read_csv(os.path.join(data_dir, 'brand.csv'), encoding='utf-8-sig')
+    return {brands.loc[5, 'business_unit']}
+
+
+def _move_brand(data_dir):
+    before = {}
+
+    def change(brands):
+        before['unit'] = brands.loc[7, 'business_unit']
+        brands.loc[7, 'business_unit'] = next(unit for unit in brands['business_unit'] if unit != before['unit'])
+        before['target'] = brands.loc[7, 'business_unit']
+    _edit(data_dir, 'brand.csv', change)
+    return {before['unit'], before['target']}
+
+
+def _edit_share(data_dir):
+    def change(supply_chain):
+        supply_chain.loc[3, 'Proportion_imports'] = '80%'
+    _edit(data_dir, 'Competitors_Supply_chain.csv', change)
+    return set()
+
+
+def _edit_country(data_dir):
+    def change(supply_chain):
+        current = supply_chain.loc[4, 'competitor_supplier_country']
+        supply_chain.loc[4, 'competitor_supplier_country'] = next(
+            country for country in supply_chain['competitor_supplier_country'] if country != current
+        )
+    _edit(data_dir, 'Competitors_Supply_chain.csv', change)
+    return set()
+
+
+@pytest.mark.parametrize('edit', [_edit_revenue, _move_brand, _edit_share, _edit_country])
+def test_incremental_reload_matches_a_fresh_load(tmp_path, data_dir, edit):
+    repository = DataRepository(data_dir, str(tmp_path / 'cache'), check_interval=0)
+    previous = repository.current()
+    edited_units = edit(data_dir)
+
+    reloaded = repository.reload()
+    fresh = DataRepository(data_dir, str(tmp_path / 'fresh-cache')).current()
+    assert reloaded.version == fresh.version != previous.version
+
+    index, fresh_index = reloaded.business_unit_index, fresh.business_unit_index
+    pd.testing.assert_frame_equal(index.aggregates, fresh_index.aggregates, check_exact=False)
+    for unit in fresh_index.business_units:
+        assert np.array_equal(np.sort(index.positions[unit]), np.sort(fresh_index.positions[unit]))
+    # Units without an edited brand keep the version of the previous load
+    assert index.versions == {
+        unit: fresh.version if unit in edited_units else previous.version for unit in fresh_index.versions
+    }
+
+    assert reloaded.exposure.countries == fresh.exposure.countries
+    assert reloaded.exposure.competitors == fresh.exposure.competitors
+    np.testing.assert_allclose(reloaded.exposure.matrix, fresh.exposure.matrix)
@@ -0,0 +1,16 @@
+from llm_cache import LLMResponseCache
+
+
+def test_last_good_results_survive_eviction_expiry_and_clear(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / 'llm_cache.sqlite3'), ttl=0, stale_ttl=0, max_entries=2)
+    cache.save_last_good('openai-tariff-table:Golf', [{'brand': 'Bushnell', 'tariff': 5}])
+    for key in range(5):
+        cache.set(str(key), {'choices': []})
+    cache.clear()
+
+    assert cache.stats()['entries'] == 0
+    assert cache.last_good('openai-tariff-table:Golf') == [{'brand': 'Bushnell', 'tariff': 5}]
+
+    cache.save_last_good('openai-tariff-table:Golf', [{'brand': 'Bushnell', 'tariff': 10}])
+    assert cache.last_good('openai-tariff-table:Golf') == [{'brand': 'Bushnell', 'tariff': 10}]
+    assert cache.last_good('openai-tariff-table:Other') is None
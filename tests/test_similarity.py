@@ -0,0 +1,60 @@
+import itertools
+import os
+
+import pandas as pd
+import pytest
+
+import similarity
+from similarity import SIMILARITY_THRESHOLD, AnswerStore, DescriptionIndex, SimilarAnswers
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Data')
+
+
+@pytest.fixture(scope='module')
+def index():
+    return DescriptionIndex(pd.read_csv(os.path.join(DATA_DIR, 'brand.csv'))['description'])
+
+
+@pytest.mark.parametrize('text, description', [
+    ('Cycling, motorcycling and powersports helmets', 'Helmets for cycling, motorcycling, and powersports.'),
+    ('Helmets for cycling and motorcycling', 'Helmets for cycling, motorcycling, and powersports.'),
+    ('Golf rangefinders and GPS units', 'Golf rangefinders and GPS devices.'),
+    ('Snow sports helmets', 'Cycling and snow sports helmets, shoes, and apparel.'),
+])
+def test_rewordings_reach_the_threshold(index, text, description):
+    assert [match for match, _ in index.similar(text, top=1, threshold=SIMILARITY_THRESHOLD)] == [description]
+
+
+# The closest pair of distinct catalog products is the two helmet brands (0.33)
+def test_distinct_catalog_products_stay_below_the_threshold(index):
+    for first, second in itertools.combinations(index.descriptions, 2):
+        first_vector, second_vector = index.vector(first), index.vector(second)
+        score = sum(weight * second_vector.get(term, 0.0) for term, weight in first_vector.items())
+        assert score < SIMILARITY_THRESHOLD, (first, second)
+
+
+def test_answers_are_not_shared_between_the_helmet_brands(index, tmp_path):
+    answers = SimilarAnswers(index, 'tariff', AnswerStore(str(tmp_path / 'answers.sqlite3')))
+    answers.add('Helmets for cycling, motorcycling, and powersports.', [{'tariff': 5}])
+    assert answers.match('Cycling and snow sports helmets, shoes, and apparel.') is None
+    assert answers.match('Cycling, motorcycling and powersports helmets') == [{'tariff': 5}]
+
+
+def test_expired_answers_are_skipped_and_pruned(index, tmp_path, monkeypatch):
+    store = AnswerStore(str(tmp_path / 'answers.sqlite3'), ttl=60)
+    now = 1_000_000.0
+    monkeypatch.setattr(similarity.time, 'time', lambda: now)
+    store.add('tariff', 'Golf rangefinders and GPS devices.', [{'tariff': 5}])
+    answers = SimilarAnswers(index, 'tariff', store)
+    assert answers.match('Golf rangefinders and GPS units') == [{'tariff': 5}]
+
+    now += 61
+    # Loaded answers are dropped at the next sync with the store
+    monkeypatch.setattr(similarity, 'ANSWER_SYNC_INTERVAL', 0.0)
+    assert answers.match('Golf rangefinders and GPS units') is None
+    assert store.since('tariff', 0) == []
+
+    store.add('tariff', 'Lightweight hunting packs and gear.', [{'tariff': 7}])
+    rows = store._connect().execute("SELECT text FROM answers").fetchall()
+    assert rows == [('Lightweight hunting packs and gear.',)]
+    assert answers.match('Hunting packs and gear, lightweight') == [{'tariff': 7}]
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight, SingleFlightTimeout
+
+
+class Upstream:
+    """Fetch stand-in that publishes into `results` and counts its calls."""
+
+    def __init__(self, delay=0.2, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.results = {}
+
+    def fetch(self, key):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        self.results[key] = f'result {self.calls}'
+        return self.results[key]
+
+    def load(self, key):
+        return self.results.get(key)
+
+
+def _run_concurrently(flight, upstream, n, timeout=None):
+    outcomes = [None] * n
+
+    def call(position):
+        try:
+            outcomes[position] = flight.run(
+                'key', lambda: upstream.fetch('key'), lambda: upstream.load('key'), timeout=timeout
+            )
+        except Exception as exc:
+            outcomes[position] = exc
+
+    threads = [threading.Thread(target=call, args=(position,)) for position in range(n)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+def test_waiters_share_the_leaders_result(tmp_path):
+    flight = SingleFlight(str(tmp_path), timeout=5, poll_interval=0.01)
+    upstream = Upstream()
+    assert _run_concurrently(flight, upstream, 5) == ['result 1'] * 5
+    assert upstream.calls == 1
+    assert flight.stats() == {'issued': 1, 'coalesced': 4}
+
+
+def test_waiters_raise_the_leaders_error_without_calling_again(tmp_path):
+    flight = SingleFlight(str(tmp_path), timeout=5, poll_interval=0.01)
+    upstream = Upstream(error=ConnectionError("upstream down"))
+    started = time.monotonic()
+    outcomes = _run_concurrently(flight, upstream, 5)
+
+    assert upstream.calls == 1
+    assert all(isinstance(outcome, ConnectionError) and str(outcome) == "upstream down" for outcome in outcomes)
+    assert time.monotonic() - started < 1
+
+
+def test_a_new_request_after_a_failure_is_issued_again(tmp_path):
+    flight = SingleFlight(str(tmp_path), timeout=5, poll_interval=0.01)
+    upstream = Upstream(delay=0, error=ConnectionError("upstream down"))
+    _run_concurrently(flight, upstream, 1)
+    upstream.error = None
+    assert _run_concurrently(flight, upstream, 1) == ['result 2']
+
+
+def test_waiters_give_up_at_the_deadline_and_leave_the_lock(tmp_path):
+    flight = SingleFlight(str(tmp_path), timeout=5, poll_interval=0.01)
+    upstream = Upstream(delay=1)
+    leader = threading.Thread(target=_run_concurrently, args=(flight, upstream, 1))
+    leader.start()
+    time.sleep(0.1)
+
+    started = time.monotonic()
+    with pytest.raises(SingleFlightTimeout):
+        flight.run('key', lambda: upstream.fetch('key'), lambda: upstream.load('key'), timeout=0.3)
+    assert 0.3 <= time.monotonic() - started < 0.6
+    # The leader still holds its lock and is the only caller upstream
+    assert flight._lock_key('key') in flight.cache
+    leader.join()
+    assert upstream.calls == 1
+
+
+def test_async_waiters_raise_the_leaders_error(tmp_path):
+    flight = SingleFlight(str(tmp_path), timeout=5, poll_interval=0.01)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        raise ConnectionError("upstream down")
+
+    async def main():
+        return await asyncio.gather(
+            *(flight.arun('key', fetch, lambda: None) for _ in range(5)), return_exceptions=True
+        )
+
+    outcomes = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(isinstance(outcome, ConnectionError) for outcome in outcomes)
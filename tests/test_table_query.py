@@ -0,0 +1,104 @@
+import pandas as pd
+import pytest
+
+from table_query import parse_filter_part, query_table
+
+
+@pytest.fixture
+def brands():
+    return pd.DataFrame({
+        'brand_name': ['Alpha', 'beta', 'Gamma 2', 'Delta'],
+        'description': ['Helmets', 'Packs 2 go', 'Bikes', 'Optics'],
+        'launched': ['2021-03-01', '2022-07-15', '2021-11-30', '2023-01-01'],
+        'brand_revenue_USD': [17.0, 7.5, 120.0, 70.0],
+    })
+
+
+def _names(rows):
+    return [row['brand_name'] for row in rows]
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('{brand_revenue_USD} eq 70', ['Delta']),
+    ('{brand_revenue_USD} = 7.5', ['beta']),
+    ('{brand_revenue_USD} ne 70', ['Alpha', 'beta', 'Gamma 2']),
+    ('{brand_revenue_USD} != 70', ['Alpha', 'beta', 'Gamma 2']),
+    ('{brand_revenue_USD} lt 17', ['beta']),
+    ('{brand_revenue_USD} < 17', ['beta']),
+    ('{brand_revenue_USD} le 17', ['Alpha', 'beta']),
+    ('{brand_revenue_USD} <= 17', ['Alpha', 'beta']),
+    ('{brand_revenue_USD} gt 70', ['Gamma 2']),
+    ('{brand_revenue_USD} > 70', ['Gamma 2']),
+    ('{brand_revenue_USD} ge 70', ['Gamma 2', 'Delta']),
+    ('{brand_revenue_USD} >= 70', ['Gamma 2', 'Delta']),
+    ('{brand_revenue_USD} contains 7', ['Alpha', 'beta', 'Delta']),
+    ('{brand_revenue_USD} contains 120', ['Gamma 2']),
+    ('{description} contains 2', ['beta']),
+    ('{description} contains "2"', ['beta']),
+    ('{brand_name} contains Gamma 2', ['Gamma 2']),
+    ('{brand_name} scontains a', ['Alpha', 'beta', 'Gamma 2', 'Delta']),
+    ('{brand_name} scontains A', ['Alpha']),
+    ('{brand_name} icontains A', ['Alpha', 'beta', 'Gamma 2', 'Delta']),
+    ('{brand_name} contains B', []),
+    ('{brand_name} icontains B', ['beta']),
+    ('{brand_name} eq Alpha', ['Alpha']),
+    ('{brand_name} eq "Alpha"', ['Alpha']),
+    ("{brand_name} eq 'Alpha'", ['Alpha']),
+    ('{brand_name} ieq ALPHA', ['Alpha']),
+    ('{brand_name} seq ALPHA', []),
+    ('{brand_revenue_USD} eq abc', []),
+    ('{brand_revenue_USD} ne abc', ['Alpha', 'beta', 'Gamma 2', 'Delta']),
+    ('{launched} datestartswith 2021', ['Alpha', 'Gamma 2']),
+    ('{launched} datestartswith 2021-11', ['Gamma 2']),
+    ('{brand_revenue_USD} gt 10 && {description} contains s', ['Alpha', 'Gamma 2', 'Delta']),
+])
+def test_filter_operators(brands, query, expected):
+    rows, _ = query_table(brands, query, page_size=10)
+    assert _names(rows) == expected
+
+
+def test_text_operators_keep_the_operand_as_typed():
+    assert parse_filter_part('{description} contains 2') == ('description', 'contains', '2', True)
+    assert parse_filter_part('{brand_revenue_USD} eq 2') == ('brand_revenue_USD', 'eq', 2.0, True)
+    assert parse_filter_part('{brand_name} icontains "a b"') == ('brand_name', 'contains', 'a b', False)
+
+
+def test_unknown_columns_and_clauses_are_ignored(brands):
+    rows, _ = query_table(brands, '{missing} eq 1 && not a clause', page_size=10)
+    assert len(rows) == 4
+
+
+@pytest.mark.parametrize('sort_by, expected', [
+    ([{'column_id': 'brand_revenue_USD', 'direction': 'desc'}], ['Gamma 2', 'Delta', 'Alpha', 'beta']),
+    ([{'column_id': 'brand_revenue_USD', 'direction': 'asc'}], ['beta', 'Alpha', 'Delta', 'Gamma 2']),
+    ([{'column_id': 'brand_name', 'direction': 'asc'}], ['Alpha', 'Delta', 'Gamma 2', 'beta']),
+])
+def test_sort(brands, sort_by, expected):
+    rows, _ = query_table(brands, sort_by=sort_by, page_size=10)
+    assert _names(rows) == expected
+
+
+@pytest.mark.parametrize('page_current, expected', [
+    (0, ['Gamma 2', 'Delta', 'Alpha']),
+    (1, ['beta']),
+    # Past the last page: the last page
+    (5, ['beta']),
+    (None, ['Gamma 2', 'Delta', 'Alpha']),
+])
+def test_page_bounds(brands, page_current, expected):
+    rows, page_count = query_table(
+        brands, sort_by=[{'column_id': 'brand_revenue_USD', 'direction': 'desc'}],
+        page_current=page_current, page_size=3
+    )
+    assert page_count == 2
+    assert _names(rows) == expected
+
+
+def test_empty_result_has_one_page(brands):
+    rows, page_count = query_table(brands, '{brand_name} eq nobody', page_current=3, page_size=3)
+    assert rows == [] and page_count == 1
+
+
+def test_columns_selects_the_returned_fields(brands):
+    rows, _ = query_table(brands, page_size=1, columns=['brand_name'])
+    assert rows == [{'brand_name': 'Alpha'}]
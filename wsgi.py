@@ -0,0 +1,5 @@
+# WSGI entry point, e.g. `gunicorn wsgi:server`
+from app import create_app
+
+app = create_app()
+server = app.server